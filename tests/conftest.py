@@ -0,0 +1,36 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+# модули приложения импортируются по имени (как при запуске main.py)
+sys.path.insert(0, str(Path(ROOT, "transcrib")))
+
+# настройки для тестов задаются до импорта variables
+_tmp_dir = Path(tempfile.mkdtemp(prefix="transcrib-tests-"))
+os.environ.update(
+    {
+        "DIR_SOUND_IN": str(Path(_tmp_dir, "in")),
+        "CACHE_DIR": str(Path(_tmp_dir, "cache")),
+        "STAGING_PREFETCH": "0",
+        "LOG_LEVEL": "WARNING",
+        "LOG_ENQUEUE": "False",
+    }
+)
+Path(_tmp_dir, "in").mkdir()
+# variables требует файл .env в корне проекта
+_dotenv = Path(ROOT, ".env")
+_dotenv_created = not _dotenv.exists()
+if _dotenv_created:
+    _dotenv.touch()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _remove_dotenv() -> Iterator[None]:
+    yield
+    if _dotenv_created:
+        _dotenv.unlink(missing_ok=True)
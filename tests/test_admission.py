@@ -0,0 +1,40 @@
+from pathlib import Path
+from typing import Any, Iterator
+
+import admission
+import pytest
+import variables
+
+
+@pytest.fixture
+def ledger(tmp_path: Path, monkeypatch: Any) -> Iterator[None]:
+    monkeypatch.setattr(
+        admission, "RESERVATIONS_FILE", Path(tmp_path, "reservations.json")
+    )
+    monkeypatch.setattr(variables, "MEMORY_POLICY", "downgrade")
+    monkeypatch.setattr(admission, "memory_budget_mb", lambda: 4000.0)
+    # процесс с загруженной моделью large
+    monkeypatch.setattr(admission, "process_pss_mb", lambda pid: 9500.0)
+    admission.set_resident(["large"])
+    yield
+    admission.set_resident([])
+
+
+def test_admit_downgrades_when_resident_model_is_unloaded(
+    ledger: None,
+) -> None:
+    assert admission._admit(Path("a.wav"), "large", 60) == "small"
+    reservation = admission.current_reservation()["processes"]
+    (entry,) = reservation.values()
+    # резервируется оценка задания, а не память выгружаемой модели
+    assert entry["reserved_mb"] == round(admission.estimate_mb("small", 60))
+
+
+def test_admit_counts_process_memory_of_kept_model(
+    ledger: None, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(admission, "process_pss_mb", lambda pid: 3000.0)
+    admission.set_resident(["small"])
+    assert admission._admit(Path("a.wav"), "small", 60) == "small"
+    (entry,) = admission.current_reservation()["processes"].values()
+    assert entry["reserved_mb"] == 3000
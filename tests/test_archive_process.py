@@ -0,0 +1,66 @@
+import io
+import subprocess
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+import archive_process
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize(
+    "name, parts",
+    [
+        ("a.wav", ("a.wav",)),
+        ("dir/sub/a.wav", ("dir", "sub", "a.wav")),
+        ("../../etc/a.wav", ("etc", "a.wav")),
+        ("/abs/a.wav", ("abs", "a.wav")),
+        ("dir/../a.wav", ("dir", "a.wav")),
+    ],
+)
+def test_member_path_stays_in_results_dir(name: str, parts: tuple) -> None:
+    archive = Path("/share/in/archive.zip")
+    path = archive_process._member_path(archive, name)
+    assert path == Path("/share/in/archive.zip.results", *parts)
+
+
+def test_decode_stream_pipes_data_in_chunks(monkeypatch: Any) -> None:
+    monkeypatch.setattr(archive_process, "CHUNK_SIZE", 7)
+    data = bytes(range(256)) * 100
+    assert archive_process._decode_stream(["cat"], io.BytesIO(data)) == data
+
+
+def test_decode_stream_reports_exit_code() -> None:
+    with pytest.raises(subprocess.CalledProcessError):
+        archive_process._decode_stream(["false"], io.BytesIO(b"data" * 1000))
+
+
+def test_member_is_decoded_after_admission(
+    tmp_path: Path, monkeypatch: Any
+) -> None:
+    archive = Path(tmp_path, "archive.zip")
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.wav", b"x" * 5000)
+        zf.writestr("notes.txt", b"text")
+    events: List[str] = []
+
+    def decode_member(name: str, stream: Any) -> np.ndarray:
+        events.append(f"decode {name} {len(stream.read())}")
+        return np.zeros(16000 * 2, dtype=np.float32)
+
+    monkeypatch.setattr(archive_process, "_decode_member", decode_member)
+
+    def transcribe(
+        path: Path, duration: float, load: Callable[[], np.ndarray]
+    ) -> Optional[str]:
+        events.append(f"admit {path.name} {duration}")
+        load()
+        return "text"
+
+    index = archive_process.process_archive(archive, transcribe)
+
+    assert events == ["admit a.wav 5.0", "decode a.wav 5000"]
+    assert index["complete"]
+    assert index["members"]["a.wav"]["status"] == "done"
+    assert index["members"]["a.wav"]["duration"] == 2.0
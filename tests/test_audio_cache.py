@@ -0,0 +1,34 @@
+from pathlib import Path
+from typing import Any, List
+
+import audio_cache
+import numpy as np
+import variables
+import whisper
+
+
+def test_cache_entry_is_keyed_on_source_file(
+    tmp_path: Path, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(variables, "AUDIO_CACHE_DIR", Path(tmp_path, "cache"))
+    decoded: List[str] = []
+
+    def load_audio(file: str) -> np.ndarray:
+        decoded.append(file)
+        return np.zeros(16000, dtype=np.float32)
+
+    monkeypatch.setattr(whisper, "load_audio", load_audio)
+    file = Path(tmp_path, "a.wav")
+    file.write_bytes(b"source")
+    key = audio_cache.cache_key(file)
+    assert not audio_cache.is_cached(key)
+    # файл изменяется (перекодирование) после получения ключа
+    file.write_bytes(b"resampled")
+    assert audio_cache.load_audio(file, key)[0] == key
+
+    # повторная обработка того же исходного файла берет сигнал из кэша
+    file.write_bytes(b"source")
+    key = audio_cache.cache_key(file)
+    assert audio_cache.is_cached(key)
+    assert audio_cache.load_audio(file, key)[0] == key
+    assert decoded == [str(file)]
@@ -0,0 +1,29 @@
+from pathlib import Path
+from typing import Any
+
+import checkpoint
+
+
+def test_restore_marks_resumed_processing(
+    tmp_path: Path, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(checkpoint, "CHECKPOINT_DIR", tmp_path)
+    file = Path("/share/in/a.wav")
+    state = checkpoint.Checkpoint(file, "small")
+    state.restore(16000)
+    assert not state.resumed
+    state.lang = "ru"
+    state.complete_stage("transcribe", {"text": " a", "segments": []})
+
+    resumed = checkpoint.Checkpoint(file, "small")
+    resumed.restore(16000)
+    assert resumed.resumed
+    assert resumed.lang == "ru"
+    assert resumed.stage("transcribe")["complete"]
+
+    # другая длительность сигнала или модель - обработка сначала
+    for model, samples in (("small", 32000), ("base", 16000)):
+        other = checkpoint.Checkpoint(file, model)
+        other.restore(samples)
+        assert not other.resumed
+        assert other.lang is None
@@ -0,0 +1,34 @@
+from typing import Any, List
+
+import cpu_tuning
+import pytest
+
+
+@pytest.mark.parametrize(
+    "cpulist, cpus",
+    [
+        ("0-3", [0, 1, 2, 3]),
+        ("0,2,4-5\n", [0, 2, 4, 5]),
+        ("7", [7]),
+        ("", []),
+    ],
+)
+def test_parse_cpulist(cpulist: str, cpus: List[int]) -> None:
+    assert cpu_tuning._parse_cpulist(cpulist) == cpus
+
+
+def test_workers_are_spread_over_numa_nodes(monkeypatch: Any) -> None:
+    nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    monkeypatch.setattr(cpu_tuning, "numa_nodes", lambda: nodes)
+
+    cpus = [cpu_tuning.worker_cpus(index, 4) for index in range(4)]
+
+    assert cpus == [[0, 1], [4, 5], [2, 3], [6, 7]]
+
+
+def test_extra_workers_share_cpus(monkeypatch: Any) -> None:
+    monkeypatch.setattr(cpu_tuning, "numa_nodes", lambda: [[0, 1]])
+
+    cpus = [cpu_tuning.worker_cpus(index, 3) for index in range(3)]
+
+    assert cpus == [[0], [1], [0]]
@@ -0,0 +1,91 @@
+import time
+from pathlib import Path
+from typing import Any
+
+import decoding
+import pytest
+import quality
+import staging
+import torch
+import variables
+import whisper
+from whisper.model import ModelDimensions
+
+
+@pytest.mark.parametrize(
+    "file, profile",
+    [
+        ("/share/in/a.wav", "accurate"),
+        ("/share/in/tiny (quality = low)/a.wav", "fast"),
+        ("/share/in/small (quality = 3)/sub/a.wav", "balanced"),
+        (Path("/share/in/large (quality = max)/a.wav"), "accurate"),
+    ],
+)
+def test_profile_follows_quality_directory(
+    file: Any, profile: str, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(variables, "DECODING_PROFILE", "accurate")
+    assert decoding.get_profile(file) == profile
+
+
+def test_profile_of_staged_file_comes_from_share_path(
+    tmp_path: Path, monkeypatch: Any
+) -> None:
+    monkeypatch.setattr(variables, "STAGING_PREFETCH", 1)
+    monkeypatch.setattr(variables, "DECODING_PROFILE", "balanced")
+    monkeypatch.setattr(staging, "INBOX_DIR", Path(tmp_path, "staging"))
+    file = Path(tmp_path, "share", "large (quality = max)", "a.wav")
+    file.parent.mkdir(parents=True)
+    file.write_bytes(b"audio")
+    staging.prefetch([file])
+    try:
+        local = staging.local_audio(file)
+        assert local != file
+        # копия не содержит директорию качества, поэтому модель
+        # и профиль (neural_process.final_process) - по пути на ресурсе
+        assert decoding.get_profile(local) == "balanced"
+        assert decoding.get_profile(file) == "accurate"
+        assert quality.get_the_model_whisper(file) == "large"
+    finally:
+        staging.release(file)
+
+
+def test_transcribe_options_skip_timeout_and_defaults() -> None:
+    options = decoding.transcribe_options("fast")
+    assert "window_timeout" not in options
+    assert "beam_size" not in options
+    assert options["temperature"] == (0.0, 0.4, 0.8)
+
+
+def test_window_decoding_stops_at_deadline(monkeypatch: Any) -> None:
+    torch.manual_seed(0)
+    dims = ModelDimensions(
+        n_mels=80,
+        n_audio_ctx=1500,
+        n_audio_state=64,
+        n_audio_head=2,
+        n_audio_layer=1,
+        n_vocab=51865,
+        n_text_ctx=448,
+        n_text_state=64,
+        n_text_head=2,
+        n_text_layer=1,
+    )
+    model = whisper.Whisper(dims)
+    mel = torch.randn(80, 3000)
+    options = whisper.DecodingOptions(
+        language="en", temperature=0.0, fp16=False
+    )
+    monkeypatch.setitem(decoding.PROFILES["fast"], "window_timeout", 1e-9)
+
+    start = time.perf_counter()
+    with decoding.track(model, "fast") as stats:
+        result = model.decode(mel, options)
+        # повторное декодирование того же окна не выполняется
+        again = model.decode(mel, options)
+
+    assert time.perf_counter() - start < 30
+    # после срока декодируется только первый токен окна
+    assert len(result.tokens) <= 1
+    assert again is result
+    assert stats == {"windows": 1, "fallbacks": 0, "timeouts": 1}
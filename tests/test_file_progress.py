@@ -0,0 +1,84 @@
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from file_progress import REGEXP_SEGMENT, FileProgress, _SegmentWriter
+
+
+@pytest.mark.parametrize(
+    "line, start, end, text",
+    [
+        (
+            "[00:01.000 --> 00:04.500]  Hello",
+            ("00", "01.000"),
+            "04.500",
+            "Hello",
+        ),
+        (
+            "[01:00:01.000 --> 01:00:05.250] Text",
+            ("00", "01.000"),
+            "05.250",
+            "Text",
+        ),
+        ("[00:00.000 --> 00:02.000] ", ("00", "00.000"), "02.000", ""),
+    ],
+)
+def test_regexp_segment_matches_whisper_lines(
+    line: str, start: tuple, end: str, text: str
+) -> None:
+    match = REGEXP_SEGMENT.match(line)
+    assert match is not None
+    assert (match["sm"], match["ss"]) == start
+    assert match["es"] == end
+    assert match["text"].strip() == text
+
+
+@pytest.mark.parametrize(
+    "line",
+    ["Detecting language using up to the first 30 seconds.", "", "[00:01]"],
+)
+def test_regexp_segment_ignores_other_lines(line: str) -> None:
+    assert REGEXP_SEGMENT.match(line) is None
+
+
+def test_segment_writer_adds_segments_with_offset(tmp_path: Path) -> None:
+    progress = FileProgress(Path(tmp_path, "a.wav"), "header")
+    progress.set_stage("transcribe")
+    progress.offset = 30.0
+    writer = _SegmentWriter(progress)
+
+    writer.write_line("[00:01.000 --> 00:04.500]  Hello")
+    writer.write_line("[01:00:00.000 --> 01:00:02.000]  Later")
+    writer.write_line("[00:05.000 --> 00:06.000]  ")
+    writer.write_line("Detected language: English")
+
+    assert progress.segments == [
+        {"start": 31.0, "end": 34.5, "text": " Hello"},
+        {"start": 3630.0, "end": 3632.0, "text": " Later"},
+    ]
+    partial = Path(tmp_path, "a.partial").read_text(encoding="utf-8")
+    assert "[31 --- 34] Hello" in partial
+    assert "[3630 --- 3632] Later" in partial
+
+
+def test_progress_reports_time_to_file_completion(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    events: List[Dict[str, Any]] = []
+    progress = FileProgress(Path(tmp_path, "a.wav"), "header", [events.append])
+    progress.duration = 100.0
+    progress.set_stages_total(3)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    progress.set_stage("transcribe")
+    # 25 секунд аудио за 10 секунд: этап - еще 30 секунд, перевод
+    # на английский - 40 секунд (перевод на русский не учитывается)
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10.0)
+    progress.update(25.0, force=True)
+
+    assert events[-1]["eta"] == pytest.approx(30.0)
+    assert events[-1]["remaining"] == pytest.approx(70.0)
+    proc = Path(tmp_path, "a.proc").read_text(encoding="utf-8")
+    assert "до завершения этапа: 30 сек." in proc
+    assert "до завершения обработки файла: 70 сек." in proc
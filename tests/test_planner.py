@@ -0,0 +1,57 @@
+from pathlib import Path
+from typing import Any
+
+import planner
+import pytest
+import variables
+
+ROOT = Path("/share/in")
+
+
+def test_estimate_uses_default_rtf_without_measurements(
+    monkeypatch: Any,
+) -> None:
+    monkeypatch.setattr(planner, "rtf_table", lambda: {})
+    monkeypatch.setattr(variables, "MODEL", "small")
+    durations = {
+        Path(ROOT, "a.wav"): 3600.0,
+        Path(ROOT, "tiny (quality = low)", "b.wav"): 1800.0,
+        Path(ROOT, "tiny (quality = low)", "sub", "c.wav"): 1800.0,
+    }
+
+    result = planner.estimate(durations, workers=2, root=ROOT)
+
+    assert result["files"] == 3
+    assert result["audio_hours"] == pytest.approx(2.0)
+    assert result["models"]["small"]["rtf"] == planner.DEFAULT_RTF["small"]
+    assert not result["models"]["tiny"]["measured"]
+    worker_hours = 1.0 * 0.8 + 1.0 * 0.15
+    assert result["worker_hours"] == pytest.approx(worker_hours)
+    assert result["wall_hours"] == pytest.approx(worker_hours / 2)
+    assert result["folders"]["."]["files"] == 1
+    assert result["folders"]["tiny (quality = low)"]["files"] == 2
+
+
+def test_estimate_weights_measured_rtf_by_audio_hours(
+    monkeypatch: Any,
+) -> None:
+    table = {
+        "base": {
+            "en": {"rtf": 0.2, "cpu_rtf": 0.8, "hours": 3.0, "files": 3},
+            "ru": {"rtf": 0.6, "cpu_rtf": 2.4, "hours": 1.0, "files": 1},
+        }
+    }
+    monkeypatch.setattr(planner, "rtf_table", lambda: table)
+
+    result = planner.estimate(
+        {Path(ROOT, "base (quality = 2)", "a.wav"): 7200.0},
+        workers=1,
+        root=ROOT,
+        depth=0,
+    )
+
+    model = result["models"]["base"]
+    assert model["measured"]
+    assert model["rtf"] == pytest.approx(0.3)
+    assert result["cpu_hours"] == pytest.approx(2 * 1.2)
+    assert list(result["folders"]) == ["."]
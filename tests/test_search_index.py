@@ -0,0 +1,104 @@
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+import search_index
+import variables
+
+REPORT = (
+    "Транскрибирование аудиофайла:\n /share/in/a.wav\n"
+    "В файле используется яванский язык. \n"
+    "Транскрибирование выполнено с помощью модели 'Whisper.small' \n"
+    "-------------------- \n"
+    "Разбор по сегментам. \n"
+    "-------------------- \n"
+    "ID элемента: 0 Начало: 0 --- Конец: 4 \n"
+    "Исходный текст: Sugeng enjing \n"
+    "-------------------- \n"
+    "ID элемента: 1 Начало: 4 --- Конец: 9 \n"
+    "Исходный текст: piye kabare \n"
+    "-------------------- \n"
+    "ID элемента: 0 Начало: 0 --- Конец: 9 \n"
+    "Английский текст: Good morning, how are you \n"
+    "Русский: Доброе утро, как дела \n"
+)
+
+
+@pytest.fixture
+def index(tmp_path: Path, monkeypatch: Any) -> Iterator[Path]:
+    monkeypatch.setattr(variables, "CACHE_DIR", Path(tmp_path, "cache"))
+    monkeypatch.setattr(variables, "SEARCH_INDEX", True)
+    search_index._connection.cache_clear()
+    yield Path(tmp_path, "in")
+    search_index._connection().close()
+    search_index._connection.cache_clear()
+
+
+def test_parse_report() -> None:
+    report = search_index.parse_report(REPORT)
+
+    assert report is not None
+    assert report["file"] == "/share/in/a.wav"
+    assert report["lang"] == "jw"
+    assert report["model"] == "small"
+    assert [s["text"] for s in report["original"]] == [
+        "Sugeng enjing",
+        "piye kabare",
+    ]
+    assert report["english"] == [
+        {"start": 0, "end": 9, "text": "Good morning, how are you"}
+    ]
+    assert report["russian"] == ["Доброе утро, как дела"]
+    assert search_index.parse_report("текст без заголовка") is None
+
+
+def test_align_by_segment_middle() -> None:
+    english = [
+        {"start": 0.0, "end": 5.0, "text": "a"},
+        {"start": 5.0, "end": 10.0, "text": "b"},
+    ]
+    original = [
+        {"start": 0.0, "end": 2.0, "text": " one"},
+        {"start": 2.0, "end": 6.0, "text": " two"},
+        {"start": 6.0, "end": 9.0, "text": " three"},
+    ]
+
+    assert search_index._align(original, english) == ["one two", "three"]
+    assert search_index._align(original, []) == []
+
+
+def test_backfill_skips_unchanged_results(index: Path) -> None:
+    index.mkdir()
+    txt_file = Path(index, "a.txt")
+    txt_file.write_text(REPORT, encoding="utf-8")
+
+    assert search_index.backfill(index) == 1
+    assert search_index.backfill(index) == 0
+    [result] = search_index.search("morning")
+    assert result["original"] == "Sugeng enjing piye kabare"
+    assert result["lang"] == "jw"
+
+    # (имя файла).txt заменен: файл добавляется в индекс заново
+    mtime = time.time() + 60
+    os.utime(txt_file, (mtime, mtime))
+    assert search_index.backfill(index) == 1
+
+
+def test_backfill_keeps_files_indexed_during_processing(index: Path) -> None:
+    index.mkdir()
+    search_index.add(
+        "/share/in/a.wav",
+        "jw",
+        "small",
+        [],
+        [{"start": 0.25, "end": 9.5, "text": " Good morning"}],
+        ["Доброе утро"],
+    )
+    # результат записывается после добавления в индекс
+    Path(index, "a.txt").write_text(REPORT, encoding="utf-8")
+
+    assert search_index.backfill(index) == 0
+    [result] = search_index.search("morning")
+    assert result["start_ms"] == 250
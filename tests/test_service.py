@@ -0,0 +1,193 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import pytest
+import service
+import variables
+
+
+@pytest.fixture
+def uploads(tmp_path: Path, monkeypatch: Any) -> Path:
+    monkeypatch.setattr(variables, "SERVICE_QUEUE_SIZE", 1)
+    monkeypatch.setattr(
+        variables, "SERVICE_UPLOAD_DIR", Path(tmp_path, "uploads")
+    )
+    return Path(tmp_path, "uploads")
+
+
+def _run(
+    test: Callable[[service.TranscribService, int], Awaitable[None]],
+    worker: bool = False,
+) -> None:
+    async def main() -> None:
+        transcrib_service = service.TranscribService()
+        server = await asyncio.start_server(
+            transcrib_service.handle, "127.0.0.1", 0
+        )
+        port = server.sockets[0].getsockname()[1]
+        tasks = (
+            [asyncio.create_task(transcrib_service.worker())] if worker else []
+        )
+        try:
+            async with server:
+                await asyncio.wait_for(test(transcrib_service, port), 30)
+        finally:
+            for task in tasks:
+                task.cancel()
+            transcrib_service.executor.shutdown(wait=True)
+
+    asyncio.run(main())
+
+
+async def _request(
+    port: int,
+    head: str,
+    body: bytes = b"",
+    before_body: Optional[Callable[[], None]] = None,
+) -> Tuple[int, bytes]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(head.encode("latin-1") + b"\r\n")
+    await writer.drain()
+    if before_body is not None:
+        await asyncio.sleep(0.1)
+        before_body()
+    writer.write(body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    status_line, _, rest = response.partition(b"\r\n")
+    _, _, data = rest.partition(b"\r\n\r\n")
+    return int(status_line.split()[1]), data
+
+
+def _post(length: int, content_type: str = "audio/wav") -> str:
+    return (
+        f"POST /jobs?filename=a.wav HTTP/1.1\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {length}\r\n"
+    )
+
+
+def _chunks(data: bytes) -> List[Dict[str, Any]]:
+    # разбор ответа Transfer-Encoding: chunked (NDJSON)
+    lines = b""
+    while data:
+        size, _, data = data.partition(b"\r\n")
+        if int(size, 16) == 0:
+            break
+        lines += data[: int(size, 16)]
+        data = data[int(size, 16) + 2 :]
+    return [json.loads(line) for line in lines.splitlines()]
+
+
+def test_queue_full_during_upload_returns_429(uploads: Path) -> None:
+    async def test(
+        transcrib_service: service.TranscribService, port: int
+    ) -> None:
+        def fill_queue() -> None:
+            transcrib_service.queue.put_nowait(service.Job(Path("b.wav")))
+
+        status, data = await _request(
+            port, _post(4), b"data", before_body=fill_queue
+        )
+        assert status == 429
+        assert json.loads(data) == {"error": "queue is full, retry later"}
+        # загруженный файл удален вместе с директорией задания
+        assert not list(uploads.rglob("a.wav"))
+
+        status, _ = await _request(port, _post(4), b"data")
+        assert status == 429
+
+    _run(test)
+
+
+@pytest.mark.parametrize("path", ["/etc/passwd", "{root}/../outside.wav"])
+def test_path_outside_input_dir_is_forbidden(uploads: Path, path: str) -> None:
+    body = json.dumps(
+        {"path": path.format(root=variables.DIR_SOUND_IN)}
+    ).encode()
+
+    async def test(
+        transcrib_service: service.TranscribService, port: int
+    ) -> None:
+        status, data = await _request(
+            port, _post(len(body), "application/json"), body
+        )
+        assert status == 403
+        assert "DIR_SOUND_IN" in json.loads(data)["error"]
+        assert transcrib_service.queue.empty()
+
+    _run(test)
+
+
+def test_job_events_are_streamed(uploads: Path, monkeypatch: Any) -> None:
+    def transcrib_file(
+        file: Path,
+        listener: Callable[[Dict[str, Any]], None],
+        wait_memory: bool,
+    ) -> str:
+        assert file.read_bytes() == b"data"
+        assert wait_memory
+        listener({"event": "progress", "stage": "transcribe", "percent": 50})
+        listener({"event": "segment", "start": 0.0, "end": 2.0, "text": "a"})
+        file.with_suffix(".txt").write_text("text")
+        return "text"
+
+    monkeypatch.setattr(service.main_process, "transcrib_file", transcrib_file)
+
+    async def test(
+        transcrib_service: service.TranscribService, port: int
+    ) -> None:
+        status, data = await _request(port, _post(4), b"data")
+        assert status == 202
+        job_id = json.loads(data)["id"]
+
+        status, data = await _request(
+            port, f"GET /jobs/{job_id}/stream HTTP/1.1\r\n"
+        )
+        assert status == 200
+        events = _chunks(data)
+        assert [event["event"] for event in events] == [
+            "processing",
+            "progress",
+            "segment",
+            "done",
+        ]
+        await transcrib_service.queue.join()
+        assert transcrib_service.jobs[job_id].result == "text"
+        # директория загрузки (с результатом) удалена после обработки
+        assert not any(uploads.iterdir())
+
+    _run(test, worker=True)
+
+
+def test_search_passes_filters(uploads: Path, monkeypatch: Any) -> None:
+    calls: List[Dict[str, Any]] = []
+
+    def search(query: str, **filters: Any) -> List[Dict[str, Any]]:
+        calls.append({"query": query, **filters})
+        return [{"path": "/share/in/a.wav"}]
+
+    monkeypatch.setattr(service.search_index, "search", search)
+
+    async def test(
+        transcrib_service: service.TranscribService, port: int
+    ) -> None:
+        status, data = await _request(
+            port,
+            "GET /search?q=hello&lang=en&since=2024-01-01&limit=5 "
+            "HTTP/1.1\r\n",
+        )
+        assert status == 200
+        assert json.loads(data) == {"results": [{"path": "/share/in/a.wav"}]}
+
+    _run(test)
+
+    [call] = calls
+    assert call["query"] == "hello"
+    assert call["lang"] == "en"
+    assert call["model"] is None
+    assert call["since"] is not None and call["until"] is None
+    assert call["limit"] == 5
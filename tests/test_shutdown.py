@@ -0,0 +1,118 @@
+import os
+import socket
+import subprocess
+import zipfile
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import archive_process
+import file_process
+import numpy as np
+import pytest
+import shutdown
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen(["true"])
+    process.wait()
+    return process.pid
+
+
+def _write_marker(
+    marker: Path,
+    host: Optional[str] = None,
+    pid: Optional[int] = None,
+    boot: Optional[str] = None,
+) -> None:
+    owner = shutdown.marker_owner().split()
+    if host is not None:
+        owner[1] = host
+    if pid is not None:
+        owner[3] = str(pid)
+    if boot is not None:
+        owner[5] = boot
+    marker.write_text(
+        "during the transcription process ...\n"
+        "time start 10:00:00 (UTC) - 01 Jan 2026\n" + " ".join(owner),
+        encoding="utf-8",
+    )
+
+
+@pytest.mark.parametrize(
+    "owner, adopted",
+    [
+        ({"pid": None}, False),
+        ({"pid": os.getppid()}, False),
+        ({"pid": "dead"}, True),
+        ({"pid": None, "boot": "other-boot"}, True),
+        ({"pid": "dead", "host": f"not-{socket.gethostname()}"}, False),
+    ],
+    ids=["own pid", "live pid", "dead pid", "other boot", "other host"],
+)
+def test_adopt_marker(tmp_path: Path, owner: dict, adopted: bool) -> None:
+    marker = Path(tmp_path, "a.proc")
+    if owner["pid"] == "dead":
+        owner = {**owner, "pid": _dead_pid()}
+    _write_marker(marker, **owner)
+
+    assert shutdown.adopt_marker(marker) == adopted
+    assert marker.exists() != adopted
+    assert shutdown.failed_attempts(Path(tmp_path, "a.wav")) == int(adopted)
+
+
+def test_marker_without_owner_is_kept(tmp_path: Path) -> None:
+    marker = Path(tmp_path, "a.proc")
+    marker.write_text("during the transcription process ... ")
+    assert not shutdown.adopt_marker(marker)
+    assert marker.exists()
+
+
+def test_adopted_archive_marker_is_not_a_failure(tmp_path: Path) -> None:
+    marker = Path(tmp_path, "archive.zip.proc")
+    _write_marker(marker, pid=_dead_pid())
+    assert shutdown.adopt_marker(marker, record=False)
+    assert shutdown.failed_attempts(marker) == 0
+
+
+def test_file_is_skipped_after_max_attempts(tmp_path: Path) -> None:
+    file = Path(tmp_path, "a.wav")
+    file.write_bytes(b"audio")
+    for attempt in range(1, shutdown.MAX_ATTEMPTS + 1):
+        assert shutdown.record_failure(file, RuntimeError("boom")) == attempt
+    assert "boom" in file.with_suffix(".failed").read_text()
+
+    assert not file_process.check_file_must_trascrib(file)
+
+    shutdown.clear_failures(file)
+    assert shutdown.failed_attempts(file) == 0
+
+
+def test_archive_member_failures(tmp_path: Path, monkeypatch: Any) -> None:
+    archive = Path(tmp_path, "archive.zip")
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.wav", b"x" * 5000)
+        zf.writestr("b.wav", b"x" * 5000)
+    monkeypatch.setattr(
+        archive_process,
+        "_decode_member",
+        lambda name, stream: np.zeros(16000, dtype=np.float32),
+    )
+    capped = archive_process._member_path(archive, "a.wav")
+    capped.parent.mkdir(parents=True)
+    for _ in range(shutdown.MAX_ATTEMPTS):
+        shutdown.record_failure(capped, "boom")
+    calls = []
+
+    def transcribe(
+        path: Path, duration: float, load: Callable[[], np.ndarray]
+    ) -> Optional[str]:
+        calls.append(path.name)
+        load()
+        raise RuntimeError("boom")
+
+    index = archive_process.process_archive(archive, transcribe)
+
+    assert calls == ["b.wav"]
+    assert index["members"]["a.wav"]["status"] == "failed"
+    assert index["members"]["b.wav"]["status"] == "pending"
+    assert not index["complete"]
@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+import staging
+import variables
+
+
+@pytest.fixture
+def outbox(tmp_path: Path, monkeypatch: Any) -> Path:
+    monkeypatch.setattr(variables, "STAGING_PREFETCH", 1)
+    monkeypatch.setattr(variables, "STAGING_RETRIES", 1)
+    monkeypatch.setattr(staging, "OUTBOX_DIR", Path(tmp_path, "out"))
+    monkeypatch.setattr(
+        staging, "TARGETS_DIR", Path(tmp_path, "out", ".targets")
+    )
+    share = Path(tmp_path, "share")
+    share.mkdir()
+    return share
+
+
+def test_result_is_written_before_marker_is_removed(outbox: Path) -> None:
+    marker = Path(outbox, "a.proc")
+    marker.write_text("during the transcription process ...")
+    staging.write_text(Path(outbox, "a.txt"), "result")
+    staging.remove(marker)
+    assert staging.flush(10)
+    assert Path(outbox, "a.txt").read_text() == "result"
+    assert not marker.exists()
+    assert not staging.pending(Path(outbox, "a.txt"))
+
+
+def test_unsent_result_is_pending_and_replayed(outbox: Path) -> None:
+    result = Path(outbox, "later", "a.txt")
+    partial = Path(outbox, "later", "a.partial")
+    staging.write_text(result, "result")
+    staging.append_text(partial, "segment")
+    assert staging.flush(10)
+    # директория на сетевом ресурсе недоступна: результат ждет переноса
+    assert staging.pending(result)
+
+    # следующий запуск: временные файлы обработки не переносятся
+    result.parent.mkdir()
+    assert staging.replay() == 1
+    assert staging.flush(10)
+    assert result.read_text() == "result"
+    assert not staging.pending(result)
+    assert not staging.pending(partial)
+    assert not partial.exists()
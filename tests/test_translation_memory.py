@@ -0,0 +1,42 @@
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import pytest
+import translation_memory
+import variables
+
+
+@pytest.fixture
+def memory(tmp_path: Path, monkeypatch: Any) -> Iterator[None]:
+    monkeypatch.setattr(variables, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(variables, "TRANSLATION_MEMORY_SIZE", 100)
+    translation_memory._connection.cache_clear()
+    yield
+    translation_memory._connection().close()
+    translation_memory._connection.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "text, normalized",
+    [
+        ("  Hello,\n\tworld  ", "Hello, world"),
+        ("Cafe\u0301", "Caf\u00e9"),
+        ("one two", "one two"),
+    ],
+)
+def test_normalize(text: str, normalized: str) -> None:
+    assert translation_memory.normalize(text) == normalized
+
+
+def test_repeated_phrase_is_translated_once(memory: None) -> None:
+    calls: List[str] = []
+
+    def translator(text: str) -> List[Dict[str, str]]:
+        calls.append(text)
+        return [{"translation_text": "Привет"}]
+
+    first = translation_memory.translate(translator, " Hello ", "model")
+    again = translation_memory.translate(translator, "Hello\n", "model")
+
+    assert first == again == "Привет"
+    assert calls == [" Hello "]
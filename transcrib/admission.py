@@ -0,0 +1,346 @@
+"""
+Модуль управляет допуском заданий к обработке по объему памяти.
+
+Перед обработкой файла оценивается необходимая память (модель Whisper,
+переводчик, длительность аудио и размер спектрограммы). Задание
+запускается, только если вместе с памятью других процессов обработки
+на хосте оно укладывается в MEMORY_BUDGET_MB. Иначе, в зависимости от
+MEMORY_POLICY, задание откладывается (queue) или обрабатывается меньшей
+моделью, которая укладывается в бюджет (downgrade).
+
+Резервирования всех процессов хоста хранятся в файле
+memory_reservations.json в CACHE_DIR (доступ под блокировкой fcntl).
+Для каждого процесса учитывается большее из зарезервированного объема
+и фактической памяти процесса (PSS, а если недоступна - RSS). Из
+фактической памяти процесса вычитаются веса загруженных моделей Whisper,
+которые будут выгружены при загрузке модели задания (см. set_resident),
+поэтому меньшая модель политики downgrade укладывается в бюджет. Если
+веса моделей общие для процессов (MODEL_SHARE_MODE), их память
+резервируется один раз основным процессом и не входит в оценку заданий.
+
+Def:
+    estimate_mb(model, duration) -> float: Оценивает память задания.
+    memory_budget_mb() -> float: Возвращает бюджет памяти хоста.
+    process_rss_mb(pid) -> float: Возвращает фактическую память процесса.
+    process_pss_mb(pid) -> float: Возвращает долю процесса в памяти хоста
+                (с делением общих страниц между процессами).
+    share_models(models) -> None: Резервирует память общих весов моделей.
+    set_resident(models) -> None: Запоминает модели Whisper, загруженные
+                в память процесса.
+    reserve(file, model, duration) -> Iterator[Optional[str]]: Допускает
+                задание к обработке и резервирует для него память.
+    current_reservation() -> Dict: Возвращает текущие резервирования.
+"""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import logger_settings
+import variables
+
+# Память модели Whisper (веса float32 и рабочие буферы декодера), МБ
+MODEL_MEMORY_MB: Dict[str, float] = {
+    "tiny": 400,
+    "base": 600,
+    "small": 1500,
+    "medium": 4000,
+    "large": 8000,
+}
+# Память переводчика Helsinki-NLP/opus-mt-en-ru, МБ
+TRANSLATOR_MEMORY_MB = 1200
+# Модели в порядке уменьшения качества (для политики downgrade)
+DOWNGRADE_ORDER = ["large", "medium", "small", "base", "tiny"]
+# Файл резервирований памяти процессов хоста
+RESERVATIONS_FILE = Path(variables.CACHE_DIR, "memory_reservations.json")
+
+MB = 1024 * 1024
+
+# Модели, веса которых общие для процессов обработки (см. share_models)
+_shared_models: Set[str] = set()
+# Модели Whisper в памяти процесса, выгружаемые при загрузке другой модели
+# (см. set_resident)
+_resident: Set[str] = set()
+
+
+def _model_size(model: str) -> str:
+    return model.split(".")[0].split("-")[0]
+
+
+def estimate_mb(model: str, duration: float, shared: bool = False) -> float:
+    """
+    Оценивает память, необходимую для обработки аудиофайла.
+
+    Учитываются веса модели Whisper и переводчика, декодированный сигнал
+    (float32, 16 кГц, с копиями при обработке), лог-мел спектрограмма
+    (80 или 128 мел-полос, с дополнением 30 секунд) и текст отчета.
+
+    Args:
+        model (str): Тип модели Whisper.
+        duration (float): Длительность аудиофайла в секундах.
+        shared (bool): Веса моделей общие для процессов
+            (зарезервированы основным процессом, см. share_models).
+
+    Returns:
+        float: Оценка в мегабайтах.
+    """
+    size = _model_size(model)
+    n_mels = 128 if size == "large" else 80
+    audio_mb = duration * 16000 * 4 * 3 / MB
+    mel_mb = (duration + 30) * 100 * n_mels * 4 * 2 / MB
+    report_mb = duration * 0.01
+    weights_mb = 0 if shared else _model_memory_mb(size) + TRANSLATOR_MEMORY_MB
+    return weights_mb + audio_mb + mel_mb + report_mb
+
+
+def memory_budget_mb() -> float:
+    """
+    Возвращает бюджет памяти хоста для процессов обработки.
+
+    Если MEMORY_BUDGET_MB не задан, бюджет - 90% от меньшего из объема
+    памяти хоста и лимита памяти cgroup.
+
+    Returns:
+        float: Бюджет в мегабайтах.
+    """
+    if variables.MEMORY_BUDGET_MB > 0:
+        return variables.MEMORY_BUDGET_MB
+    limits = []
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemTotal:"):
+                    limits.append(int(line.split()[1]) / 1024)
+    except OSError:
+        pass
+    for cgroup_file in (
+        "/sys/fs/cgroup/memory.max",
+        "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+    ):
+        try:
+            value = Path(cgroup_file).read_text().strip()
+        except OSError:
+            continue
+        if value.isdigit() and int(value) < 2**60:
+            limits.append(int(value) / MB)
+    return 0.9 * min(limits) if limits else float("inf")
+
+
+def process_rss_mb(pid: int) -> float:
+    """
+    Возвращает фактическую память процесса (RSS).
+
+    Args:
+        pid (int): Идентификатор процесса.
+
+    Returns:
+        float: RSS в мегабайтах (0, если процесс не найден).
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / MB
+
+
+def process_pss_mb(pid: int) -> float:
+    """
+    Возвращает долю процесса в памяти хоста (PSS): общие с другими
+    процессами страницы (веса моделей после fork или mmap) делятся
+    между процессами.
+
+    Args:
+        pid (int): Идентификатор процесса.
+
+    Returns:
+        float: PSS в мегабайтах (RSS, если PSS недоступна).
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            for line in smaps:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return process_rss_mb(pid)
+
+
+@contextmanager
+def _ledger() -> Iterator[Dict[str, Any]]:
+    # файл резервирований читается и изменяется под блокировкой,
+    # записи завершившихся процессов удаляются
+    RESERVATIONS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESERVATIONS_FILE, "a+", encoding="utf-8") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            try:
+                ledger = json.loads(f.read() or "{}")
+            except ValueError:
+                ledger = {}
+            ledger = {
+                pid: entry
+                for pid, entry in ledger.items()
+                if Path(f"/proc/{pid}").exists()
+            }
+            yield ledger
+            f.seek(0)
+            f.truncate()
+            json.dump(ledger, f, ensure_ascii=False, indent=2)
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _used_by_others(ledger: Dict[str, Any]) -> float:
+    own_pid = str(os.getpid())
+    return sum(
+        max(entry["reserved_mb"], process_pss_mb(int(pid)))
+        for pid, entry in ledger.items()
+        if pid != own_pid
+    )
+
+
+def _model_memory_mb(model: str) -> float:
+    return MODEL_MEMORY_MB.get(_model_size(model), MODEL_MEMORY_MB["large"])
+
+
+def _admit(file: Path, model: str, duration: float) -> Optional[str]:
+    budget = memory_budget_mb()
+    own_pss = process_pss_mb(os.getpid())
+    candidates = [model]
+    if variables.MEMORY_POLICY == "downgrade":
+        size = _model_size(model)
+        if size in DOWNGRADE_ORDER:
+            candidates += DOWNGRADE_ORDER[DOWNGRADE_ORDER.index(size) + 1 :]
+    with _ledger() as ledger:
+        used = _used_by_others(ledger)
+        for candidate in candidates:
+            shared = _model_size(candidate) in _shared_models
+            # веса моделей, которые выгружаются при загрузке модели
+            # задания, не остаются в памяти процесса
+            unloaded = sum(
+                _model_memory_mb(resident)
+                for resident in _resident
+                if resident != candidate
+            )
+            need = max(
+                estimate_mb(candidate, duration, shared), own_pss - unloaded
+            )
+            if used + need <= budget:
+                ledger[str(os.getpid())] = {
+                    "reserved_mb": round(need),
+                    "file": str(file),
+                    "model": candidate,
+                }
+                return candidate
+        ledger[str(os.getpid())] = {"reserved_mb": 0, "file": "", "model": ""}
+    logger_settings.logger.info(
+        f"Недостаточно памяти для обработки файла {file} моделью {model}: "
+        f"занято {used:.0f} МБ из {budget:.0f} МБ"
+    )
+    return None
+
+
+def _release() -> None:
+    with _ledger() as ledger:
+        ledger[str(os.getpid())] = {"reserved_mb": 0, "file": "", "model": ""}
+
+
+@contextmanager
+def reserve(
+    file: Path, model: str, duration: float
+) -> Iterator[Optional[str]]:
+    """
+    Допускает задание к обработке и резервирует для него память
+    до выхода из контекста.
+
+    Args:
+        file (Path): Путь к аудиофайлу.
+        model (str): Тип модели Whisper для файла.
+        duration (float): Длительность аудиофайла в секундах.
+
+    Yields:
+        Optional[str]: Модель для обработки (исходная или меньшая
+            при политике downgrade) или None, если задание нужно отложить.
+    """
+    admitted = _admit(file, model, duration)
+    if admitted is not None and admitted != model:
+        logger_settings.logger.warning(
+            f"Недостаточно памяти для модели {model}, файл {file} "
+            f"будет обработан моделью {admitted}"
+        )
+    try:
+        yield admitted
+    finally:
+        if admitted is not None:
+            _release()
+
+
+def current_reservation() -> Dict[str, Any]:
+    """
+    Возвращает текущие резервирования памяти процессов хоста.
+
+    Returns:
+        Dict: Бюджет, общий занятый объем и резервирования по процессам
+            (зарезервировано и фактически занято, МБ).
+    """
+    with _ledger() as ledger:
+        processes = {
+            pid: {**entry, "rss_mb": round(process_pss_mb(int(pid)))}
+            for pid, entry in ledger.items()
+        }
+    return {
+        "budget_mb": round(memory_budget_mb()),
+        "used_mb": round(
+            sum(
+                max(entry["reserved_mb"], entry["rss_mb"])
+                for entry in processes.values()
+            )
+        ),
+        "processes": processes,
+    }
+
+
+def share_models(models: List[str]) -> None:
+    """
+    Резервирует память весов моделей, общих для процессов обработки
+    (за основным процессом), чтобы задания процессов обработки
+    не учитывали эти веса повторно.
+
+    Args:
+        models (list[str]): Типы моделей Whisper с общими весами.
+
+    Returns:
+        None
+    """
+    _shared_models.update(_model_size(model) for model in models)
+    reserved = TRANSLATOR_MEMORY_MB + sum(
+        _model_memory_mb(size) for size in _shared_models
+    )
+    with _ledger() as ledger:
+        ledger[str(os.getpid())] = {
+            "reserved_mb": round(reserved),
+            "file": "",
+            "model": ",".join(sorted(_shared_models)),
+        }
+
+
+def set_resident(models: Iterable[str]) -> None:
+    """
+    Запоминает модели Whisper, загруженные в память процесса
+    и выгружаемые при загрузке другой модели: при допуске задания
+    их веса не учитываются в фактической памяти процесса, если модель
+    задания другая.
+
+    Args:
+        models (Iterable[str]): Типы моделей Whisper.
+
+    Returns:
+        None
+    """
+    _resident.clear()
+    _resident.update(models)
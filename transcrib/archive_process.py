@@ -0,0 +1,438 @@
+"""
+Модуль обрабатывает аудиофайлы внутри архивов (zip, tar, tar.gz)
+без распаковки архивов на сетевой ресурс.
+
+Архив рассматривается как директория: аудиофайлы архива (по EXTENSIONS)
+читаются за один последовательный проход по архиву и потоком передаются
+в канал ffmpeg (pipe:0), который декодирует их в сигнал 16 кГц без
+записи аудиофайла на диск и без чтения файла целиком в память (форматы,
+требующие поиска по файлу, - через временный файл в CACHE_DIR). Файл
+декодируется после допуска задания по бюджету памяти (см. admission):
+до декодирования длительность оценивается по размеру файла.
+Результаты сохраняются в директорию (имя архива).results рядом
+с архивом с той же структурой, что и внутри архива: (имя файла).txt,
+а также .proc и .partial во время обработки.
+
+Состояние обработки каждого файла архива хранится в index.json
+директории результатов (для архива того же размера и времени
+изменения), поэтому обработанные файлы при повторном проходе
+пропускаются. Файл, обработка которого не удалась MAX_ATTEMPTS раз
+(см. shutdown), получает состояние failed и больше не обрабатывается.
+Во время обработки рядом с архивом создается временный файл
+(имя архива).proc.
+
+Def:
+    get_archives(path) -> list[Path]: Возвращает список архивов.
+    results_dir(archive) -> Path: Возвращает директорию результатов.
+    check_archive_must_process(archive) -> bool: Проверяет, есть ли
+                в архиве необработанные аудиофайлы.
+    decode(source, stream) -> np.ndarray: Декодирует аудио с помощью ffmpeg.
+    process_archive(archive, transcribe) -> Dict: Обрабатывает
+                аудиофайлы архива.
+"""
+
+import datetime
+import fnmatch
+import json
+import os
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import threading
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import IO, Any, Callable, Dict, Iterator, Optional, Tuple
+
+import logger_settings
+import numpy as np
+import shutdown
+import variables
+import whisper
+
+# Форматы, требующие поиска по файлу (индекс mp4 в конце файла):
+# декодируются через временный файл
+SEEK_SUFFIXES = (".mp4", ".m4a", ".m4b", ".mov", ".3gp")
+# Наименьший битрейт сжатого аудио (8 кбит/с), байт в секунду: оценка
+# длительности файла архива сверху для допуска до декодирования
+MIN_BYTES_PER_SECOND = 1000
+# Размер блока передачи в ffmpeg и копирования во временный файл
+CHUNK_SIZE = 1024 * 1024
+# Файл состояния обработки файлов архива
+INDEX_NAME = "index.json"
+
+
+def get_archives(path_in: Path) -> list[Path]:
+    """
+    Возвращает список архивов в указанной директории
+    с расширениями ARCHIVE_EXTENSIONS.
+
+    Args:
+        path_in (Path): Входной путь для поиска архивов.
+
+    Returns:
+        list[Path]: Список путей к архивам.
+    """
+    archives: list[Path] = []
+    for ext in variables.ARCHIVE_EXTENSIONS:
+        archives.extend(Path(path_in).rglob(ext))
+    return sorted(set(archives))
+
+
+def results_dir(archive: Path) -> Path:
+    """
+    Возвращает директорию результатов обработки архива.
+
+    Args:
+        archive (Path): Путь к архиву.
+
+    Returns:
+        Path: Директория (имя архива).results рядом с архивом.
+    """
+    return Path(archive.parent, f"{archive.name}.results")
+
+
+def _marker(archive: Path) -> Path:
+    return Path(archive.parent, f"{archive.name}.proc")
+
+
+def _is_audio(name: str) -> bool:
+    return any(
+        fnmatch.fnmatch(PurePosixPath(name).name.lower(), ext.lower())
+        for ext in variables.EXTENSIONS
+    )
+
+
+def _member_path(archive: Path, name: str) -> Path:
+    # путь внутри архива не должен выходить за директорию результатов
+    parts = [p for p in PurePosixPath(name).parts if p not in ("/", "..")]
+    return Path(results_dir(archive), *parts)
+
+
+def _read_index(archive: Path) -> Dict[str, Any]:
+    stat = archive.stat()
+    try:
+        with open(
+            Path(results_dir(archive), INDEX_NAME), encoding="utf-8"
+        ) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    # если архив заменен, состояние обработки начинается заново
+    if (
+        index.get("size") != stat.st_size
+        or index.get("mtime_ns") != stat.st_mtime_ns
+    ):
+        index = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "complete": False,
+            "members": {},
+        }
+    return index
+
+
+def _write_index(archive: Path, index: Dict[str, Any]) -> None:
+    # запись через временный файл, чтобы не оставить недописанный индекс
+    path = Path(results_dir(archive), INDEX_NAME)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def check_archive_must_process(archive: Path) -> bool:
+    """
+    Проверяет, есть ли в архиве необработанные аудиофайлы.
+
+    Args:
+        archive (Path): Путь к архиву.
+
+    Returns:
+        bool: True, если архив нужно обработать.
+    """
+    if not archive.is_file():
+        logger_settings.logger.debug("Архив не найден. {}", archive)
+        return False
+    # временный файл, оставленный завершенным процессом этого хоста,
+    # удаляется
+    marker = _marker(archive)
+    if marker.is_file() and not shutdown.adopt_marker(marker, record=False):
+        logger_settings.logger.debug("Архив в процессе обработки. {}", archive)
+        return False
+    if _read_index(archive)["complete"]:
+        logger_settings.logger.debug("Архив уже обработан. {}", archive)
+        return False
+    return True
+
+
+def _iter_members(archive: Path) -> Iterator[Tuple[str, int, IO[bytes]]]:
+    # файлы архива перебираются в порядке их расположения в архиве,
+    # поэтому архив читается последовательно один раз
+    if zipfile.is_zipfile(archive):
+        with zipfile.ZipFile(archive) as zf:
+            infos = sorted(zf.infolist(), key=lambda i: i.header_offset)
+            for info in infos:
+                if info.is_dir():
+                    continue
+                with zf.open(info) as stream:
+                    yield info.filename, info.file_size, stream
+        return
+    # потоковый режим tar: без поиска по архиву, с любым сжатием
+    with tarfile.open(archive, mode="r|*") as tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            member_stream = tf.extractfile(member)
+            if member_stream is not None:
+                yield member.name, member.size, member_stream
+
+
+class SkippedMember(Exception):
+    """Длительность файла архива вне допустимых пределов."""
+
+
+def decode(source: str, stream: Optional[IO[bytes]] = None) -> np.ndarray:
+    """
+    Декодирует аудио с помощью ffmpeg в сигнал 16 кГц моно
+    (так же, как whisper.load_audio).
+
+    Args:
+        source (str): Путь к файлу или "pipe:0" для данных из потока.
+        stream (IO[bytes], optional): Поток аудиофайла для "pipe:0"
+            (передается в ffmpeg блоками в отдельном потоке).
+
+    Returns:
+        np.ndarray: Сигнал 16 кГц (float32).
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads",
+        "0",
+        "-i",
+        source,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(whisper.audio.SAMPLE_RATE),
+        "-",
+    ]
+    if stream is None:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    else:
+        out = _decode_stream(cmd, stream)
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def _decode_stream(cmd: list[str], stream: IO[bytes]) -> bytes:
+    # поток передается в stdin ffmpeg в отдельном потоке, пока основной
+    # поток читает сигнал из stdout (stderr - во временный файл, чтобы
+    # заполненный канал не остановил ffmpeg)
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=stderr,
+        )
+        errors: list[BaseException] = []
+
+        def feed() -> None:
+            assert process.stdin is not None
+            try:
+                while chunk := stream.read(CHUNK_SIZE):
+                    process.stdin.write(chunk)
+            except BrokenPipeError:
+                # ffmpeg завершился раньше (ошибка - по коду возврата)
+                pass
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+
+        feeder = threading.Thread(target=feed, name="ffmpeg-feed")
+        feeder.start()
+        assert process.stdout is not None
+        with process.stdout:
+            out = process.stdout.read()
+        feeder.join()
+        code = process.wait()
+        if errors:
+            # ошибка чтения архива
+            raise errors[0]
+        if code:
+            stderr.seek(0)
+            raise subprocess.CalledProcessError(
+                code, cmd, out, stderr.read()[-4096:]
+            )
+    return out
+
+
+def _decode_member(name: str, stream: IO[bytes]) -> np.ndarray:
+    suffix = PurePosixPath(name).suffix
+    if suffix.lower() not in SEEK_SUFFIXES:
+        return decode("pipe:0", stream)
+    # файл копируется из архива во временный файл
+    # в том же последовательном проходе
+    variables.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(
+        suffix=suffix, dir=variables.CACHE_DIR
+    ) as tmp:
+        shutil.copyfileobj(stream, tmp, CHUNK_SIZE)
+        tmp.flush()
+        return decode(tmp.name)
+
+
+def process_archive(
+    archive: Path,
+    transcribe: Callable[
+        [Path, float, Callable[[], np.ndarray]], Optional[str]
+    ],
+) -> Dict[str, Any]:
+    """
+    Обрабатывает аудиофайлы архива за один последовательный проход.
+
+    Args:
+        archive (Path): Путь к архиву.
+        transcribe (Callable): Функция обработки аудиофайла: принимает
+            путь для результатов ((имя архива).results/(путь в архиве)),
+            оценку длительности сверху (для допуска по бюджету памяти)
+            и функцию декодирования сигнала, которую вызывает после
+            допуска; возвращает текст результата или None, если файл
+            не обработан.
+
+    Returns:
+        Dict: Состояние обработки файлов архива (index.json).
+    """
+    marker = _marker(archive)
+    time_start = datetime.datetime.now(datetime.timezone.utc)
+    marker.write_text(
+        f"during the transcription process ...\n"
+        f"time start {time_start.strftime('%H:%M:%S (UTC) - %d %b %Y')}\n"
+        f"{shutdown.marker_owner()}",
+        encoding="utf-8",
+    )
+    index = _read_index(archive)
+    members = index["members"]
+    complete = True
+    logger_settings.logger.info(f"Обработка архива\n {archive}")
+    try:
+        for name, size, stream in _iter_members(archive):
+            if shutdown.requested():
+                # остальные файлы архива - после перезапуска
+                complete = False
+                break
+            if not _is_audio(name):
+                continue
+            path = _member_path(archive, name)
+            state = members.get(name, {}).get("status")
+            if (
+                state in ("done", "skipped", "failed")
+                or path.with_suffix(".txt").is_file()
+            ):
+                members.setdefault(name, {"status": "done", "size": size})
+                continue
+            decoded: Dict[str, float] = {}
+
+            def load(
+                name: str = name, stream: IO[bytes] = stream
+            ) -> np.ndarray:
+                audio = _decode_member(name, stream)
+                decoded["duration"] = len(audio) / whisper.audio.SAMPLE_RATE
+                if (
+                    decoded["duration"] == 0
+                    or decoded["duration"] > variables.DURATION_LIMIT
+                ):
+                    raise SkippedMember(name)
+                return audio
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # временный файл, оставленный завершенным процессом
+            # (с записью неудачной попытки обработки файла)
+            shutdown.adopt_marker(path.with_suffix(".proc"))
+            attempts = shutdown.failed_attempts(path)
+            if attempts >= shutdown.MAX_ATTEMPTS:
+                members[name] = {
+                    "status": "failed",
+                    "size": size,
+                    "attempts": attempts,
+                }
+                _write_index(archive, index)
+                continue
+            try:
+                result = transcribe(
+                    path,
+                    min(variables.DURATION_LIMIT, size / MIN_BYTES_PER_SECOND),
+                    load,
+                )
+            except SkippedMember:
+                logger_settings.logger.debug(
+                    "Файл {} архива пропущен, длительность {} сек.",
+                    name,
+                    decoded["duration"],
+                )
+                members[name] = {
+                    "status": "skipped",
+                    "size": size,
+                    "duration": round(decoded["duration"], 2),
+                }
+                _write_index(archive, index)
+                continue
+            except (OSError, subprocess.CalledProcessError) as e:
+                logger_settings.logger.warning(
+                    f"Не удалось декодировать файл {name} "
+                    f"архива {archive}: {e}"
+                )
+                members[name] = {"status": "error", "size": size}
+                _write_index(archive, index)
+                continue
+            except Exception:
+                # попытка записана (см. main.transcrib_file), файл
+                # обрабатывается повторно при следующем проходе
+                logger_settings.logger.exception(
+                    f"Ошибка обработки файла {name} архива {archive}"
+                )
+                complete = False
+                members[name] = {
+                    "status": "pending",
+                    "size": size,
+                    "attempts": shutdown.failed_attempts(path),
+                }
+                _write_index(archive, index)
+                continue
+            if result is None:
+                complete = False
+                members[name] = {"status": "pending", "size": size}
+            else:
+                members[name] = {
+                    "status": "done",
+                    "size": size,
+                    "duration": round(decoded.get("duration", 0.0), 2),
+                    "txt": str(
+                        path.with_suffix(".txt").relative_to(
+                            results_dir(archive)
+                        )
+                    ),
+                }
+            _write_index(archive, index)
+    except (OSError, tarfile.TarError, zipfile.BadZipFile) as e:
+        logger_settings.logger.error(f"Ошибка чтения архива {archive}: {e}")
+        complete = False
+    finally:
+        marker.unlink(missing_ok=True)
+    index["complete"] = complete
+    _write_index(archive, index)
+    counts: Dict[str, int] = {}
+    for member in members.values():
+        counts[member["status"]] = counts.get(member["status"], 0) + 1
+    logger_settings.logger.info(f"Архив {archive} обработан: {counts}")
+    return index
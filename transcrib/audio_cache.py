@@ -0,0 +1,310 @@
+"""
+Модуль кэширует результаты декодирования аудиофайлов.
+
+Для каждого аудиофайла (ключ - хэш содержимого исходного файла,
+до изменения частоты дискретизации) в директории
+AUDIO_CACHE_DIR хранятся:
+    pcm.npy          декодированный сигнал 16 кГц (float32), читается
+                     через отображение в память;
+    mel<n_mels>.npy  лог-мел спектрограмма для 80 или 128 мел-полос
+                     (с дополнением 30 секунд тишины, как в Whisper);
+    meta.json        язык, определенный каждой моделью Whisper.
+Повторная обработка файла другой моделью переходит сразу к кодировщику.
+Старые записи удаляются (LRU), когда объем кэша превышает
+AUDIO_CACHE_SIZE_MB.
+
+Def:
+    file_hash(file) -> str: Возвращает хэш содержимого файла.
+    cache_key(file) -> str: Возвращает ключ кэша для исходного файла.
+    is_cached(key) -> bool: Проверяет наличие сигнала в кэше.
+    load_audio(file, key) -> Tuple[str, np.ndarray]: Возвращает ключ кэша
+                и декодированный сигнал.
+    load_mel(key, audio, n_mels) -> torch.Tensor: Возвращает
+                лог-мел спектрограмму сигнала.
+    get_language(key, model) -> Optional[str]: Возвращает язык,
+                определенный моделью ранее.
+    set_language(key, model, lang) -> None: Сохраняет определенный язык.
+    use_mel(audio, mel) -> Iterator[None]: Подставляет готовую
+                спектрограмму в model.transcribe.
+    stats() -> Dict[str, Dict[str, int]]: Возвращает счетчики
+                попаданий и промахов кэша.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import logger_settings
+import numpy as np
+import torch
+import variables
+import whisper
+import whisper_adapter
+
+# Счетчики попаданий и промахов кэша по видам данных
+STATS: Dict[str, Dict[str, int]] = {
+    kind: {"hit": 0, "miss": 0} for kind in ("pcm", "mel", "lang")
+}
+# Размер блока чтения файла при вычислении хэша
+CHUNK_SIZE = 1024 * 1024
+
+
+def _enabled() -> bool:
+    return variables.AUDIO_CACHE_SIZE_MB > 0
+
+
+def file_hash(file: Path) -> str:
+    """
+    Возвращает хэш содержимого файла.
+
+    Хэш запоминается для пути, размера и времени изменения файла,
+    поэтому повторные вызовы не читают файл заново.
+
+    Args:
+        file (Path): Путь к файлу.
+
+    Returns:
+        str: Хэш содержимого (blake2b).
+    """
+    stat = Path(file).stat()
+    return _file_hash(str(file), stat.st_size, stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=4096)
+def _file_hash(file: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry(key: str) -> Path:
+    return Path(variables.AUDIO_CACHE_DIR, key)
+
+
+def _touch(entry: Path) -> None:
+    # время изменения директории записи - время последнего обращения (LRU)
+    try:
+        os.utime(entry)
+    except OSError:
+        pass
+
+
+def _save_array(path: Path, array: np.ndarray) -> None:
+    # запись через временный файл, чтобы другие процессы
+    # не прочитали недописанный массив
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def cache_key(file: Path) -> str:
+    """
+    Возвращает ключ кэша для исходного аудиофайла.
+
+    Ключ нужно получить до изменения файла (change_sampling_rate),
+    чтобы повторная обработка того же исходного файла находила сигнал
+    в кэше.
+
+    Args:
+        file (Path): Путь к аудиофайлу.
+
+    Returns:
+        str: Ключ кэша (пустая строка, если кэш отключен).
+    """
+    return file_hash(file) if _enabled() else ""
+
+
+def is_cached(key: str) -> bool:
+    """
+    Проверяет наличие декодированного сигнала в кэше.
+
+    Args:
+        key (str): Ключ кэша (cache_key).
+
+    Returns:
+        bool: True, если сигнал есть в кэше.
+    """
+    return bool(key) and Path(_entry(key), "pcm.npy").is_file()
+
+
+def load_audio(
+    file: Path, key: Optional[str] = None
+) -> Tuple[str, np.ndarray]:
+    """
+    Возвращает декодированный сигнал 16 кГц из кэша
+    или декодирует файл с помощью ffmpeg и сохраняет сигнал в кэш.
+
+    Args:
+        file (Path): Путь к аудиофайлу.
+        key (str, optional): Ключ кэша, полученный для исходного файла
+            до его изменения (по умолчанию - cache_key(file)).
+
+    Returns:
+        Tuple[str, np.ndarray]: Ключ кэша (пустая строка,
+            если кэш отключен) и сигнал.
+    """
+    if not _enabled():
+        return "", whisper.load_audio(str(file))
+    key = key or cache_key(file)
+    entry = _entry(key)
+    pcm_path = Path(entry, "pcm.npy")
+    if pcm_path.is_file():
+        STATS["pcm"]["hit"] += 1
+        _touch(entry)
+        return key, np.load(pcm_path, mmap_mode="r")
+    STATS["pcm"]["miss"] += 1
+    audio = whisper.load_audio(str(file))
+    _save_array(pcm_path, audio)
+    evict()
+    return key, audio
+
+
+def load_mel(key: str, audio: np.ndarray, n_mels: int) -> torch.Tensor:
+    """
+    Возвращает лог-мел спектрограмму сигнала, дополненного 30 секундами
+    тишины (такую же спектрограмму вычисляет model.transcribe).
+
+    Args:
+        key (str): Ключ кэша (пустая строка - без кэширования).
+        audio (np.ndarray): Сигнал 16 кГц.
+        n_mels (int): Количество мел-полос модели (80 или 128).
+
+    Returns:
+        torch.Tensor: Спектрограмма.
+    """
+    mel_path = Path(_entry(key), f"mel{n_mels}.npy")
+    if key and mel_path.is_file():
+        STATS["mel"]["hit"] += 1
+        return torch.from_numpy(np.load(mel_path))
+    if key:
+        STATS["mel"]["miss"] += 1
+    mel = whisper.log_mel_spectrogram(
+        torch.from_numpy(np.array(audio)),
+        n_mels,
+        padding=whisper.audio.N_SAMPLES,
+    )
+    if key:
+        _save_array(mel_path, mel.numpy())
+        evict()
+    return mel
+
+
+def _read_meta(key: str) -> Dict[str, Any]:
+    try:
+        with open(Path(_entry(key), "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_language(key: str, model: str) -> Optional[str]:
+    """
+    Возвращает язык, определенный ранее моделью Whisper.
+
+    Args:
+        key (str): Ключ кэша.
+        model (str): Тип модели Whisper.
+
+    Returns:
+        Optional[str]: Код языка или None.
+    """
+    if not key:
+        return None
+    lang = _read_meta(key).get("languages", {}).get(model)
+    STATS["lang"]["hit" if lang else "miss"] += 1
+    return lang
+
+
+def set_language(key: str, model: str, lang: str) -> None:
+    """
+    Сохраняет язык, определенный моделью Whisper.
+
+    Args:
+        key (str): Ключ кэша.
+        model (str): Тип модели Whisper.
+        lang (str): Код языка.
+
+    Returns:
+        None
+    """
+    if not key:
+        return
+    meta = _read_meta(key)
+    meta.setdefault("languages", {})[model] = lang
+    meta_path = Path(_entry(key), "meta.json")
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = meta_path.with_name(f".meta.json.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+@contextmanager
+def use_mel(audio: np.ndarray, mel: torch.Tensor) -> Iterator[None]:
+    """
+    Подставляет готовую спектрограмму в model.transcribe
+    вместо повторного вычисления для сигнала audio
+    (см. whisper_adapter).
+
+    Args:
+        audio (np.ndarray): Сигнал, передаваемый в model.transcribe.
+        mel (torch.Tensor): Спектрограмма этого сигнала (load_mel).
+
+    Yields:
+        None
+    """
+
+    def log_mel(source: Any, n_mels: int) -> Optional[torch.Tensor]:
+        if source is audio and mel.shape[0] == n_mels:
+            return mel
+        return None
+
+    with whisper_adapter.hooks(log_mel=log_mel):
+        yield
+
+
+def evict() -> None:
+    """
+    Удаляет записи, к которым дольше всего не обращались,
+    пока объем кэша превышает AUDIO_CACHE_SIZE_MB.
+
+    Returns:
+        None
+    """
+    cache_dir = Path(variables.AUDIO_CACHE_DIR)
+    if not cache_dir.is_dir():
+        return
+    entries = []
+    total = 0
+    for entry in cache_dir.iterdir():
+        if not entry.is_dir():
+            continue
+        size = sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+        entries.append((entry.stat().st_mtime, size, entry))
+        total += size
+    budget = variables.AUDIO_CACHE_SIZE_MB * 1024 * 1024
+    for _, size, entry in sorted(entries):
+        if total <= budget:
+            break
+        shutil.rmtree(entry, ignore_errors=True)
+        total -= size
+        logger_settings.logger.debug(f"Запись удалена из кэша аудио: {entry}")
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    """
+    Возвращает счетчики попаданий и промахов кэша.
+
+    Returns:
+        Dict[str, Dict[str, int]]: Счетчики для pcm, mel и lang.
+    """
+    return {kind: dict(counters) for kind, counters in STATS.items()}
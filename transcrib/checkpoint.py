@@ -0,0 +1,235 @@
+"""
+Модуль сохраняет контрольные точки обработки аудиофайлов.
+
+Во время обработки длинного файла не реже одного раза в
+CHECKPOINT_INTERVAL секунд (на границе окна декодирования Whisper
+или сегмента перевода) в локальный файл CACHE_DIR/checkpoints/<хэш>.json
+записываются: определенный язык, результаты завершенных этапов Whisper,
+сегменты и позиция текущего этапа, готовые переводы на русский.
+Контрольная точка записывается также при прерывании обработки по сигналу
+завершения (см. shutdown). При повторной обработке того же файла
+(та же модель, та же длительность сигнала) завершенные этапы
+не выполняются, а текущий этап продолжается с сохраненной позиции.
+Контрольная точка удаляется после сохранения результата.
+
+Class:
+    Checkpoint: Контрольная точка обработки одного аудиофайла.
+Def:
+    cleanup() -> None: Удаляет устаревшие контрольные точки.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import logger_settings
+import shutdown
+import variables
+from file_progress import FileProgress
+
+# Директория контрольных точек
+CHECKPOINT_DIR = Path(variables.CACHE_DIR, "checkpoints")
+# Срок хранения контрольных точек незавершенных файлов, дней
+MAX_AGE_DAYS = 7
+# Поля сегментов Whisper, сохраняемые в контрольной точке
+SEGMENT_KEYS = ("id", "start", "end", "text")
+
+
+class Checkpoint:
+    """
+    Контрольная точка обработки одного аудиофайла.
+
+    Attributes:
+        file (Path): Путь к аудиофайлу.
+        path (Path): Путь к файлу контрольной точки.
+        state (dict): Сохраняемое состояние обработки.
+        resumed (bool): Обработка продолжена с контрольной точки.
+    """
+
+    def __init__(self, file: Path, model: str) -> None:
+        """
+        Args:
+            file (Path): Путь к аудиофайлу.
+            model (str): Тип модели Whisper.
+        """
+        self.file = Path(file)
+        self.path = Path(
+            CHECKPOINT_DIR,
+            f"{hashlib.sha1(str(file).encode()).hexdigest()}.json",
+        )
+        self.state: Dict[str, Any] = {
+            "file": str(file),
+            "model": model,
+            "samples": 0,
+            "lang": None,
+            "stages": {},
+            "translations_ru": [],
+        }
+        self.resumed = False
+        self._saved = time.monotonic()
+
+    def restore(self, samples: int) -> None:
+        """
+        Загружает сохраненную контрольную точку файла, если она
+        соответствует модели и длительности сигнала.
+
+        Args:
+            samples (int): Количество отсчетов декодированного сигнала.
+
+        Returns:
+            None
+        """
+        self.state["samples"] = samples
+        try:
+            saved = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if all(
+            saved.get(key) == self.state[key]
+            for key in ("file", "model", "samples")
+        ):
+            self.state = saved
+            self.resumed = True
+            logger_settings.logger.info(
+                f"Обработка файла продолжается с контрольной точки: "
+                f"{self.path}"
+            )
+
+    @property
+    def lang(self) -> Optional[str]:
+        """Язык, определенный при предыдущей обработке."""
+        return self.state["lang"]
+
+    @lang.setter
+    def lang(self, lang: str) -> None:
+        self.state["lang"] = lang
+
+    def stage(self, stage: str) -> Dict[str, Any]:
+        """
+        Возвращает сохраненное состояние этапа Whisper.
+
+        Args:
+            stage (str): Этап (transcribe, translate_en).
+
+        Returns:
+            Dict: complete (этап завершен), done (позиция в секундах),
+                segments (готовые сегменты), text (текст завершенного
+                этапа); пустой словарь, если этап не начинался.
+        """
+        return self.state["stages"].get(stage, {})
+
+    def complete_stage(self, stage: str, result: Dict[str, Any]) -> None:
+        """
+        Сохраняет результат завершенного этапа Whisper.
+
+        Args:
+            stage (str): Этап (transcribe, translate_en).
+            result (Dict): Результат model.transcribe.
+
+        Returns:
+            None
+        """
+        self.state["stages"][stage] = {
+            "complete": True,
+            "text": result["text"],
+            "segments": [
+                {key: segment[key] for key in SEGMENT_KEYS}
+                for segment in result["segments"]
+            ],
+        }
+        self.save()
+
+    def translations(self) -> List[str]:
+        """
+        Возвращает сохраненные переводы сегментов на русский.
+
+        Returns:
+            List[str]: Переводы первых сегментов английского текста.
+        """
+        return list(self.state["translations_ru"])
+
+    def watch(self, progress: FileProgress) -> None:
+        """
+        Сохраняет контрольную точку на границах окон декодирования
+        и сегментов перевода файла и прерывает обработку, если запрошено
+        завершение процесса.
+
+        Args:
+            progress (FileProgress): Состояние обработки файла.
+
+        Returns:
+            None
+        """
+        progress.window_hooks.append(self._on_window)
+
+    def _on_window(self, progress: FileProgress) -> None:
+        if progress.stage == "translate_ru":
+            self.state["translations_ru"] = [
+                segment["text"] for segment in progress.segments
+            ]
+        else:
+            self.state["stages"][progress.stage] = {
+                "complete": False,
+                "done": progress.done,
+                "segments": list(progress.segments),
+            }
+        if shutdown.should_interrupt(progress.remaining()):
+            self.save()
+            logger_settings.logger.warning(
+                f"Обработка файла:\n {self.file}\n прервана для завершения "
+                f"процесса (этап {progress.stage}, обработано "
+                f"{progress.done:.0f} из {progress.duration:.0f} сек.)"
+            )
+            raise shutdown.Interrupted(str(self.file))
+        if time.monotonic() - self._saved >= variables.CHECKPOINT_INTERVAL:
+            self.save()
+
+    def save(self) -> None:
+        """
+        Записывает контрольную точку (через временный файл).
+
+        Returns:
+            None
+        """
+        self._saved = time.monotonic()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(
+                json.dumps(self.state, ensure_ascii=False), encoding="utf-8"
+            )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger_settings.logger.warning(
+                f"Не удалось сохранить контрольную точку {self.path}: {e}"
+            )
+
+    def remove(self) -> None:
+        """
+        Удаляет контрольную точку после сохранения результата.
+
+        Returns:
+            None
+        """
+        self.path.unlink(missing_ok=True)
+
+
+def cleanup() -> None:
+    """
+    Удаляет контрольные точки, не изменявшиеся дольше MAX_AGE_DAYS дней.
+
+    Returns:
+        None
+    """
+    if not CHECKPOINT_DIR.is_dir():
+        return
+    oldest = time.time() - MAX_AGE_DAYS * 24 * 3600
+    for path in CHECKPOINT_DIR.iterdir():
+        try:
+            if path.stat().st_mtime < oldest:
+                path.unlink()
+        except OSError:
+            continue
@@ -0,0 +1,321 @@
+"""
+Модуль настраивает количество потоков torch и привязку процесса к ядрам
+с учетом топологии процессоров хоста.
+
+Определяются доступные ядра, узлы NUMA (сокеты) и квота CPU cgroup.
+Каждый процесс обработки (WORKER_INDEX из WORKERS_PER_HOST) привязывается
+к своей группе ядер внутри одного узла NUMA, а количество потоков torch
+выбирается по размеру модели Whisper или берется из результатов
+калибровки (файл cpu_tuning.json в CACHE_DIR).
+
+Калибровка (измерение коэффициента реального времени при разном
+количестве потоков и сохранение лучшей настройки):
+    python transcrib/cpu_tuning.py <аудиофайл> [--models small,large]
+                                   [--seconds 60]
+
+Def:
+    available_cpus() -> list[int]: Возвращает ядра, доступные процессу.
+    numa_nodes() -> list[list[int]]: Возвращает ядра по узлам NUMA.
+    cgroup_cpu_limit() -> Optional[float]: Возвращает квоту CPU cgroup.
+    worker_cpus(worker_index, workers) -> list[int]: Возвращает ядра
+                для процесса обработки.
+    threads_for_model(model) -> int: Возвращает количество потоков torch
+                для модели Whisper.
+    configure(worker_index) -> None: Привязывает процесс к ядрам
+                и задает количество потоков torch.
+    set_threads_for_model(model) -> None: Задает количество потоков torch
+                для модели Whisper.
+    calibrate(audio_file, models, seconds) -> Dict: Измеряет скорость
+                обработки и сохраняет лучшую настройку.
+"""
+
+import argparse
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import logger_settings
+import torch
+import variables
+import whisper
+
+# Максимальное полезное количество потоков torch для моделей Whisper
+# (больше потоков не ускоряет декодирование небольших моделей)
+MAX_THREADS: Dict[str, int] = {
+    "tiny": 2,
+    "base": 4,
+    "small": 8,
+    "medium": 12,
+    "large": 16,
+}
+# Количество потоков для параллельного выполнения независимых операций
+INTEROP_THREADS = 1
+# Файл с результатами калибровки
+CALIBRATION_FILE = Path(variables.CACHE_DIR, "cpu_tuning.json")
+
+# Ядра, доступные процессу до привязки (наследуются процессами,
+# запущенными через fork после загрузки модуля)
+_INITIAL_CPUS = sorted(os.sched_getaffinity(0))
+_worker_cpus: List[int] = list(_INITIAL_CPUS)
+
+
+def _parse_cpulist(cpulist: str) -> List[int]:
+    cpus: List[int] = []
+    for part in cpulist.strip().split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+
+def available_cpus() -> List[int]:
+    """
+    Возвращает ядра, доступные процессу (до привязки к ядрам).
+
+    Returns:
+        list[int]: Номера ядер.
+    """
+    return list(_INITIAL_CPUS)
+
+
+def numa_nodes() -> List[List[int]]:
+    """
+    Возвращает доступные процессу ядра, сгруппированные по узлам NUMA.
+    Если узлы NUMA не описаны, ядра группируются по сокетам.
+
+    Returns:
+        list[list[int]]: Номера ядер каждого узла.
+    """
+    cpus = set(available_cpus())
+    nodes: List[List[int]] = []
+    for node in sorted(Path("/sys/devices/system/node").glob("node[0-9]*")):
+        try:
+            node_cpus = _parse_cpulist((node / "cpulist").read_text())
+        except OSError:
+            continue
+        node_cpus = [cpu for cpu in node_cpus if cpu in cpus]
+        if node_cpus:
+            nodes.append(node_cpus)
+    if not nodes:
+        sockets: Dict[str, List[int]] = {}
+        for cpu in sorted(cpus):
+            package = Path(
+                f"/sys/devices/system/cpu/cpu{cpu}",
+                "topology/physical_package_id",
+            )
+            socket = package.read_text().strip() if package.is_file() else "0"
+            sockets.setdefault(socket, []).append(cpu)
+        nodes = list(sockets.values())
+    return nodes
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    Возвращает квоту CPU cgroup (v2 или v1) в количестве ядер.
+
+    Returns:
+        Optional[float]: Квота или None, если квота не задана.
+    """
+    cpu_max = Path("/sys/fs/cgroup/cpu.max")
+    try:
+        if cpu_max.is_file():
+            quota, period = cpu_max.read_text().split()
+            return None if quota == "max" else int(quota) / int(period)
+        quota_file = Path("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period_file = Path("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if quota_file.is_file() and period_file.is_file():
+            quota_us = int(quota_file.read_text())
+            if quota_us > 0:
+                return quota_us / int(period_file.read_text())
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def worker_cpus(worker_index: int, workers: int) -> List[int]:
+    """
+    Возвращает ядра для процесса обработки.
+
+    Процессы распределяются по узлам NUMA по кругу, ядра узла делятся
+    поровну между процессами этого узла. Если процессов больше, чем ядер
+    в узле, несколько процессов получают одни и те же ядра.
+
+    Args:
+        worker_index (int): Номер процесса обработки (с 0).
+        workers (int): Количество процессов обработки на хосте.
+
+    Returns:
+        list[int]: Номера ядер.
+    """
+    nodes = numa_nodes()
+    node = nodes[worker_index % len(nodes)]
+    # процессы, попавшие в тот же узел
+    node_workers = len(range(worker_index % len(nodes), workers, len(nodes)))
+    position = worker_index // len(nodes)
+    share = max(1, len(node) // max(1, node_workers))
+    start = (position * share) % len(node)
+    return node[start : start + share]
+
+
+def _load_calibration() -> Dict[str, Any]:
+    try:
+        with open(CALIBRATION_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def threads_for_model(model: str) -> int:
+    """
+    Возвращает количество потоков torch для модели Whisper.
+
+    Используется результат калибровки, если он получен для того же
+    количества ядер процесса, иначе - оценка по размеру модели,
+    ядрам процесса и квоте CPU cgroup.
+
+    Args:
+        model (str): Тип модели Whisper.
+
+    Returns:
+        int: Количество потоков.
+    """
+    model = model.split(".")[0].split("-")[0]
+    cpus = len(_worker_cpus)
+    calibration = _load_calibration()
+    if calibration.get("cpus") == cpus:
+        calibrated = calibration.get("models", {}).get(model)
+        if calibrated:
+            return int(calibrated["threads"])
+    threads = min(cpus, MAX_THREADS.get(model, cpus))
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        share = limit / max(1, variables.WORKERS_PER_HOST)
+        threads = min(threads, max(1, math.floor(share)))
+    return max(1, threads)
+
+
+def configure(worker_index: int = variables.WORKER_INDEX) -> None:
+    """
+    Привязывает процесс к ядрам своего узла NUMA (если CPU_PINNING)
+    и задает количество потоков torch.
+
+    Args:
+        worker_index (int): Номер процесса обработки на хосте.
+
+    Returns:
+        None
+    """
+    global _worker_cpus
+    if variables.CPU_PINNING:
+        _worker_cpus = worker_cpus(worker_index, variables.WORKERS_PER_HOST)
+        os.sched_setaffinity(0, _worker_cpus)
+    else:
+        _worker_cpus = available_cpus()
+    try:
+        torch.set_num_interop_threads(INTEROP_THREADS)
+    except RuntimeError:
+        # количество потоков задается один раз до начала вычислений
+        pass
+    torch.set_num_threads(threads_for_model(variables.MODEL))
+    logger_settings.logger.info(
+        f"Процесс обработки {worker_index}: ядра {_worker_cpus}, "
+        f"потоков torch {torch.get_num_threads()}, "
+        f"квота CPU cgroup {cgroup_cpu_limit()}"
+    )
+
+
+def set_threads_for_model(model: str) -> None:
+    """
+    Задает количество потоков torch для модели Whisper.
+
+    Args:
+        model (str): Тип модели Whisper.
+
+    Returns:
+        None
+    """
+    threads = threads_for_model(model)
+    if torch.get_num_threads() != threads:
+        torch.set_num_threads(threads)
+        logger_settings.logger.debug(
+            f"Потоков torch для модели {model}: {threads}"
+        )
+
+
+def calibrate(
+    audio_file: Path, models: List[str], seconds: float = 60
+) -> Dict[str, Any]:
+    """
+    Измеряет коэффициент реального времени (время обработки / длительность
+    аудио) при разном количестве потоков torch и сохраняет лучшую
+    настройку для каждой модели в файл калибровки.
+
+    Args:
+        audio_file (Path): Аудиофайл для измерений.
+        models (list[str]): Типы моделей Whisper.
+        seconds (float): Длительность фрагмента аудио в секундах.
+
+    Returns:
+        Dict: Результаты калибровки.
+    """
+    audio = whisper.load_audio(str(audio_file))
+    audio = audio[: int(seconds * whisper.audio.SAMPLE_RATE)]
+    duration = len(audio) / whisper.audio.SAMPLE_RATE
+    cpus = len(_worker_cpus)
+    candidates = sorted(
+        {1, cpus} | {2**i for i in range(1, cpus.bit_length()) if 2**i < cpus}
+    )
+    calibration = _load_calibration()
+    if calibration.get("cpus") != cpus:
+        calibration = {"cpus": cpus, "models": {}}
+    for model_name in models:
+        model = whisper.load_model(model_name)
+        results: Dict[str, float] = {}
+        for threads in candidates:
+            torch.set_num_threads(threads)
+            time_start = time.perf_counter()
+            model.transcribe(audio, fp16=False)
+            rtf = (time.perf_counter() - time_start) / duration
+            results[str(threads)] = round(rtf, 4)
+            logger_settings.logger.info(
+                f"Калибровка {model_name}: потоков {threads}, "
+                f"коэффициент реального времени {rtf:.3f}"
+            )
+        best = min(results, key=results.__getitem__)
+        calibration["models"][model_name.split(".")[0].split("-")[0]] = {
+            "threads": int(best),
+            "rtf": results[best],
+            "results": results,
+        }
+        del model
+    CALIBRATION_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(CALIBRATION_FILE, "w", encoding="utf-8") as f:
+        json.dump(calibration, f, indent=2)
+    logger_settings.logger.info(f"Калибровка сохранена: {CALIBRATION_FILE}")
+    return calibration
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Калибровка количества потоков torch"
+    )
+    parser.add_argument("audio_file", type=Path, help="аудиофайл")
+    parser.add_argument(
+        "--models",
+        default=variables.MODEL,
+        help="модели Whisper через запятую",
+    )
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        default=60,
+        help="длительность фрагмента аудио в секундах",
+    )
+    args = parser.parse_args()
+    configure()
+    calibrate(args.audio_file, args.models.split(","), args.seconds)
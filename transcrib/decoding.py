@@ -0,0 +1,178 @@
+"""
+Модуль содержит профили декодирования Whisper (скорость/точность).
+
+Профиль объединяет параметры model.transcribe (температуры повторного
+декодирования, beam search, best of, учет предыдущего текста, пороги
+повторного декодирования) и жесткое ограничение времени декодирования
+одного 30-секундного окна. Через window_timeout секунд от начала
+декодирования окна декодирование завершается (токен конца текста),
+оставшиеся повторные декодирования окна (fallback с более высокой
+температурой) не выполняются и используется полученный результат.
+
+Профиль выбирается по директории качества обработки (QUALITY_PROFILES,
+по аналогии с моделью в quality.get_the_model_whisper), для файлов в корне
+входной директории - DECODING_PROFILE.
+
+Def:
+    get_profile(file) -> str: Возвращает профиль декодирования
+                в соответствии с директорией расположения файла.
+    transcribe_options(profile) -> Dict: Возвращает параметры
+                model.transcribe для профиля.
+    track(model, profile, stats) -> Iterator[Dict]: Ограничивает время
+                декодирования окон и считает повторные декодирования.
+"""
+
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+import logger_settings
+import variables
+import whisper_adapter
+
+# Профили декодирования (window_timeout - предельное время
+# декодирования одного окна в секундах, 0 - без ограничения)
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {
+        "temperature": (0.0, 0.4, 0.8),
+        "beam_size": None,
+        "best_of": None,
+        "condition_on_previous_text": False,
+        "compression_ratio_threshold": 2.4,
+        "logprob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+        "window_timeout": 30,
+    },
+    "balanced": {
+        "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "beam_size": None,
+        "best_of": None,
+        "condition_on_previous_text": True,
+        "compression_ratio_threshold": 2.4,
+        "logprob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+        "window_timeout": 60,
+    },
+    "accurate": {
+        "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "beam_size": 5,
+        "best_of": 5,
+        "condition_on_previous_text": True,
+        "compression_ratio_threshold": 2.4,
+        "logprob_threshold": -1.0,
+        "no_speech_threshold": 0.6,
+        "window_timeout": 180,
+    },
+}
+
+# Сопоставление директорий качества обработки с профилями декодирования
+QUALITY_PROFILES: Dict[str, str] = {
+    "tiny (quality = low)": "fast",
+    "base (quality = 2)": "fast",
+    "small (quality = 3)": "balanced",
+    "medium (quality = 4)": "balanced",
+    "large (quality = max)": "accurate",
+}
+
+
+def get_profile(file: Union[Path, str]) -> str:
+    """
+    Возвращает профиль декодирования
+        в соответствии с директорией расположения файла.
+
+    Args:
+        file (Union[Path, str]): Путь к файлу.
+
+    Returns:
+        str: Название профиля.
+    """
+    file_str = str(file)
+    return next(
+        (value for key, value in QUALITY_PROFILES.items() if key in file_str),
+        variables.DECODING_PROFILE,
+    )
+
+
+def transcribe_options(profile: str) -> Dict[str, Any]:
+    """
+    Возвращает параметры model.transcribe для профиля декодирования.
+
+    Args:
+        profile (str): Название профиля.
+
+    Returns:
+        Dict: Параметры (без window_timeout; параметры со значением None
+            не передаются).
+    """
+    return {
+        key: value
+        for key, value in PROFILES[profile].items()
+        if key != "window_timeout" and value is not None
+    }
+
+
+@contextmanager
+def track(
+    model: Any, profile: str, stats: Optional[Dict[str, int]] = None
+) -> Iterator[Dict[str, int]]:
+    """
+    Ограничивает время декодирования окон модели и считает
+    повторные декодирования (fallback) внутри контекста
+    (см. whisper_adapter).
+
+    model.transcribe декодирует одно окно (model.decode) при каждой
+    температуре, пока результат не пройдет пороги. Повторный вызов
+    для того же окна считается повторным декодированием. Через
+    window_timeout профиля от начала декодирования окна декодирование
+    завершается внутри шага (whisper_adapter), а вместо повторных
+    декодирований окна возвращается полученный результат.
+
+    Args:
+        model (whisper.Whisper): Модель Whisper.
+        profile (str): Название профиля.
+        stats (Dict, optional): Счетчики для накопления (windows,
+            fallbacks, timeouts).
+
+    Yields:
+        Dict[str, int]: Счетчики окон, повторных декодирований
+            и прерванных по времени окон.
+    """
+    if stats is None:
+        stats = {"windows": 0, "fallbacks": 0, "timeouts": 0}
+    timeout = PROFILES[profile]["window_timeout"]
+    # текущее окно, время начала его декодирования и последний результат
+    window: Dict[str, Any] = {
+        "segment": None,
+        "start": 0.0,
+        "result": None,
+        "timed_out": False,
+    }
+
+    def decode_window(decode: Any, segment: Any, options: Any) -> Any:
+        if segment is not window["segment"]:
+            window.update(
+                segment=segment,
+                start=time.perf_counter(),
+                timed_out=False,
+            )
+            stats["windows"] += 1
+        elif window["timed_out"]:
+            return window["result"]
+        else:
+            stats["fallbacks"] += 1
+        deadline = window["start"] + timeout if timeout else None
+        window["result"] = decode(segment, options, deadline=deadline)
+        if deadline is not None and time.perf_counter() >= deadline:
+            window["timed_out"] = True
+            stats["timeouts"] += 1
+            logger_settings.logger.debug(
+                "Декодирование окна остановлено на температуре {} "
+                "через {:.1f} сек.",
+                options.temperature,
+                time.perf_counter() - window["start"],
+            )
+        return window["result"]
+
+    with whisper_adapter.hooks(decode=decode_window):
+        yield stats
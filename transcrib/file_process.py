@@ -8,15 +8,23 @@ Def:
     get_files(path, extensions) -> list: Возвращает список аудиофайлов
                     в указанной директории с указанными расширениями.
     check_file_must_trascrib(file_list) -> list: Возвращает список аудиофайлов,
-                    подлежащих обработке.
+                    подлежащих обработке (вызывается для каждого файла
+                    в каждом цикле, поэтому отладочные сообщения
+                    форматируются только при уровне DEBUG).
     save_text_to_file(text, file_path) -> None: Сохраняет текст
                     в указанный файл.
     file_duration(file_path) -> float: Возвращает длительность аудиофайла
-                    в секундах.
+                    в секундах (из индекса длительностей, если файл
+                    не изменился).
+    file_duration_check(file) -> float: Определяет длительность аудиофайла
+                    с помощью ffmpeg.
 """
 
 import re
+import sqlite3
 import subprocess
+import threading
+from functools import lru_cache
 
 # from multiprocessing import process
 from pathlib import Path
@@ -26,11 +34,15 @@ from typing import Union
 
 import ffmpeg
 import logger_settings
+import shutdown
+import staging
 import variables
 from sympy import Float
 
 # from pydub import AudioSegment
 
+_duration_lock = threading.Lock()
+
 
 def delete_file(file_path: Union[str, Path]) -> None:
     """
@@ -128,33 +140,47 @@ def check_file_must_trascrib(file: Union[str, Path]) -> bool:
     file = Path(file)
     # проверка наличия аудиофайла
     if not file.is_file():
-        logger_settings.logger.debug(f"Файл не найден. {file}")
+        logger_settings.logger.debug("Файл не найден. {}", file)
         return False
     # проверяем наличие текстового фала с транскрибированием
-    elif file.with_suffix(".txt").is_file():
-        logger_settings.logger.debug(f"Файл уже обработан.\n {file}")
+    # (в том числе ожидающего переноса на сетевой ресурс)
+    elif file.with_suffix(".txt").is_file() or staging.pending(
+        file.with_suffix(".txt")
+    ):
+        logger_settings.logger.debug("Файл уже обработан.\n {}", file)
         return False
-    # проверяем наличие текстового фала с транскрибированием
+    # проверяем наличие временного файла процесса обработки
     elif file.with_suffix(".proc").is_file():
-        logger_settings.logger.debug(f"Файл в процессе обработки.\n {file}")
+        # файл, оставленный завершенным процессом этого хоста, удаляется
+        # и аудиофайл принимается в обработку
+        if not shutdown.adopt_marker(file.with_suffix(".proc")):
+            logger_settings.logger.debug(
+                "Файл в процессе обработки.\n {}", file
+            )
+            return False
+    # файл, обработка которого не удалась MAX_ATTEMPTS раз, пропускается
+    if shutdown.failed_attempts(file) >= shutdown.MAX_ATTEMPTS:
+        logger_settings.logger.debug(
+            "Файл пропущен после неудачных попыток обработки.\n {}", file
+        )
         return False
     # проверяем, что длительность аудиофайла меньше заданного лимита
-    duration = file_duration_check(file)
+    duration = file_duration(file)
     if duration > variables.DURATION_LIMIT:
         logger_settings.logger.debug(
-            f"Длительность аудиофайла {file} "
-            f"превышает установленный лимит.\n"
+            "Длительность аудиофайла {} превышает установленный лимит.\n",
+            file,
         )
         return False
     # если не удалось получить длительность аудиофайла
     elif duration == 0:  # битый аудиофайл
         logger_settings.logger.debug(
-            f"Не удалось получить длительность аудиофайла. {file}"
+            "Не удалось получить длительность аудиофайла. {}", file
         )
         return False
     else:
         # файл для обработки
-        logger_settings.logger.debug(f"Файл для обработки\n {file}")
+        logger_settings.logger.debug("Файл для обработки\n {}", file)
         return True
 
 
@@ -202,7 +228,11 @@ def file_duration_check(file: Path) -> float:
             stdout.decode(),
             re.DOTALL,
         ).groupdict()
-        dur = int(matches["minutes"]) * 60 + float(matches["seconds"])
+        dur = (
+            int(matches["hours"]) * 3600
+            + int(matches["minutes"]) * 60
+            + float(matches["seconds"])
+        )
         return dur
         # probe = ffmpeg.probe(file)
         # # Возвращаем длительность в секундах.
@@ -210,3 +240,68 @@ def file_duration_check(file: Path) -> float:
     except BaseException:
         # Если файл не может быть обработан, возвращает 0
         return 0
+
+
+@lru_cache(maxsize=None)
+def _duration_index() -> sqlite3.Connection:
+    path = Path(variables.CACHE_DIR, "durations.sqlite")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS durations ("
+        " path TEXT PRIMARY KEY,"
+        " size INTEGER NOT NULL,"
+        " mtime_ns INTEGER NOT NULL,"
+        " duration REAL NOT NULL)"
+    )
+    return connection
+
+
+def file_duration(file: Union[str, Path]) -> float:
+    """
+    Возвращает длительность аудиофайла в секундах.
+
+    Длительность берется из индекса (CACHE_DIR/durations.sqlite),
+    если размер и время изменения файла не изменились, иначе
+    определяется с помощью ffmpeg и сохраняется в индекс.
+
+    Args:
+        file (Union[str, Path]): Путь к аудиофайлу.
+
+    Returns:
+        float: Длительность в секундах (0, если файл не может
+            быть обработан).
+    """
+    try:
+        stat = Path(file).stat()
+    except OSError:
+        return 0
+    try:
+        with _duration_lock:
+            row = (
+                _duration_index()
+                .execute(
+                    "SELECT duration FROM durations"
+                    " WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (str(file), stat.st_size, stat.st_mtime_ns),
+                )
+                .fetchone()
+            )
+    except sqlite3.Error as e:
+        logger_settings.logger.warning(f"Ошибка индекса длительностей: {e}")
+        return file_duration_check(Path(file))
+    if row is not None:
+        return row[0]
+    duration = file_duration_check(Path(file))
+    try:
+        with _duration_lock:
+            connection = _duration_index()
+            connection.execute(
+                "INSERT OR REPLACE INTO durations VALUES (?, ?, ?, ?)",
+                (str(file), stat.st_size, stat.st_mtime_ns, duration),
+            )
+            connection.commit()
+    except sqlite3.Error as e:
+        logger_settings.logger.warning(f"Ошибка индекса длительностей: {e}")
+    return duration
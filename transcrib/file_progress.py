@@ -0,0 +1,328 @@
+"""
+Модуль отслеживает ход обработки аудиофайла.
+
+Во время обработки временный файл (имя файла).proc дополняется сведениями
+о текущем этапе, количестве обработанных секунд аудио и оценках времени
+до завершения этапа и всей обработки файла, а готовые сегменты
+дописываются в файл (имя файла).partial по мере декодирования каждого
+окна Whisper. После каждого окна вызываются функции window_hooks
+(сохранение контрольной точки, см. checkpoint).
+
+Class:
+    FileProgress: Состояние обработки одного аудиофайла.
+Def:
+    track_whisper(progress) -> Iterator[None]: Перехватывает ход
+                транскрибирования Whisper и передает его в FileProgress.
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import logger_settings
+import staging
+import variables
+import whisper_adapter
+
+# Описание этапов обработки для вывода в файл (имя файла).proc
+STAGES: Dict[str, str] = {
+    "transcribe": "транскрибирование (Whisper)",
+    "translate_en": "перевод на английский (Whisper)",
+    "translate_ru": "перевод на русский (Helsinki-NLP/opus-mt-en-ru)",
+}
+
+# Количество кадров мел-спектрограммы Whisper в одной секунде аудио
+FRAMES_PER_SECOND = 100
+
+# Строка сегмента, которую Whisper выводит при verbose=True
+REGEXP_SEGMENT = re.compile(
+    r"^\[(?:(?P<sh>\d+):)?(?P<sm>\d+):(?P<ss>\d+\.\d+) --> "
+    r"(?:(?P<eh>\d+):)?(?P<em>\d+):(?P<es>\d+\.\d+)\] ?(?P<text>.*)$"
+)
+
+
+class FileProgress:
+    """
+    Состояние обработки одного аудиофайла.
+
+    Attributes:
+        file (Path): Путь к аудиофайлу.
+        duration (float): Длительность аудиофайла в секундах.
+        stage (str): Текущий этап обработки (ключ словаря STAGES).
+        done (float): Количество обработанных секунд аудио на текущем этапе.
+        offset (float): Позиция, с которой продолжен текущий этап
+            (секунды, добавляемые к времени сегментов Whisper).
+        segments (list): Готовые сегменты текущего этапа.
+        listeners (list): Функции, которым передаются события обработки.
+        window_hooks (list): Функции, вызываемые после каждого окна
+            декодирования (или сегмента перевода).
+    """
+
+    def __init__(
+        self,
+        file: Path,
+        header: str,
+        listeners: Optional[List[Callable[[Dict[str, Any]], None]]] = None,
+    ) -> None:
+        """
+        Args:
+            file (Path): Путь к аудиофайлу.
+            header (str): Текст, с которого начинается файл (имя файла).proc.
+            listeners (list, optional): Функции, которым передаются события
+                        "progress" и "segment".
+        """
+        self.file = Path(file)
+        self.proc_file = self.file.with_suffix(".proc")
+        self.partial_file = self.file.with_suffix(".partial")
+        self.header = header
+        self.listeners = listeners or []
+        self.duration = 0.0
+        self.stage = ""
+        self.stages_total = 0
+        self.stage_number = 0
+        self.stage_start = time.monotonic()
+        self.done = 0.0
+        self.offset = 0.0
+        self.segments: List[Dict[str, Any]] = []
+        self.window_hooks: List[Callable[["FileProgress"], None]] = []
+        self._last_write = 0.0
+        staging.write_text(self.partial_file, "")
+
+    def set_stages_total(self, stages_total: int) -> None:
+        """
+        Задает общее количество этапов обработки файла.
+
+        Args:
+            stages_total (int): Количество этапов.
+
+        Returns:
+            None
+        """
+        self.stages_total = stages_total
+
+    def set_stage(self, stage: str) -> None:
+        """
+        Начинает новый этап обработки.
+
+        Args:
+            stage (str): Ключ этапа из словаря STAGES.
+
+        Returns:
+            None
+        """
+        self.stage = stage
+        self.stage_number += 1
+        self.stage_start = time.monotonic()
+        self.done = 0.0
+        self.offset = 0.0
+        self.segments = []
+        staging.append_text(
+            self.partial_file, f"-------------------- \n{STAGES[stage]}:\n"
+        )
+        self.update(0.0, force=True)
+
+    def update(self, seconds_done: float, force: bool = False) -> None:
+        """
+        Обновляет количество обработанных секунд аудио на текущем этапе.
+
+        Файл (имя файла).proc перезаписывается не чаще одного раза
+        в PROGRESS_INTERVAL секунд.
+
+        Args:
+            seconds_done (float): Обработано секунд аудио.
+            force (bool, optional): Перезаписать файл без учета интервала.
+
+        Returns:
+            None
+        """
+        self.done = min(seconds_done, self.duration or seconds_done)
+        now = time.monotonic()
+        if not force and now - self._last_write < variables.PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        eta = self.eta()
+        remaining = self.remaining()
+        staging.write_text(
+            self.proc_file,
+            f"{self.header}\n"
+            f"этап {self.stage_number} из {self.stages_total}: "
+            f"{STAGES.get(self.stage, self.stage)}\n"
+            f"обработано: {self.done:.1f} из {self.duration:.1f} сек.\n"
+            f"до завершения этапа: "
+            f"{'неизвестно' if eta is None else f'{eta:.0f} сек.'}\n"
+            f"до завершения обработки файла: "
+            f"{'неизвестно' if remaining is None else f'{remaining:.0f} сек.'}"
+            f"\n",
+        )
+        self._notify(
+            {
+                "event": "progress",
+                "stage": self.stage,
+                "done": self.done,
+                "duration": self.duration,
+                "eta": eta,
+                "remaining": remaining,
+            }
+        )
+
+    def eta(self) -> Optional[float]:
+        """
+        Оценивает время до завершения текущего этапа.
+
+        Returns:
+            Optional[float]: Оценка в секундах или None,
+                        если оценить время пока нельзя.
+        """
+        if self.done <= self.offset or not self.duration:
+            return None
+        elapsed = time.monotonic() - self.stage_start
+        return (
+            elapsed / (self.done - self.offset) * (self.duration - self.done)
+        )
+
+    def remaining(self) -> Optional[float]:
+        """
+        Оценивает время до завершения обработки файла (текущий этап
+        и последующие этапы Whisper с той же скоростью).
+
+        Returns:
+            Optional[float]: Оценка в секундах или None,
+                        если оценить время пока нельзя.
+        """
+        eta = self.eta()
+        if eta is None:
+            return None
+        if self.stage == "translate_ru":
+            return eta
+        # последний этап - перевод на русский, он значительно быстрее
+        stages_left = max(0, self.stages_total - self.stage_number - 1)
+        elapsed = time.monotonic() - self.stage_start
+        rate = elapsed / (self.done - self.offset)
+        return eta + stages_left * rate * self.duration
+
+    def window_done(self, seconds_done: float) -> None:
+        """
+        Отмечает завершение окна декодирования (или сегмента перевода)
+        и вызывает функции window_hooks.
+
+        Args:
+            seconds_done (float): Обработано секунд аудио.
+
+        Returns:
+            None
+        """
+        self.update(seconds_done)
+        for hook in self.window_hooks:
+            hook(self)
+
+    def add_segment(self, start: float, end: float, text: str) -> None:
+        """
+        Дописывает готовый сегмент в файл (имя файла).partial.
+
+        Args:
+            start (float): Начало сегмента в секундах.
+            end (float): Конец сегмента в секундах.
+            text (str): Текст сегмента.
+
+        Returns:
+            None
+        """
+        self.segments.append({"start": start, "end": end, "text": text})
+        staging.append_text(
+            self.partial_file,
+            f"[{int(start)} --- {int(end)}] {text.strip()}\n",
+        )
+        self._notify(
+            {
+                "event": "segment",
+                "stage": self.stage,
+                "start": start,
+                "end": end,
+                "text": text,
+            }
+        )
+
+    def _notify(self, event: Dict[str, Any]) -> None:
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger_settings.logger.warning(
+                    f"Ошибка обработчика событий файла {self.file}: {e}"
+                )
+
+
+class _WhisperProgressBar:
+    """Замена tqdm.tqdm, получающая от Whisper количество кадров."""
+
+    def __init__(self, progress: FileProgress, *args: Any, **kwargs: Any):
+        self.progress = progress
+        self.frames = 0
+
+    def __enter__(self) -> "_WhisperProgressBar":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.progress.update(
+            self.progress.offset + self.frames / FRAMES_PER_SECOND, force=True
+        )
+
+    def update(self, frames: int) -> None:
+        # Whisper обновляет счетчик после декодирования каждого окна
+        self.frames += frames
+        self.progress.window_done(
+            self.progress.offset + self.frames / FRAMES_PER_SECOND
+        )
+
+
+class _SegmentWriter:
+    """Получатель вывода Whisper, разбирающий строки сегментов."""
+
+    def __init__(self, progress: FileProgress) -> None:
+        self.progress = progress
+
+    def write_line(self, line: str) -> None:
+        match = REGEXP_SEGMENT.match(line)
+        if match is None:
+            return
+        parts = match.groupdict()
+        if parts["text"].strip():
+            offset = self.progress.offset
+            self.progress.add_segment(
+                offset + _seconds(parts["sh"], parts["sm"], parts["ss"]),
+                offset + _seconds(parts["eh"], parts["em"], parts["es"]),
+                parts["text"],
+            )
+
+
+def _seconds(hours: Optional[str], minutes: str, seconds: str) -> float:
+    return int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+@contextmanager
+def track_whisper(progress: FileProgress) -> Iterator[None]:
+    """
+    Перехватывает ход транскрибирования Whisper и передает его в progress
+    (см. whisper_adapter).
+
+    Внутри контекста model.transcribe нужно вызывать с verbose=True:
+    Whisper выводит каждый готовый сегмент, а счетчик tqdm получает
+    количество обработанных кадров.
+
+    Args:
+        progress (FileProgress): Состояние обработки файла.
+
+    Yields:
+        None
+    """
+
+    def progress_bar(*args: Any, **kwargs: Any) -> _WhisperProgressBar:
+        return _WhisperProgressBar(progress, *args, **kwargs)
+
+    with whisper_adapter.hooks(
+        progress_bar=progress_bar,
+        print_line=_SegmentWriter(progress).write_line,
+    ):
+        yield
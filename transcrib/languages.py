@@ -0,0 +1,112 @@
+"""
+Модуль содержит названия языков по кодам Whisper.
+
+Модуль не загружает нейросети, поэтому названия языков используют
+обработка файлов (neural_process) и разбор результатов (search_index).
+"""
+
+from typing import Dict
+
+# Названия языков по кодам Whisper (whisper.tokenizer.LANGUAGES)
+LANGUAGES: Dict[str, str] = {
+    "ru": "русский",
+    "en": "английский",
+    "zh": "китайский",
+    "es": "испанский",
+    "ar": "арабский",
+    "he": "иврит",
+    "hi": "хинди",
+    "bn": "бенгальский",
+    "pt": "португальский",
+    "fr": "французский",
+    "de": "немецкий",
+    "ja": "японский",
+    "pa": "панджаби",
+    "te": "телугу",
+    "ms": "малайский",
+    "ko": "корейский",
+    "vi": "вьетнамский",
+    "ta": "тамильский",
+    "it": "итальянский",
+    "tr": "турецкий",
+    "uk": "украинский",
+    "pl": "польский",
+    "ca": "каталонский",
+    "nl": "голландский",
+    "sv": "шведский",
+    "id": "индонезийский",
+    "fi": "финский",
+    "el": "греческий",
+    "cs": "чешский",
+    "ro": "румынский",
+    "da": "датский",
+    "hu": "венгерский",
+    "no": "норвежский",
+    "th": "тайский",
+    "ur": "урду",
+    "hr": "хорватский",
+    "bg": "болгарский",
+    "lt": "литовский",
+    "la": "латынь",
+    "mi": "маори",
+    "ml": "малаялам",
+    "cy": "валлийский",
+    "sk": "словацкий",
+    "fa": "персидский",
+    "lv": "латышский",
+    "sr": "сербский",
+    "az": "азербайджанский",
+    "sl": "словенский",
+    "kn": "каннада",
+    "et": "эстонский",
+    "mk": "македонский",
+    "br": "бретонский",
+    "eu": "баскский",
+    "is": "исландский",
+    "hy": "армянский",
+    "ne": "непальский",
+    "mn": "монгольский",
+    "bs": "боснийский",
+    "kk": "казахский",
+    "sq": "албанский",
+    "sw": "суахили",
+    "gl": "галисийский",
+    "mr": "маратхи",
+    "si": "сингальский",
+    "km": "кхмерский",
+    "sn": "шона",
+    "yo": "йоруба",
+    "so": "сомалийский",
+    "af": "африкаанс",
+    "oc": "окситанский",
+    "ka": "грузинский",
+    "be": "белорусский",
+    "tg": "таджикский",
+    "sd": "синдхи",
+    "gu": "гуджарати",
+    "am": "амхарский",
+    "yi": "идиш",
+    "lo": "лаосский",
+    "uz": "узбекский",
+    "fo": "фарерский",
+    "ht": "гаитянский креольский",
+    "ps": "пашто",
+    "tk": "туркменский",
+    "nn": "нюношк",
+    "mt": "мальтийский",
+    "sa": "санскрит",
+    "lb": "люксембургский",
+    "my": "мьянманский",
+    "bo": "тибетский",
+    "tl": "тагальский",
+    "mg": "малагасийский",
+    "as": "ассамский",
+    "tt": "татарский",
+    "haw": "гавайский",
+    "ln": "лингала",
+    "ha": "хауса",
+    "ba": "башкирский",
+    "jw": "яванский",
+    "su": "сунданский",
+    "yue": "кантонский",
+}
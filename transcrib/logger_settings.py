@@ -1,13 +1,26 @@
 """
 Модуль настраивает логирование библиотеки loguru
 
+Записи передаются обработчикам (stdout и лог-файл) через очередь
+и выводятся в фоновом потоке, поэтому логирование не задерживает
+цикл обработки. Лог-файл может записываться в формате JSON
+с идентификатором обрабатываемого файла (file_id) и длительностью
+этапов обработки; архивные лог-файлы сжимаются.
+
 Def:
     configure_logger: Настраивает логгер с указанным уровнем логирования.
+    file_context: Добавляет к записям идентификатор обрабатываемого файла.
+    stage: Записывает длительность этапа обработки.
 """
 
+import atexit
 import pathlib
 import sys
+import time
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator, Union
 
 from dotenv import load_dotenv
 from loguru import logger
@@ -19,12 +32,16 @@ else:
     exit(f"Файл {dotenv_path} не существует.")
 
 
-def configure_logger(level: str) -> None:
+def configure_logger(
+    level: str, log_format: str = "text", enqueue: bool = True
+) -> None:
     """
     Настраивает логгер с указанным уровнем логирования.
 
     Args:
         level: Уровень логирования, который будет установлен.
+        log_format: Формат лог-файла ("text" или "json").
+        enqueue: Выводить записи в фоновом потоке через очередь.
 
     Returns:
         None
@@ -39,11 +56,14 @@ def configure_logger(level: str) -> None:
     rotation_size = "50 MB"
 
     logger.remove()
+    # идентификатор файла по умолчанию для записей вне обработки файла
+    logger.configure(extra={"file_id": "-"})
     # logger.add(sys.stdout, level=level)
     logger.add(
         sys.stdout,
         colorize=True,
         level=level,
+        enqueue=enqueue,
         format="<green>{time:YYYY-MM-DD HH:mm:ss!UTC} UTC </green> |"
         " <level>{level:^}</level> |"
         " {module}:{function}:{line} | : <level>{message}</level>",
@@ -53,14 +73,61 @@ def configure_logger(level: str) -> None:
         log_path,
         level=level,
         rotation=rotation_size,
+        compression="gz",
+        enqueue=enqueue,
+        serialize=log_format == "json",
         format="{time:YYYY-MM-DD HH:mm:ss!UTC} UTC | {level:^} |"
-        "{module}:{function}:{line}| : {message}",
+        "{module}:{function}:{line}| {extra[file_id]} | : {message}",
     )
+    # записи, оставшиеся в очереди, выводятся при завершении программы
+    atexit.register(logger.remove)
     logger.debug(
-        f"Настройки системы логирования: \n"
-        f" путь к лог-файлу:    {log_path}\n"
-        f" Уровень логирования: {level}"
+        "Настройки системы логирования: \n"
+        " путь к лог-файлу:    {}\n"
+        " Уровень логирования: {}\n"
+        " Формат лог-файла:    {}",
+        log_path,
+        level,
+        log_format,
     )
 
 
+@contextmanager
+def file_context(file: Union[str, Path]) -> Iterator[str]:
+    """
+    Добавляет ко всем записям внутри контекста идентификатор
+    обрабатываемого файла (file_id) и путь к файлу.
+
+    Args:
+        file: Путь к обрабатываемому файлу.
+
+    Yields:
+        str: Идентификатор файла.
+    """
+    file_id = uuid.uuid4().hex[:12]
+    with logger.contextualize(file_id=file_id, file=str(file)):
+        yield file_id
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Записывает длительность этапа обработки (поля stage и duration).
+
+    Args:
+        name: Название этапа.
+
+    Yields:
+        None
+    """
+    time_start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = round(time.perf_counter() - time_start, 3)
+        logger.bind(stage=name, duration=duration).info(
+            "Этап {} выполнен за {} сек.", name, duration
+        )
+
+
 __all__ = ["logger"]
@@ -1,11 +1,24 @@
 import time
 from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
 
+import admission
+import archive_process
+import checkpoint
+import cpu_tuning
 import file_process
 import logger_settings
 import neural_process
+import numpy as np
+import planner
+import profiler
+import quality
 import riffer2_wine
+import shared_models
+import shutdown
+import staging
 import variables
+import whisper
 from dotenv import load_dotenv
 
 dotenv_path = f"{Path((__file__)).parent.parent}/.env"
@@ -13,40 +26,243 @@ if Path(dotenv_path).is_file():
     load_dotenv(dotenv_path)
 
 
-def main() -> None:
-    while True:
+def transcrib_file(
+    file: Path,
+    listener: Optional[Callable[[Dict[str, Any]], None]] = None,
+    wait_memory: bool = False,
+    audio: Optional[Union[np.ndarray, Callable[[], np.ndarray]]] = None,
+    duration: Optional[float] = None,
+) -> Optional[str]:
+    """
+    Транскрибирует аудиофайл и сохраняет результат
+        в текстовый файл (имя файла).txt.
+
+    Args:
+        file (Path): Путь к аудиофайлу.
+        listener (Callable, optional): Функция, которой передаются события
+            хода обработки и готовые сегменты.
+        wait_memory (bool, optional): Ждать освобождения памяти,
+            если задание не укладывается в бюджет памяти
+            (иначе файл откладывается до следующего цикла).
+        audio (np.ndarray | Callable, optional): Декодированный сигнал
+            16 кГц или функция, декодирующая его после допуска по бюджету
+            памяти (для файлов из архивов; file - путь для результатов).
+        duration (float, optional): Длительность аудио в секундах
+            для допуска (для функции декодирования - оценка сверху).
+
+    Returns:
+        Optional[str]: Текст результата или None, если файл
+            уже находится в процессе обработки, отложен или обработка
+            прервана для завершения процесса.
+    """
+    # после сигнала завершения новые файлы не принимаются в обработку
+    if shutdown.requested():
+        return None
+    # все записи лога обработки файла получают общий идентификатор
+    with logger_settings.file_context(file):
+        model_whisper = quality.get_the_model_whisper(file)
+        if duration is None and audio is None:
+            duration = file_process.file_duration(file)
+        elif duration is None:
+            # для функции декодирования длительность передает вызывающий
+            assert isinstance(audio, np.ndarray)
+            duration = len(audio) / whisper.audio.SAMPLE_RATE
+        assert duration is not None
+        # допуск к обработке по бюджету памяти хоста
+        while True:
+            with admission.reserve(file, model_whisper, duration) as admitted:
+                if admitted is not None:
+                    if callable(audio):
+                        # сигнал декодируется после резервирования памяти
+                        audio = audio()
+                    logger_settings.logger.info(
+                        f"Транскрибирование аудиофайла\n {file}"
+                    )
+                    try:
+                        # профиль обработки (если включен для файла)
+                        with profiler.profile(file):
+                            trans_text = neural_process.final_process(
+                                file, listener, admitted, audio
+                            )
+                    except shutdown.Interrupted:
+                        # контрольная точка сохранена, файл освобождается
+                        # для продолжения обработки после перезапуска
+                        staging.remove(Path(file).with_suffix(".proc"))
+                        staging.remove(Path(file).with_suffix(".partial"))
+                        return None
+                    except Exception as e:
+                        # временные файлы удаляются, попытка записывается:
+                        # файл обрабатывается повторно до MAX_ATTEMPTS раз
+                        staging.remove(Path(file).with_suffix(".proc"))
+                        staging.remove(Path(file).with_suffix(".partial"))
+                        shutdown.record_failure(file, repr(e))
+                        raise
+                    break
+            if not wait_memory:
+                logger_settings.logger.info(
+                    f"Файл:\n {file}\n отложен до освобождения памяти."
+                )
+                return None
+            if shutdown.requested():
+                return None
+            time.sleep(10)
+        if trans_text == "during the transcription process ... ":
+            logger_settings.logger.warning(
+                f"Файл:\n {file}\n в процессе обработки или необходимо"
+                f" удалить временный файл (имя файла).proc.\n"
+            )
+            return None
+        # сохраняем результат в текстовый файл
+        # (через локальный диск и очередь отложенной записи)
+        file_to_save = Path(Path(file).with_suffix(".txt"))
+        staging.write_text(file_to_save, trans_text)
+        # временные файлы процесса удаляются после записи результата
+        # (очередь отложенной записи выполняет операции по порядку)
+        staging.remove(Path(file).with_suffix(".proc"))
+        staging.remove(Path(file).with_suffix(".partial"))
+        shutdown.clear_failures(file)
+        return trans_text
+
+
+def _preload() -> None:
+    # модели загружаются до запуска процессов обработки (режим fork)
+    for name in variables.SHARED_MODELS:
+        neural_process.load_whisper_model(name)
+    neural_process.get_translator()
+
+
+def run(worker_index: int = 0, workers: int = 1) -> None:
+    """
+    Цикл обработки аудиофайлов входной директории
+        (до сигнала завершения процесса).
+
+    Args:
+        worker_index (int): Номер процесса обработки (с 0).
+        workers (int): Количество процессов обработки, между которыми
+            распределяются файлы (1 - все файлы обрабатывает процесс).
+
+    Returns:
+        None
+    """
+    if workers > 1:
+        # процесс, запущенный через fork, привязывается к своим ядрам
+        cpu_tuning.configure(worker_index)
+    while not shutdown.requested():
         # riffer2_wine.convert_other_type_audiofiles(variables.DIR_SOUND_IN)
 
         file_process.check_temp_folders_for_other_model(variables.DIR_SOUND_IN)
         # Получаем список аудиофайлов из указанного пути.
-        file_list = file_process.get_files(
-            Path(variables.DIR_SOUND_IN), list(variables.EXTENSIONS)
+        file_list = shared_models.worker_files(
+            file_process.get_files(
+                Path(variables.DIR_SOUND_IN), list(variables.EXTENSIONS)
+            ),
+            worker_index,
+            workers,
         )
         logger_settings.logger.info(f"Найдено аудиофайлов: {len(file_list)}")
+        reservation = admission.current_reservation()
+        logger_settings.logger.info(
+            f"Память процессов обработки: {reservation['used_mb']} МБ "
+            f"из {reservation['budget_mb']} МБ"
+        )
 
         # Транскрибируем каждый аудиофайл из списка
-        for file in file_list:
-            if file_process.check_file_must_trascrib(file):
-                # Транскрибируем аудиофайл
-                print("\n")
-                logger_settings.logger.info(
-                    f"Транскрибирование аудиофайла\n {file}"
+        queue = [
+            f for f in file_list if file_process.check_file_must_trascrib(f)
+        ]
+        estimate = planner.estimate(
+            {file: file_process.file_duration(file) for file in queue},
+            1 if workers > 1 else variables.WORKERS_PER_HOST,
+        )
+        logger_settings.logger.info(
+            f"Оценка времени обработки: {estimate['audio_hours']:.1f} ч аудио,"
+            f" {estimate['wall_hours']:.1f} ч при {estimate['workers']}"
+            f" процессах обработки"
+        )
+        for index, file in enumerate(queue):
+            if shutdown.requested():
+                break
+            # текущий и следующие файлы очереди копируются
+            # на локальный диск (следующие - во время обработки текущего)
+            staging.prefetch(
+                queue[index : index + 1 + variables.STAGING_PREFETCH]
+            )
+            # файл мог быть обработан другим процессом за время цикла
+            if (
+                Path(file).with_suffix(".txt").is_file()
+                or Path(file).with_suffix(".proc").is_file()
+                or staging.pending(Path(file).with_suffix(".txt"))
+            ):
+                staging.release(file)
+                continue
+            # Транскрибируем аудиофайл
+            print("\n")
+            try:
+                transcrib_file(file)
+            except Exception:
+                # ошибка одного файла не завершает процесс обработки
+                logger_settings.logger.exception(
+                    f"Ошибка обработки файла:\n {file}"
                 )
-                trans_text = neural_process.final_process(file)
-                if trans_text == "during the transcription process ... ":
-                    logger_settings.logger.warning(
-                        f"Файл:\n {file}\n в процессе обработки или необходимо"
-                        f" удалить временный файл (имя файла).proc.\n"
+            finally:
+                staging.release(file)
+
+        # Аудиофайлы внутри архивов (без распаковки архивов)
+        for archive in shared_models.worker_files(
+            archive_process.get_archives(Path(variables.DIR_SOUND_IN)),
+            worker_index,
+            workers,
+        ):
+            if shutdown.requested():
+                break
+            if archive_process.check_archive_must_process(archive):
+                print("\n")
+                try:
+                    archive_process.process_archive(
+                        archive,
+                        lambda path, duration, load: transcrib_file(
+                            path,
+                            wait_memory=True,
+                            audio=load,
+                            duration=duration,
+                        ),
+                    )
+                except Exception:
+                    logger_settings.logger.exception(
+                        f"Ошибка обработки архива:\n {archive}"
                     )
-                else:
-                    # сохраняем результат в текстовый файл
-                    file_to_save = Path(Path(file).with_suffix(".txt"))
-                    file_process.save_text_to_file(trans_text, file_to_save)
 
+        if shutdown.requested():
+            break
         logger_settings.logger.info(
             "Все аудиофайлы в текущем цикле программы обработаны.\n"
         )
         time.sleep(10)
+    # результаты и удаление временных файлов переносятся
+    # на сетевой ресурс до завершения процесса
+    staging.flush(variables.SHUTDOWN_GRACE)
+    logger_settings.logger.info(
+        "Обработка завершена по сигналу завершения процесса.\n"
+    )
+
+
+def main() -> None:
+    # локальные копии предыдущего запуска больше не нужны,
+    # а не перенесенные результаты переносятся на сетевой ресурс
+    staging.cleanup()
+    staging.replay()
+    checkpoint.cleanup()
+    # SIGTERM/SIGINT: новые файлы не принимаются, длинная обработка
+    # прерывается с сохранением контрольной точки
+    shutdown.install()
+    if variables.MODEL_SHARE_MODE == "fork" and variables.WORKERS_PER_HOST > 1:
+        # модели загружаются один раз, процессы обработки используют
+        # общие страницы весов
+        shared_models.supervise(
+            _preload, lambda index: run(index, variables.WORKERS_PER_HOST)
+        )
+    else:
+        run()
 
 
 if __name__ == "__main__":
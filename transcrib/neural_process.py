@@ -3,34 +3,68 @@
 
 Def:
     change_sampling_rate(audio_file) -> Path: Изменяет частоту дискретизации.
-    get_the_model_whisper() -> Dict: Возвращает тип модели для Whisper
-                в соответствии с директорией расположения файла.
-    sound_to_text(file: Path) -> Union[str, None]: Транскрибирует аудио в текст
-                и переводит его на английский.
-    final_process(file: Path) -> str: Транскрибирует аудиофайл,
+    load_whisper_model(name: str) -> whisper.Whisper: Возвращает
+                модель Whisper из памяти процесса или загружает ее.
+    get_translator() -> Pipeline: Возвращает загруженный переводчик
+                с английского на русский.
+    sound_to_text(file: Path, progress: FileProgress) -> Tuple: Транскрибирует
+                аудио в текст и переводит его на английский.
+    final_process(file: Path, listener) -> str: Транскрибирует аудиофайл,
                 переводит его на английский, а затем на русский.
     get_language_name(code: str) -> str: Возвращает название языка,
                 соответствующего указанному коду.
 """
 
 import datetime
+import gc
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Tuple, Union
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
 
+import admission
+import audio_cache
+import checkpoint
+import cpu_tuning
+import decoding
 import ffmpeg
 import file_process
+import languages
 import logger_settings
+import numpy as np
+import planner
+import profiler
+import quality
+import search_index
+import shared_models
+import shutdown
+import staging
 import torch
+import translation_memory
 import variables
 import whisper
+from file_progress import FRAMES_PER_SECOND, FileProgress, track_whisper
 from transformers import pipeline
 
 # Проверяем доступность CUDA и устанавливаем устройство соответственно
 device = "cuda:0" if torch.cuda.is_available() else "cpu"
 # Устанавливаем тип данных torch в зависимости от доступности CUDA
 torch_dtype = torch.float16 if torch.cuda.is_available() else torch.float32
-# устанавливаем количество потоков для torch
-torch.set_num_threads(4)
+# привязываем процесс к ядрам и устанавливаем количество потоков для torch
+cpu_tuning.configure()
+
+# Модель перевода с английского языка на русский
+TRANSLATION_MODEL = "Helsinki-NLP/opus-mt-en-ru"
+
+# Модели Whisper в памяти процесса (см. load_whisper_model)
+_models: Dict[str, whisper.Whisper] = {}
+
+
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    # длительность этапа в лог и отметка этапа в профиле обработки
+    with logger_settings.stage(name), profiler.mark(name):
+        yield
 
 
 def change_sampling_rate(audio_file: Path) -> Path:
@@ -62,89 +96,283 @@ def change_sampling_rate(audio_file: Path) -> Path:
     return audio_file
 
 
-def get_the_model_whisper(file: Union[Path, str]) -> str:
+def _pinned(name: str) -> bool:
+    # веса моделей SHARED_MODELS в режиме fork загружены до запуска
+    # процессов обработки, общие для них и остаются в памяти
+    return (
+        variables.MODEL_SHARE_MODE == "fork"
+        and name in variables.SHARED_MODELS
+    )
+
+
+def load_whisper_model(name: str) -> whisper.Whisper:
     """
-    Получить тип модели для Whisper
-        в соответствии с директорией расположения файла.
+    Возвращает модель Whisper из памяти процесса или загружает ее.
+
+    В памяти процесса остается только последняя загруженная модель
+    (предыдущая выгружается перед загрузкой другой модели), кроме общих
+    моделей SHARED_MODELS в режиме fork.
 
     Args:
-        file (Union[Path, str]): Путь к файлу.
+        name (str): Тип модели (tiny, base, small.en и т.д.).
 
     Returns:
-        str: Тип модели.
+        whisper.Whisper: Загруженная модель.
     """
+    if name in _models:
+        return _models[name]
+    for loaded in [model for model in _models if not _pinned(model)]:
+        logger_settings.logger.info(f"Выгрузка модели Whisper: {loaded}")
+        del _models[loaded]
+    gc.collect()
+    logger_settings.logger.info(f"Загрузка модели Whisper: {name}")
+    if variables.MODEL_SHARE_MODE == "mmap":
+        # веса отображаются в память и общие для процессов хоста
+        _models[name] = shared_models.load_whisper(name)
+    else:
+        _models[name] = whisper.load_model(name)
+    # выгружаемые модели не учитываются при допуске следующих заданий
+    admission.set_resident(model for model in _models if not _pinned(model))
+    return _models[name]
 
-    # Сопоставление ключевых слов файла с типами моделей
-    QUALITY_MAPPING: Dict[str, str] = {
-        "tiny (quality = low)": "tiny",
-        "base (quality = 2)": "base",
-        "small (quality = 3)": "small",
-        "medium (quality = 4)": "medium",
-        "large (quality = max)": "large",
-    }
-    # Преобразовать файл в строку, если он является объектом Path
-    file_str = str(file) if isinstance(file, Path) else file
-    # Вернуть тип модели на основе директории файла
-    return next(
-        (value for key, value in QUALITY_MAPPING.items() if key in file_str),
-        variables.MODEL,
-    )
 
+def _english_model(name: str) -> str:
+    # английский вариант модели (.en); вместо общей модели режима fork -
+    # только общий вариант, иначе веса загружал бы каждый процесс
+    if name == "large" or (_pinned(name) and not _pinned(f"{name}.en")):
+        return name
+    return f"{name}.en"
 
-def sound_to_text(audios: Path) -> Tuple[Any, Any, Any, str]:
+
+@lru_cache(maxsize=None)
+def get_translator() -> Any:
+    """
+    Загружает переводчик pipeline с английского языка на русский
+    один раз и далее возвращает его из памяти.
+
+    Returns:
+        Pipeline: Переводчик Helsinki-NLP/opus-mt-en-ru.
+    """
+    logger_settings.logger.info(
+        f"Загрузка модели перевода: {TRANSLATION_MODEL}"
+    )
+    return pipeline("translation", model=TRANSLATION_MODEL)
+
+
+def _transcribe(
+    model: whisper.Whisper,
+    audio: np.ndarray,
+    mel: torch.Tensor,
+    stage: str,
+    progress: FileProgress,
+    state: Optional[checkpoint.Checkpoint],
+    profile: str,
+    decode_stats: Dict[str, int],
+    **options: Any,
+) -> Dict[str, Any]:
+    # этап Whisper (model.transcribe) с продолжением с контрольной точки
+    progress.set_stage(stage)
+    saved = state.stage(stage) if state is not None else {}
+    segments = saved.get("segments", [])
+    for segment in segments:
+        progress.add_segment(segment["start"], segment["end"], segment["text"])
+    if saved.get("complete"):
+        progress.update(progress.duration, force=True)
+        return {"text": saved["text"], "segments": segments}
+    # продолжение с конца последнего готового сегмента
+    offset = max([saved.get("done", 0.0)] + [s["end"] for s in segments])
+    seek = round(offset * FRAMES_PER_SECOND)
+    progress.offset = seek / FRAMES_PER_SECOND
+    if segments and options.get("condition_on_previous_text"):
+        # готовый текст - подсказка для декодирования следующего окна
+        options["initial_prompt"] = "".join(s["text"] for s in segments[-20:])
+    audio = audio[seek * whisper.audio.HOP_LENGTH :]
+    mel = mel[:, seek:]
+    with (
+        _stage(stage),
+        decoding.track(model, profile, decode_stats),
+        audio_cache.use_mel(audio, mel),
+    ):
+        result = model.transcribe(audio, fp16=False, verbose=True, **options)
+    if segments or seek:
+        # время сегментов продолженного этапа отсчитывается от позиции
+        shifted = [
+            {
+                **segment,
+                "start": segment["start"] + progress.offset,
+                "end": segment["end"] + progress.offset,
+            }
+            for segment in result["segments"]
+        ]
+        result["segments"] = [
+            {**segment, "id": index}
+            for index, segment in enumerate(segments + shifted)
+        ]
+        result["text"] = "".join(s["text"] for s in segments) + result["text"]
+    if state is not None:
+        state.complete_stage(stage, result)
+    return result
+
+
+def sound_to_text(
+    audios: Path,
+    progress: FileProgress,
+    model_whisper: Optional[str] = None,
+    audio: Optional[np.ndarray] = None,
+    state: Optional[checkpoint.Checkpoint] = None,
+    cache_key: Optional[str] = None,
+    profile: Optional[str] = None,
+) -> Tuple[Any, Any, Any, str, Dict[str, Any]]:
     """
     Транскрибирует аудио в текст
         и переводит его на английский.
 
     Args:
     audios (Path): Путь к аудиофайлу.
+    progress (FileProgress): Состояние обработки файла, в которое
+        передаются ход транскрибирования и готовые сегменты.
+    model_whisper (str, optional): Тип модели Whisper (по умолчанию -
+        в соответствии с директорией расположения файла).
+    audio (np.ndarray, optional): Декодированный сигнал 16 кГц
+        (например, файла из архива; файл audios при этом не читается).
+    state (Checkpoint, optional): Контрольная точка обработки файла.
+    cache_key (str, optional): Ключ кэша аудио исходного файла
+        (до изменения частоты дискретизации).
+    profile (str, optional): Профиль декодирования (по умолчанию -
+        в соответствии с директорией расположения файла).
 
     Returns:
-    tuple[str, str, str]: Транскрибированный текст,
-        переведенный на английский транскрибированный текст
-        и обнаруженный язык.
+    tuple[str, str, str, str, Dict]: Транскрибированный текст,
+        переведенный на английский транскрибированный текст,
+        обнаруженный язык, модель Whisper и профиль декодирования
+        со счетчиками окон и повторных декодирований.
     """
     # Загружаем предобученную модель
-    model_whisper = get_the_model_whisper(audios)
-    model = whisper.load_model(model_whisper)
-    # Загрузка и предварительная обработка аудио
-    audio = whisper.load_audio(str(audios))
-    audio = whisper.pad_or_trim(audio)
+    model_whisper = model_whisper or quality.get_the_model_whisper(audios)
+    model = load_whisper_model(model_whisper)
+    cpu_tuning.set_threads_for_model(model_whisper)
+    # Загрузка и предварительная обработка аудио (из кэша, если файл
+    # уже обрабатывался)
+    if audio is None:
+        cache_key, audio = audio_cache.load_audio(audios, cache_key)
+    else:
+        cache_key = ""
+    progress.duration = len(audio) / whisper.audio.SAMPLE_RATE
+    if state is not None:
+        state.restore(len(audio))
 
     # Преобразование аудио в логарифмический мел-спектрограмм
     n_mels = 128 if model_whisper == "large" else 80
-    mel = whisper.log_mel_spectrogram(audio, n_mels=n_mels).to(model.device)
+    mel = audio_cache.load_mel(cache_key, audio, n_mels)
+
+    # Определение языка (по первым 30 секундам, как в Whisper;
+    # при продолжении обработки - из контрольной точки)
+    lang = state.lang if state is not None else None
+    lang = lang or audio_cache.get_language(cache_key, model_whisper)
+    if lang is None:
+        _, probs = model.detect_language(
+            whisper.pad_or_trim(mel, whisper.audio.N_FRAMES).to(model.device)
+        )
+        lang = max(probs, key=probs.get)
+        audio_cache.set_language(cache_key, model_whisper, lang)
+    if state is not None:
+        state.lang = lang
+    logger_settings.logger.info(
+        f"Кэш аудио (попадания/промахи): {audio_cache.stats()}"
+    )
 
-    # Определение языка
-    _, probs = model.detect_language(mel)
-    lang = max(probs, key=probs.get)
+    # Параметры декодирования по профилю директории файла
+    profile = profile or decoding.get_profile(audios)
+    options = decoding.transcribe_options(profile)
+    decode_stats = {"windows": 0, "fallbacks": 0, "timeouts": 0}
 
     # Транскрибируем аудио и переводим в английский при необходимости
-    if lang == "en":
-        model_en = (
-            whisper.load_model(f"{model_whisper}.en")
-            if model_whisper != "large"
-            else model
-        )
-        result_en = model_en.transcribe(str(audios), fp16=False, language=lang)
-        result = ""
-    else:
-        result = model.transcribe(str(audios), fp16=False, language=lang)
-        result_en = model.transcribe(
-            str(audios), fp16=False, language=lang, task="translate"
-        )
+    # (ход обработки и сегменты перехватываются из вывода verbose=True,
+    # спектрограмма берется готовая, завершенные этапы и готовые окна
+    # берутся из контрольной точки)
+    # (для английского языка исходный текст не формируется)
+    result: Union[str, Dict[str, Any]]
+    with track_whisper(progress):
+        if lang == "en":
+            if _english_model(model_whisper) != model_whisper:
+                # английская модель заменяет основную в памяти процесса
+                del model
+                model = load_whisper_model(_english_model(model_whisper))
+            progress.set_stages_total(2)
+            result_en = _transcribe(
+                model,
+                audio,
+                mel,
+                "translate_en",
+                progress,
+                state,
+                profile,
+                decode_stats,
+                language=lang,
+                **options,
+            )
+            result = ""
+        else:
+            progress.set_stages_total(3)
+            result = _transcribe(
+                model,
+                audio,
+                mel,
+                "transcribe",
+                progress,
+                state,
+                profile,
+                decode_stats,
+                language=lang,
+                **options,
+            )
+            result_en = _transcribe(
+                model,
+                audio,
+                mel,
+                "translate_en",
+                progress,
+                state,
+                profile,
+                decode_stats,
+                language=lang,
+                task="translate",
+                **options,
+            )
 
     # Возвращаем транскрибированный текст, переведенный текст,
-    # определенный язык и модель whisper
-    return result, result_en, lang, model_whisper
+    # определенный язык, модель whisper и профиль декодирования
+    logger_settings.logger.info(
+        f"Профиль декодирования {profile}: окон {decode_stats['windows']}, "
+        f"повторных декодирований {decode_stats['fallbacks']}, "
+        f"прервано по времени {decode_stats['timeouts']}"
+    )
+    return (
+        result,
+        result_en,
+        lang,
+        model_whisper,
+        {"profile": profile, **decode_stats},
+    )
 
 
-def final_process(file: Path) -> str:
+def final_process(
+    file: Path,
+    listener: Optional[Callable[[Dict[str, Any]], None]] = None,
+    model_whisper: Optional[str] = None,
+    audio: Optional[np.ndarray] = None,
+) -> str:
     """
     Транскрибирует аудиофайл, переводит его на английский, а затем на русский.
 
     Args:
         file (Path): Путь к аудиофайлу.
+        listener (Callable, optional): Функция, которой передаются события
+            хода обработки и готовые сегменты (см. FileProgress).
+        model_whisper (str, optional): Тип модели Whisper (по умолчанию -
+            в соответствии с директорией расположения файла).
+        audio (np.ndarray, optional): Декодированный сигнал 16 кГц
+            (для файлов из архивов; file - путь для результатов).
 
     Returns:
         str: Текст, содержащий транскрибированный текст,
@@ -156,23 +384,49 @@ def final_process(file: Path) -> str:
     if file_to_save.is_file():
         return "during the transcription process ... "
     else:
-        file_process.save_text_to_file(
+        # владелец файла (имя файла).proc - для принятия файла в обработку
+        # после аварийного завершения процесса (см. shutdown)
+        proc_header = (
             f"during the transcription process ...\n"
-            f"time start {time_start.strftime('%H:%M:%S (UTC) - %d %b %Y')}",
-            file_to_save,
+            f"time start {time_start.strftime('%H:%M:%S (UTC) - %d %b %Y')}\n"
+            f"{shutdown.marker_owner()}"
         )
+        file_process.save_text_to_file(proc_header, file_to_save)
+    # ход обработки и готовые сегменты (имя файла).partial
+    progress = FileProgress(
+        file, proc_header, [listener] if listener is not None else None
+    )
+
+    # Модель и профиль декодирования определяются по директории файла
+    # на сетевом ресурсе, аудио читается с локальной копии (если она
+    # подготовлена: путь копии не содержит директорию качества)
+    model_whisper = model_whisper or quality.get_the_model_whisper(file)
+    profile = decoding.get_profile(file)
+    audio_file = staging.local_audio(file) if audio is None else file
+    # контрольная точка (продолжение после перезапуска процесса)
+    state = checkpoint.Checkpoint(file, model_whisper)
+    state.watch(progress)
 
     # Транскрибирование аудио в текст, перевод его на английский,
     # определение языка и модели для обработки.
-    if variables.CHANGE_SAMPLING_RATE_TO_16KGH:
-        file = change_sampling_rate(file)
-    raw, raw_en, detected_lang, model_whisper = sound_to_text(file)
+    # (если сигнал файла есть в кэше, перекодирование не требуется;
+    # ключ кэша - хэш исходного файла до перекодирования; файл
+    # на сетевом ресурсе без локальной копии не перезаписывается)
+    cache_key = audio_cache.cache_key(audio_file) if audio is None else ""
+    if (
+        audio is None
+        and variables.CHANGE_SAMPLING_RATE_TO_16KGH
+        and staging.is_local(file, audio_file)
+        and not audio_cache.is_cached(cache_key)
+    ):
+        audio_file = change_sampling_rate(audio_file)
+    raw, raw_en, detected_lang, model_whisper, decode_stats = sound_to_text(
+        audio_file, progress, model_whisper, audio, state, cache_key, profile
+    )
     logger_settings.logger.info(f"Используется модель: {model_whisper}")
     logger_settings.logger.info(f"Язык аудиозаписи: {detected_lang}")
     # Переводчик pipeline с английского языка на русский
-    translator_en_ru = pipeline(
-        "translation", model="Helsinki-NLP/opus-mt-en-ru"
-    )
+    translator_en_ru = get_translator()
     # Формирование текста
     text = ""
     text_ru = ""  # текст на русском
@@ -182,6 +436,12 @@ def final_process(file: Path) -> str:
         f"Транскрибирование выполнено с помощью "
         f"модели 'Whisper.{model_whisper}' \n"
     )
+    text += (
+        f"Профиль декодирования: {decode_stats['profile']} "
+        f"(окон: {decode_stats['windows']}, "
+        f"повторных декодирований: {decode_stats['fallbacks']}, "
+        f"прервано по времени: {decode_stats['timeouts']}) \n"
+    )
     # Формирование текста транскрибирования (модели Whisper)
     # и перевода (модели Helsinki-NLP/opus-mt-en-ru)
     if detected_lang != "en":
@@ -191,10 +451,28 @@ def final_process(file: Path) -> str:
     text += f"Английский (Whisper): \n{raw_en['text']} \n"
     text += "-------------------- \n"
     text += f"Русский (Helsinki-NLP/opus-mt-en-ru): \n"
-    for segment in raw_en["segments"]:
-        # Перевод текста с английского на русский
-        translation_en_ru = translator_en_ru(segment["text"])
-        text_ru += translation_en_ru[0]["translation_text"]  # type: ignore
+    progress.set_stage("translate_ru")
+    # переводы, сохраненные в контрольной точке
+    translations_ru = state.translations()
+    for segment, translation_ru in zip(raw_en["segments"], translations_ru):
+        progress.add_segment(segment["start"], segment["end"], translation_ru)
+    with _stage("translate_ru"):
+        for segment in raw_en["segments"][len(translations_ru) :]:
+            # Перевод текста с английского на русский
+            # (повторяющиеся фразы берутся из памяти переводов)
+            translations_ru.append(
+                translation_memory.translate(
+                    translator_en_ru, segment["text"], TRANSLATION_MODEL
+                )
+            )
+            progress.add_segment(
+                segment["start"], segment["end"], translations_ru[-1]
+            )
+            progress.window_done(segment["end"])
+    text_ru = "".join(translations_ru)
+    logger_settings.logger.info(
+        f"Память переводов (попадания/промахи): {translation_memory.stats()}"
+    )
     text += f"{text_ru} \n"
 
     # Разбор по сегментам текста транскрибирования (модели Whisper)
@@ -219,7 +497,7 @@ def final_process(file: Path) -> str:
         "Английский (модель Whisper) и русский текст (модель Helsinki-NLP).\n"
     )
     text += "-------------------- \n"
-    for segment in raw_en["segments"]:
+    for segment, translation_ru in zip(raw_en["segments"], translations_ru):
         text += "-------------------- \n"
         text += (
             f"ID элемента: {segment['id']} "
@@ -227,11 +505,35 @@ def final_process(file: Path) -> str:
             f"Конец: {int(segment['end'])} \n"
         )
         text += f"Английский текст:{segment['text']} \n"
-        translation_en_ru = translator_en_ru(segment["text"])
-        text += f"Русский: {translation_en_ru[0]['translation_text']} \n"  # type: ignore
+        text += f"Русский: {translation_ru} \n"
 
     time_end = datetime.datetime.now(datetime.timezone.utc)
     time_transcrib_file = time_end - time_start
+    # время обработки для оценки времени обработки очереди (planner);
+    # после продолжения с контрольной точки время обработки охватывает
+    # только часть файла и не сохраняется
+    if state.resumed:
+        logger_settings.logger.debug(
+            "Время обработки файла, продолженного с контрольной точки, "
+            "не сохраняется для оценки времени обработки."
+        )
+    else:
+        planner.record(
+            model_whisper,
+            detected_lang,
+            progress.duration,
+            time_transcrib_file.total_seconds(),
+            torch.get_num_threads(),
+        )
+    # сегменты для полнотекстового поиска по результатам (search_index)
+    search_index.add(
+        file,
+        detected_lang,
+        model_whisper,
+        raw["segments"] if detected_lang != "en" else [],
+        raw_en["segments"],
+        translations_ru,
+    )
     # Вычисление времени обработки и добавление в итоговый текст
     idx_str = text.index("-----")
     text = (
@@ -239,8 +541,7 @@ def final_process(file: Path) -> str:
         f"Время обработки: {time_transcrib_file}\n"
         f"{text[idx_str:]}"
     )
-    if Path(Path(file).with_suffix(".proc")).is_file():
-        Path(Path(file).with_suffix(".proc")).unlink()
+    state.remove()
     return text
 
 
@@ -255,107 +556,4 @@ def get_language_name(code: str) -> str:
     str: Название соответствующего языка
             или "неизвестный язык", если код не найден.
     """
-    languages = {
-        "ru": "русский",
-        "en": "английский",
-        "zh": "китайский",
-        "es": "испанский",
-        "ar": "арабский",
-        "he": "иврит",
-        "hi": "хинди",
-        "bn": "бенгальский",
-        "pt": "португальский",
-        "fr": "французский",
-        "de": "немецкий",
-        "ja": "японский",
-        "pa": "панджаби",
-        "jv": "яванский",
-        "te": "телугу",
-        "ms": "малайский",
-        "ko": "корейский",
-        "vi": "вьетнамский",
-        "ta": "тамильский",
-        "it": "итальянский",
-        "tr": "турецкий",
-        "uk": "украинский",
-        "pl": "польский",
-        "ca": "каталонский",
-        "nl": "голландский",
-        "sv": "шведский",
-        "id": "индонезийский",
-        "fi": "финский",
-        "el": "греческий",
-        "cs": "чешский",
-        "ro": "румынский",
-        "da": "датский",
-        "hu": "венгерский",
-        "no": "норвежский",
-        "th": "тайский",
-        "ur": "урду",
-        "hr": "хорватский",
-        "bg": "болгарский",
-        "lt": "литовский",
-        "la": "латынь",
-        "mi": "маори",
-        "ml": "малаялам",
-        "cy": "валлийский",
-        "sk": "словацкий",
-        "fa": "персидский",
-        "lv": "латышский",
-        "sr": "сербский",
-        "az": "азербайджанский",
-        "sl": "словенский",
-        "kn": "каннада",
-        "et": "эстонский",
-        "mk": "македонский",
-        "br": "бретонский",
-        "eu": "баскский",
-        "is": "исландский",
-        "hy": "армянский",
-        "ne": "непальский",
-        "mn": "монгольский",
-        "bs": "боснийский",
-        "kk": "казахский",
-        "sq": "албанский",
-        "sw": "суахили",
-        "gl": "галисийский",
-        "mr": "маратхи",
-        "si": "сингальский",
-        "km": "кхмерский",
-        "sn": "шона",
-        "yo": "йоруба",
-        "so": "сомалийский",
-        "af": "африкаанс",
-        "oc": "окситанский",
-        "ka": "грузинский",
-        "be": "белорусский",
-        "tg": "таджикский",
-        "sd": "синдхи",
-        "gu": "гуджарати",
-        "am": "амхарский",
-        "yi": "идиш",
-        "lo": "лаосский",
-        "uz": "узбекский",
-        "fo": "фарерский",
-        "ht": "гаитянский креольский",
-        "ps": "пашто",
-        "tk": "туркменский",
-        "nn": "нюношк",
-        "mt": "мальтийский",
-        "sa": "санскрит",
-        "lb": "люксембургский",
-        "my": "мьянманский",
-        "bo": "тибетский",
-        "tl": "тагальский",
-        "mg": "малагасийский",
-        "as": "ассамский",
-        "tt": "татарский",
-        "haw": "гавайский",
-        "ln": "лингала",
-        "ha": "хауса",
-        "ba": "башкирский",
-        "jw": "яванский",
-        "su": "сунданский",
-        "yue": "кантонский",
-    }
-    return languages.get(code, "неизвестный язык")
+    return languages.LANGUAGES.get(code, "неизвестный язык")
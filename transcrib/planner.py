@@ -0,0 +1,361 @@
+"""
+Модуль оценивает время и затраты обработки накопившихся аудиофайлов.
+
+После обработки каждого файла сохраняется его длительность, время
+обработки и количество потоков torch (локальная база SQLite
+planner.sqlite в CACHE_DIR). По этим данным вычисляются коэффициенты
+реального времени (время обработки / длительность аудио) для каждой
+модели и языка. Для необработанных файлов входной директории модель
+определяется по директории файла (get_the_model_whisper), длительность
+берется из индекса длительностей (file_process.file_duration),
+а ожидаемый коэффициент модели - средний по языкам ранее обработанных
+файлов (или DEFAULT_RTF, если измерений нет).
+
+Оценка (машинное время, процессорные часы, время при текущем количестве
+процессов обработки, разбивка по директориям и количество процессов,
+необходимое для завершения к сроку):
+    python transcrib/planner.py [--workers 4] [--deadline 8] [--depth 1]
+
+Def:
+    record(model, lang, duration, elapsed, threads) -> None: Сохраняет
+                время обработки файла.
+    rtf_table() -> Dict: Возвращает коэффициенты реального времени
+                по моделям и языкам.
+    estimate(durations, workers, root, depth) -> Dict: Оценивает время
+                обработки файлов.
+    plan(path_in, workers, deadline, depth) -> Dict: Оценивает время
+                обработки необработанных файлов входной директории.
+    format_plan(result) -> str: Формирует текст оценки.
+"""
+
+import argparse
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import file_process
+import logger_settings
+import quality
+import variables
+
+# Коэффициенты реального времени моделей на CPU, если измерений нет
+# (транскрибирование и перевод на английский)
+DEFAULT_RTF: Dict[str, float] = {
+    "tiny": 0.15,
+    "base": 0.3,
+    "small": 0.8,
+    "medium": 2.0,
+    "large": 4.0,
+}
+# Количество последних обработанных файлов, по которым вычисляются
+# коэффициенты реального времени
+HISTORY_LIMIT = 10000
+# Количество потоков определения длительности файлов, которых нет в индексе
+PROBE_THREADS = 16
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _connection() -> sqlite3.Connection:
+    path = Path(variables.CACHE_DIR, "planner.sqlite")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS runs ("
+        " model TEXT NOT NULL,"
+        " lang TEXT NOT NULL,"
+        " duration REAL NOT NULL,"
+        " elapsed REAL NOT NULL,"
+        " threads INTEGER NOT NULL,"
+        " created REAL NOT NULL)"
+    )
+    return connection
+
+
+def record(
+    model: str, lang: str, duration: float, elapsed: float, threads: int
+) -> None:
+    """
+    Сохраняет время обработки файла для последующих оценок.
+
+    Args:
+        model (str): Тип модели Whisper.
+        lang (str): Язык аудиозаписи.
+        duration (float): Длительность аудио в секундах.
+        elapsed (float): Время обработки в секундах.
+        threads (int): Количество потоков torch.
+
+    Returns:
+        None
+    """
+    if duration <= 0:
+        return
+    try:
+        with _lock:
+            connection = _connection()
+            connection.execute(
+                "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?)",
+                (model, lang, duration, elapsed, threads, time.time()),
+            )
+            connection.commit()
+    except sqlite3.Error as e:
+        logger_settings.logger.warning(f"Ошибка базы планировщика: {e}")
+
+
+def rtf_table() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Возвращает коэффициенты реального времени по моделям и языкам
+    (по последним HISTORY_LIMIT обработанным файлам).
+
+    Returns:
+        Dict: {модель: {язык: {"rtf", "cpu_rtf", "hours", "files"}}},
+            где cpu_rtf - коэффициент с учетом количества потоков.
+    """
+    try:
+        with _lock:
+            rows = (
+                _connection()
+                .execute(
+                    "SELECT model, lang, SUM(elapsed), SUM(elapsed * threads),"
+                    " SUM(duration), COUNT(*) FROM ("
+                    " SELECT * FROM runs ORDER BY created DESC LIMIT ?)"
+                    " GROUP BY model, lang",
+                    (HISTORY_LIMIT,),
+                )
+                .fetchall()
+            )
+    except sqlite3.Error as e:
+        logger_settings.logger.warning(f"Ошибка базы планировщика: {e}")
+        rows = []
+    table: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for model, lang, elapsed, cpu, duration, files in rows:
+        table.setdefault(model, {})[lang] = {
+            "rtf": elapsed / duration,
+            "cpu_rtf": cpu / duration,
+            "hours": duration / 3600,
+            "files": files,
+        }
+    return table
+
+
+def _model_rtf(
+    model: str, table: Dict[str, Dict[str, Dict[str, float]]], workers: int
+) -> Tuple[float, float, bool]:
+    # средний по языкам коэффициент модели (с весом по длительности аудио)
+    langs = table.get(model)
+    if langs:
+        hours = sum(lang["hours"] for lang in langs.values())
+        rtf = sum(lang["rtf"] * lang["hours"] for lang in langs.values())
+        cpu = sum(lang["cpu_rtf"] * lang["hours"] for lang in langs.values())
+        return rtf / hours, cpu / hours, True
+    rtf = DEFAULT_RTF.get(model.split(".")[0], DEFAULT_RTF["large"])
+    threads = max(1, len(os.sched_getaffinity(0)) // max(1, workers))
+    return rtf, rtf * threads, False
+
+
+def _folder(file: Path, root: Path, depth: int) -> str:
+    try:
+        parts = file.relative_to(root).parts[:-1]
+    except ValueError:
+        parts = file.parent.parts
+    return "/".join(parts[:depth]) or "."
+
+
+def estimate(
+    durations: Dict[Path, float],
+    workers: int = variables.WORKERS_PER_HOST,
+    root: Path = variables.DIR_SOUND_IN,
+    depth: int = 1,
+) -> Dict[str, Any]:
+    """
+    Оценивает время обработки файлов.
+
+    Args:
+        durations (Dict[Path, float]): Длительности файлов в секундах.
+        workers (int): Количество процессов обработки.
+        root (Path): Директория, относительно которой группируются файлы.
+        depth (int): Глубина директорий для разбивки.
+
+    Returns:
+        Dict: Количество файлов, часы аудио, машинные часы (один процесс),
+            процессорные часы, время при workers процессах, а также
+            разбивка по моделям и директориям.
+    """
+    table = rtf_table()
+    workers = max(1, workers)
+    models: Dict[str, Dict[str, Any]] = {}
+    folders: Dict[str, Dict[str, float]] = {}
+    worker_seconds = 0.0
+    cpu_seconds = 0.0
+    for file, duration in durations.items():
+        model = quality.get_the_model_whisper(file)
+        if model not in models:
+            rtf, cpu_rtf, measured = _model_rtf(model, table, workers)
+            models[model] = {
+                "rtf": rtf,
+                "cpu_rtf": cpu_rtf,
+                "measured": measured,
+                "files": 0,
+                "audio_hours": 0.0,
+                "worker_hours": 0.0,
+            }
+        entry = models[model]
+        entry["files"] += 1
+        entry["audio_hours"] += duration / 3600
+        entry["worker_hours"] += duration * entry["rtf"] / 3600
+        worker_seconds += duration * entry["rtf"]
+        cpu_seconds += duration * entry["cpu_rtf"]
+        folder = folders.setdefault(
+            _folder(Path(file), Path(root), depth),
+            {"files": 0, "audio_hours": 0.0, "worker_hours": 0.0},
+        )
+        folder["files"] += 1
+        folder["audio_hours"] += duration / 3600
+        folder["worker_hours"] += duration * entry["rtf"] / 3600
+    return {
+        "files": len(durations),
+        "audio_hours": sum(durations.values()) / 3600,
+        "worker_hours": worker_seconds / 3600,
+        "cpu_hours": cpu_seconds / 3600,
+        "workers": workers,
+        "wall_hours": worker_seconds / 3600 / workers,
+        "models": models,
+        "folders": folders,
+    }
+
+
+def plan(
+    path_in: Path = variables.DIR_SOUND_IN,
+    workers: int = variables.WORKERS_PER_HOST,
+    deadline: Optional[float] = None,
+    depth: int = 1,
+) -> Dict[str, Any]:
+    """
+    Оценивает время обработки необработанных файлов входной директории.
+
+    Args:
+        path_in (Path): Входная директория.
+        workers (int): Количество процессов обработки.
+        deadline (float, optional): Срок завершения в часах.
+        depth (int): Глубина директорий для разбивки.
+
+    Returns:
+        Dict: Оценка (см. estimate), а также количество пропущенных
+            файлов и процессов, необходимых для завершения к сроку.
+    """
+    time_start = time.perf_counter()
+    files = [
+        file
+        for file in file_process.get_files(
+            Path(path_in), list(variables.EXTENSIONS)
+        )
+        if not file.with_suffix(".txt").is_file()
+        and not file.with_suffix(".proc").is_file()
+    ]
+    # длительности из индекса, отсутствующие определяются параллельно
+    with ThreadPoolExecutor(max_workers=PROBE_THREADS) as executor:
+        probed = dict(
+            zip(files, executor.map(file_process.file_duration, files))
+        )
+    durations = {
+        file: duration
+        for file, duration in probed.items()
+        if 0 < duration <= variables.DURATION_LIMIT
+    }
+    result = estimate(durations, workers, Path(path_in), depth)
+    result["skipped"] = len(probed) - len(durations)
+    if deadline:
+        result["deadline_hours"] = deadline
+        result["workers_needed"] = math.ceil(result["worker_hours"] / deadline)
+    result["scan_seconds"] = time.perf_counter() - time_start
+    return result
+
+
+def format_plan(result: Dict[str, Any]) -> str:
+    """
+    Формирует текст оценки времени обработки.
+
+    Args:
+        result (Dict): Результат plan или estimate.
+
+    Returns:
+        str: Текст оценки.
+    """
+    text = (
+        f"Необработанных аудиофайлов: {result['files']}"
+        f" (пропущено: {result.get('skipped', 0)})\n"
+        f"Длительность аудио: {result['audio_hours']:.1f} ч\n"
+        f"Машинное время (один процесс): {result['worker_hours']:.1f} ч\n"
+        f"Процессорное время: {result['cpu_hours']:.1f} ядро-ч\n"
+        f"Время обработки ({result['workers']} процессов):"
+        f" {result['wall_hours']:.1f} ч\n"
+    )
+    if "workers_needed" in result:
+        text += (
+            f"Процессов для завершения за {result['deadline_hours']} ч:"
+            f" {result['workers_needed']}\n"
+        )
+    text += "-------------------- \n"
+    text += "Модели (коэффициент реального времени):\n"
+    for model, entry in sorted(result["models"].items()):
+        source = "измерено" if entry["measured"] else "по умолчанию"
+        text += (
+            f"  {model:<8} файлов {entry['files']:>7}"
+            f"  аудио {entry['audio_hours']:>8.1f} ч"
+            f"  обработка {entry['worker_hours']:>8.1f} ч"
+            f"  RTF {entry['rtf']:.2f} ({source})\n"
+        )
+    text += "-------------------- \n"
+    text += "Директории:\n"
+    for folder, entry in sorted(
+        result["folders"].items(), key=lambda item: -item[1]["worker_hours"]
+    ):
+        text += (
+            f"  {folder}: файлов {entry['files']},"
+            f" аудио {entry['audio_hours']:.1f} ч,"
+            f" обработка {entry['worker_hours']:.1f} ч\n"
+        )
+    if "scan_seconds" in result:
+        text += f"Оценка выполнена за {result['scan_seconds']:.1f} сек.\n"
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Оценка времени обработки аудиофайлов"
+    )
+    parser.add_argument(
+        "--path",
+        type=Path,
+        default=variables.DIR_SOUND_IN,
+        help="входная директория",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=variables.WORKERS_PER_HOST,
+        help="количество процессов обработки",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="срок завершения в часах (оценка количества процессов)",
+    )
+    parser.add_argument(
+        "--depth",
+        type=int,
+        default=1,
+        help="глубина директорий для разбивки",
+    )
+    args = parser.parse_args()
+    print(
+        format_plan(plan(args.path, args.workers, args.deadline, args.depth))
+    )
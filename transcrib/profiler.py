@@ -0,0 +1,223 @@
+"""
+Модуль профилирует обработку отдельных аудиофайлов.
+
+Профилирование включается для всех файлов (PROFILE в .env) или для
+файлов директории, в которой (или в родительской директории которой)
+находится файл-флаг .profile. Во время обработки файла отдельный поток
+с интервалом SAMPLE_INTERVAL записывает стек вызовов потока обработки
+(с названием текущего этапа), а профилировщик torch (если включен
+PROFILE_TORCH) собирает время операций моделей. Профилировщик torch
+хранит все операции до конца обработки файла, поэтому по умолчанию
+отключен.
+
+Если обработка заняла не меньше PROFILE_THRESHOLD секунд, рядом
+с аудиофайлом сохраняются:
+    (имя файла).profile.folded  стеки в формате folded (flamegraph.pl,
+                                speedscope.app);
+    (имя файла).profile.txt     сводка: доли этапов, функции
+                                с наибольшим временем, операции torch.
+
+Def:
+    enabled_for(file) -> bool: Проверяет, включено ли профилирование файла.
+    mark(name) -> Iterator[None]: Отмечает этап обработки в профиле.
+    profile(file) -> Iterator[None]: Профилирует обработку файла.
+"""
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple, Union
+
+import logger_settings
+import staging
+import torch
+import variables
+
+# Интервал записи стека вызовов, секунд
+SAMPLE_INTERVAL = 0.01
+# Количество строк в сводке (функции и операции torch)
+TOP_N = 30
+# Имя файла-флага, включающего профилирование для директории
+FLAG_FILE = ".profile"
+
+# Этап обработки, отмечаемый в стеках (см. mark)
+_stage = "-"
+# Профилировщик torch активен (отметки этапов передаются и в него)
+_torch_active = False
+
+
+def enabled_for(file: Union[str, Path]) -> bool:
+    """
+    Проверяет, включено ли профилирование обработки файла.
+
+    Args:
+        file (Union[str, Path]): Путь к аудиофайлу.
+
+    Returns:
+        bool: True, если задан PROFILE или в директории файла
+            (или родительской директории) есть файл-флаг .profile.
+    """
+    if variables.PROFILE:
+        return True
+    return any(
+        Path(parent, FLAG_FILE).is_file() for parent in Path(file).parents
+    )
+
+
+@contextmanager
+def mark(name: str) -> Iterator[None]:
+    """
+    Отмечает этап обработки: стеки, записанные внутри контекста,
+    относятся к этапу name (и операции torch - к record_function name).
+
+    Args:
+        name (str): Название этапа.
+
+    Yields:
+        None
+    """
+    global _stage
+    previous = _stage
+    _stage = name
+    try:
+        if _torch_active:
+            with torch.profiler.record_function(name):
+                yield
+        else:
+            yield
+    finally:
+        _stage = previous
+
+
+class _Sampler(threading.Thread):
+    """
+    Поток, записывающий стек вызовов потока обработки.
+    """
+
+    def __init__(self, thread_id: int) -> None:
+        super().__init__(name="profiler", daemon=True)
+        self.thread_id = thread_id
+        self.stacks: Counter[Tuple[str, ...]] = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            names: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(
+                    f"{code.co_name} "
+                    f"({Path(code.co_filename).name}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if names:
+                names.append(f"[{_stage}]")
+                self.stacks[tuple(reversed(names))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+
+def _folded(stacks: Counter[Tuple[str, ...]]) -> str:
+    return "".join(
+        f"{';'.join(stack)} {count}\n" for stack, count in stacks.items()
+    )
+
+
+def _summary(
+    file: Path,
+    elapsed: float,
+    stacks: Counter[Tuple[str, ...]],
+    torch_table: Optional[str],
+) -> str:
+    total = max(1, sum(stacks.values()))
+    stages: Counter[str] = Counter()
+    own: Counter[str] = Counter()
+    inclusive: Counter[str] = Counter()
+    for stack, count in stacks.items():
+        stages[stack[0]] += count
+        own[stack[-1]] += count
+        for name in set(stack[1:]):
+            inclusive[name] += count
+    text = f"Профиль обработки аудиофайла:\n {file}\n"
+    text += f"Время обработки: {elapsed:.1f} сек., "
+    text += f"выборок стека: {total} (интервал {SAMPLE_INTERVAL} сек.)\n"
+    text += "-------------------- \n"
+    text += "Этапы (доля выборок):\n"
+    for name, count in stages.most_common():
+        text += f"{100 * count / total:6.1f}%  {name}\n"
+    text += "-------------------- \n"
+    text += "Функции (собственное время):\n"
+    for name, count in own.most_common(TOP_N):
+        text += f"{100 * count / total:6.1f}%  {name}\n"
+    text += "-------------------- \n"
+    text += "Функции (с учетом вызванных функций):\n"
+    for name, count in inclusive.most_common(TOP_N):
+        text += f"{100 * count / total:6.1f}%  {name}\n"
+    if torch_table:
+        text += "-------------------- \n"
+        text += "Операции torch:\n"
+        text += torch_table
+    return text
+
+
+@contextmanager
+def profile(file: Union[str, Path]) -> Iterator[None]:
+    """
+    Профилирует обработку файла внутри контекста (если профилирование
+    включено для файла) и сохраняет профиль рядом с файлом.
+
+    Args:
+        file (Union[str, Path]): Путь к аудиофайлу.
+
+    Yields:
+        None
+    """
+    global _torch_active
+    if not enabled_for(file):
+        yield
+        return
+    file = Path(file)
+    sampler = _Sampler(threading.get_ident())
+    torch_profiler = None
+    time_start = time.perf_counter()
+    with ExitStack() as stack:
+        if variables.PROFILE_TORCH:
+            torch_profiler = stack.enter_context(
+                torch.profiler.profile(
+                    activities=[torch.profiler.ProfilerActivity.CPU]
+                )
+            )
+            _torch_active = True
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            _torch_active = False
+    elapsed = time.perf_counter() - time_start
+    if elapsed < variables.PROFILE_THRESHOLD:
+        logger_settings.logger.debug(
+            "Обработка файла {} быстрее порога профилирования", file
+        )
+        return
+    torch_table = None
+    if torch_profiler is not None:
+        torch_table = torch_profiler.key_averages().table(
+            sort_by="self_cpu_time_total", row_limit=TOP_N
+        )
+    staging.write_text(
+        file.with_suffix(".profile.folded"), _folded(sampler.stacks)
+    )
+    staging.write_text(
+        file.with_suffix(".profile.txt"),
+        _summary(file, elapsed, sampler.stacks, torch_table),
+    )
+    logger_settings.logger.info(
+        f"Профиль обработки сохранен: {file.with_suffix('.profile.txt')}"
+    )
@@ -0,0 +1,45 @@
+"""
+Модуль сопоставляет директории качества обработки с моделями Whisper.
+
+Модуль не загружает нейросети (не импортирует torch и transformers),
+поэтому модель файла определяют планировщик, сервис и цикл обработки
+без загрузки моделей.
+
+Def:
+    get_the_model_whisper(file) -> str: Возвращает тип модели для Whisper
+                в соответствии с директорией расположения файла.
+"""
+
+from pathlib import Path
+from typing import Dict, Union
+
+import variables
+
+# Сопоставление директорий качества обработки с типами моделей
+QUALITY_MAPPING: Dict[str, str] = {
+    "tiny (quality = low)": "tiny",
+    "base (quality = 2)": "base",
+    "small (quality = 3)": "small",
+    "medium (quality = 4)": "medium",
+    "large (quality = max)": "large",
+}
+
+
+def get_the_model_whisper(file: Union[Path, str]) -> str:
+    """
+    Получить тип модели для Whisper
+        в соответствии с директорией расположения файла.
+
+    Args:
+        file (Union[Path, str]): Путь к файлу.
+
+    Returns:
+        str: Тип модели.
+    """
+    # Преобразовать файл в строку, если он является объектом Path
+    file_str = str(file) if isinstance(file, Path) else file
+    # Вернуть тип модели на основе директории файла
+    return next(
+        (value for key, value in QUALITY_MAPPING.items() if key in file_str),
+        variables.MODEL,
+    )
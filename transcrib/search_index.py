@@ -0,0 +1,401 @@
+"""
+Модуль ведет полнотекстовый индекс результатов обработки.
+
+Сегменты каждого обработанного файла (исходный, английский и русский
+текст, начало и конец сегмента в миллисекундах) добавляются в локальную
+базу SQLite FTS5 (search.sqlite в CACHE_DIR) вместе с путем к файлу,
+языком, моделью и временем обработки. Сегменты исходного текста
+сопоставляются с английскими сегментами по времени.
+
+Индекс заполняется из существующих файлов (имя файла).txt разбором
+раздела "Разбор по сегментам".
+
+Поиск и заполнение индекса:
+    python transcrib/search_index.py query "<запрос>" [--lang ru]
+                                     [--model small] [--path <директория>]
+                                     [--since 2024-01-01] [--limit 20]
+    python transcrib/search_index.py backfill [--path <директория>]
+
+Def:
+    add(file, lang, model, original, english, russian) -> None: Добавляет
+                сегменты файла в индекс.
+    parse_report(text) -> Optional[Dict]: Разбирает текст (имя файла).txt.
+    backfill(path_in) -> int: Добавляет в индекс существующие результаты.
+    search(query, lang, model, path, since, until, limit) -> List[Dict]:
+                Возвращает сегменты, соответствующие запросу.
+"""
+
+import argparse
+import bisect
+import datetime
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import languages
+import logger_settings
+import variables
+
+# Сдвиг номера файла в rowid сегмента (rowid = номер файла << 20 | номер
+# сегмента): сегменты файла удаляются по диапазону rowid
+ROWID_SHIFT = 20
+# Максимальное количество результатов поиска
+MAX_LIMIT = 1000
+# Время, за которое результат обработки (имя файла).txt переносится
+# на сетевой ресурс после добавления файла в индекс, секунд: более
+# поздний (имя файла).txt заменен и добавляется в индекс заново
+REPORT_DELAY = 24 * 3600
+
+_lock = threading.Lock()
+
+RE_SEGMENT = re.compile(
+    r"^ID элемента: (?P<id>\d+) Начало: (?P<start>\d+) --- "
+    r"Конец: (?P<end>\d+)"
+)
+RE_FILE = re.compile(r"^Транскрибирование аудиофайла:\n (?P<file>.+)$", re.M)
+RE_LANG = re.compile(r"^В файле используется (?P<lang>.+) язык\.", re.M)
+RE_MODEL = re.compile(r"модели 'Whisper\.(?P<model>[^']+)'")
+
+
+@lru_cache(maxsize=None)
+def _connection() -> sqlite3.Connection:
+    path = Path(variables.CACHE_DIR, "search.sqlite")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS files ("
+        " id INTEGER PRIMARY KEY,"
+        " path TEXT UNIQUE NOT NULL,"
+        " lang TEXT NOT NULL,"
+        " model TEXT NOT NULL,"
+        " created REAL NOT NULL,"
+        " source_mtime_ns INTEGER)"
+    )
+    connection.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5("
+        " original, english, russian,"
+        " start_ms UNINDEXED, end_ms UNINDEXED,"
+        " tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    return connection
+
+
+def _align(
+    original: List[Dict[str, Any]], english: List[Dict[str, Any]]
+) -> List[str]:
+    # сегмент исходного текста относится к английскому сегменту,
+    # в котором находится его середина
+    texts: List[List[str]] = [[] for _ in english]
+    starts = [segment["start"] for segment in english]
+    for segment in original:
+        if not english:
+            break
+        middle = (segment["start"] + segment["end"]) / 2
+        index = max(0, bisect.bisect_right(starts, middle) - 1)
+        texts[index].append(segment["text"].strip())
+    return [" ".join(parts) for parts in texts]
+
+
+def add(
+    file: Union[str, Path],
+    lang: str,
+    model: str,
+    original: List[Dict[str, Any]],
+    english: List[Dict[str, Any]],
+    russian: List[str],
+    created: Optional[float] = None,
+    source_mtime_ns: Optional[int] = None,
+) -> None:
+    """
+    Добавляет сегменты файла в индекс (заменяя ранее добавленные).
+
+    Args:
+        file (Union[str, Path]): Путь к аудиофайлу.
+        lang (str): Язык аудиозаписи.
+        model (str): Тип модели Whisper.
+        original (list[dict]): Сегменты исходного текста (start, end,
+            text; пустой список для английского языка).
+        english (list[dict]): Сегменты английского текста.
+        russian (list[str]): Переводы английских сегментов на русский.
+        created (float, optional): Время обработки (по умолчанию - текущее).
+        source_mtime_ns (int, optional): Время изменения (имя файла).txt,
+            из которого заполнен индекс.
+
+    Returns:
+        None
+    """
+    if not variables.SEARCH_INDEX:
+        return
+    originals = (
+        _align(original, english)
+        if original
+        else [segment["text"].strip() for segment in english]
+    )
+    try:
+        with _lock:
+            connection = _connection()
+            with connection:
+                connection.execute(
+                    "INSERT INTO files (path, lang, model, created,"
+                    " source_mtime_ns) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (path) DO UPDATE SET lang = excluded.lang,"
+                    " model = excluded.model, created = excluded.created,"
+                    " source_mtime_ns = excluded.source_mtime_ns",
+                    (
+                        str(file),
+                        lang,
+                        model,
+                        created or time.time(),
+                        source_mtime_ns,
+                    ),
+                )
+                (file_id,) = connection.execute(
+                    "SELECT id FROM files WHERE path = ?", (str(file),)
+                ).fetchone()
+                first = file_id << ROWID_SHIFT
+                connection.execute(
+                    "DELETE FROM segments WHERE rowid BETWEEN ? AND ?",
+                    (first, first + (1 << ROWID_SHIFT) - 1),
+                )
+                connection.executemany(
+                    "INSERT INTO segments (rowid, original, english, russian,"
+                    " start_ms, end_ms) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            first + index,
+                            text_original,
+                            segment["text"].strip(),
+                            text_ru.strip(),
+                            int(segment["start"] * 1000),
+                            int(segment["end"] * 1000),
+                        )
+                        for index, (segment, text_original, text_ru) in (
+                            enumerate(zip(english, originals, russian))
+                        )
+                    ],
+                )
+    except sqlite3.Error as e:
+        logger_settings.logger.warning(f"Ошибка поискового индекса: {e}")
+
+
+def parse_report(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Разбирает текст (имя файла).txt: заголовок и раздел
+    "Разбор по сегментам".
+
+    Args:
+        text (str): Текст результата обработки.
+
+    Returns:
+        Optional[Dict]: file, lang, model, original, english, russian
+            (аргументы add) или None, если текст не является результатом
+            обработки.
+    """
+    file_match = RE_FILE.search(text)
+    model_match = RE_MODEL.search(text)
+    if file_match is None or model_match is None:
+        return None
+    lang_match = RE_LANG.search(text)
+    names = {name: code for code, name in languages.LANGUAGES.items()}
+    lang = names.get(lang_match["lang"], "") if lang_match else ""
+    original: List[Dict[str, Any]] = []
+    english: List[Dict[str, Any]] = []
+    russian: List[str] = []
+    segment: Dict[str, Any] = {}
+    _, _, segments_text = text.partition("Разбор по сегментам.")
+    for line in segments_text.splitlines():
+        match = RE_SEGMENT.match(line)
+        if match:
+            segment = {
+                "start": int(match["start"]),
+                "end": int(match["end"]),
+            }
+        elif line.startswith("Исходный текст:") and segment:
+            original.append({**segment, "text": line[15:].strip()})
+        elif line.startswith("Английский текст:") and segment:
+            english.append({**segment, "text": line[17:].strip()})
+        elif line.startswith("Русский:") and segment:
+            russian.append(line[8:].strip())
+    return {
+        "file": file_match["file"].strip(),
+        "lang": lang,
+        "model": model_match["model"],
+        "original": original,
+        "english": english,
+        "russian": russian,
+    }
+
+
+def backfill(path_in: Path = variables.DIR_SOUND_IN) -> int:
+    """
+    Добавляет в индекс результаты из существующих файлов (имя файла).txt
+    (файлы, добавленные в индекс при обработке или при прошлом
+    заполнении, пропускаются, если (имя файла).txt с тех пор не изменен).
+
+    Args:
+        path_in (Path): Директория с результатами обработки.
+
+    Returns:
+        int: Количество добавленных файлов.
+    """
+    with _lock:
+        indexed = {
+            path: (created, mtime_ns)
+            for path, created, mtime_ns in _connection().execute(
+                "SELECT path, created, source_mtime_ns FROM files"
+            )
+        }
+    added = 0
+    for txt_file in Path(path_in).rglob("*.txt"):
+        if txt_file.name.endswith(".profile.txt"):
+            continue
+        try:
+            mtime_ns = txt_file.stat().st_mtime_ns
+            report = parse_report(txt_file.read_text(encoding="utf-8"))
+        except (OSError, UnicodeDecodeError):
+            continue
+        if report is None or not report["english"]:
+            continue
+        if report["file"] in indexed:
+            created, source_mtime_ns = indexed[report["file"]]
+            # файл добавлен при обработке (source_mtime_ns не задано):
+            # (имя файла).txt записывается после добавления в индекс
+            if source_mtime_ns is None:
+                source_mtime_ns = (created + REPORT_DELAY) * 1e9
+            if mtime_ns <= source_mtime_ns:
+                continue
+        add(
+            report["file"],
+            report["lang"],
+            report["model"],
+            report["original"],
+            report["english"],
+            report["russian"],
+            created=mtime_ns / 1e9,
+            source_mtime_ns=mtime_ns,
+        )
+        added += 1
+    logger_settings.logger.info(f"Добавлено в поисковый индекс: {added}")
+    return added
+
+
+def search(
+    query: str,
+    lang: Optional[str] = None,
+    model: Optional[str] = None,
+    path: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 50,
+) -> List[Dict[str, Any]]:
+    """
+    Возвращает сегменты, соответствующие запросу (синтаксис FTS5),
+    в порядке релевантности.
+
+    Args:
+        query (str): Поисковый запрос.
+        lang (str, optional): Язык аудиозаписи.
+        model (str, optional): Тип модели Whisper.
+        path (str, optional): Начало пути к файлу (директория).
+        since (float, optional): Обработан не раньше (timestamp).
+        until (float, optional): Обработан не позже (timestamp).
+        limit (int): Максимальное количество результатов.
+
+    Returns:
+        List[Dict]: Сегменты: path, lang, model, start_ms, end_ms,
+            original, english, russian.
+
+    Raises:
+        sqlite3.OperationalError: Некорректный запрос.
+    """
+    conditions = ["segments MATCH ?"]
+    params: List[Any] = [query]
+    for condition, value in (
+        ("files.lang = ?", lang),
+        ("files.model = ?", model),
+        ("files.path LIKE ? || '%'", path),
+        ("files.created >= ?", since),
+        ("files.created <= ?", until),
+    ):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    params.append(max(1, min(limit, MAX_LIMIT)))
+    with _lock:
+        rows = (
+            _connection()
+            .execute(
+                "SELECT files.path, files.lang, files.model,"
+                " segments.start_ms, segments.end_ms, segments.original,"
+                " segments.english, segments.russian"
+                " FROM segments JOIN files"
+                f" ON files.id = (segments.rowid >> {ROWID_SHIFT})"
+                f" WHERE {' AND '.join(conditions)}"
+                " ORDER BY segments.rank LIMIT ?",
+                params,
+            )
+            .fetchall()
+        )
+    keys = (
+        "path",
+        "lang",
+        "model",
+        "start_ms",
+        "end_ms",
+        "original",
+        "english",
+        "russian",
+    )
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def _timestamp(date: Optional[str]) -> Optional[float]:
+    if not date:
+        return None
+    return datetime.datetime.fromisoformat(date).timestamp()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Полнотекстовый поиск по результатам обработки"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    query_parser = commands.add_parser("query", help="поиск сегментов")
+    query_parser.add_argument("query", help="запрос (синтаксис FTS5)")
+    query_parser.add_argument("--lang", help="язык аудиозаписи")
+    query_parser.add_argument("--model", help="модель Whisper")
+    query_parser.add_argument("--path", help="директория файлов")
+    query_parser.add_argument("--since", help="обработан не раньше (дата)")
+    query_parser.add_argument("--until", help="обработан не позже (дата)")
+    query_parser.add_argument("--limit", type=int, default=20)
+    backfill_parser = commands.add_parser(
+        "backfill", help="заполнение индекса из файлов (имя файла).txt"
+    )
+    backfill_parser.add_argument(
+        "--path", type=Path, default=variables.DIR_SOUND_IN
+    )
+    args = parser.parse_args()
+    if args.command == "backfill":
+        backfill(args.path)
+    else:
+        for result in search(
+            args.query,
+            args.lang,
+            args.model,
+            args.path,
+            _timestamp(args.since),
+            _timestamp(args.until),
+            args.limit,
+        ):
+            print(
+                f"{result['path']} [{result['start_ms']}-{result['end_ms']}"
+                f" мс] ({result['lang']}, {result['model']})\n"
+                f"  {result['original']}\n"
+                f"  {result['english']}\n"
+                f"  {result['russian']}"
+            )
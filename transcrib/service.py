@@ -0,0 +1,534 @@
+"""
+Модуль запускает локальный HTTP-сервис транскрибирования на asyncio.
+
+Сервис принимает задания (загрузку аудиофайла или путь к файлу),
+ставит их в ограниченную очередь и обрабатывает с помощью той же функции
+neural_process.final_process, используя модели, загруженные в память
+один раз. Готовые сегменты передаются клиенту по мере их появления.
+
+HTTP API:
+    POST /jobs                 Тело запроса - аудиофайл (имя файла задается
+                               параметром ?filename=, модель - ?model=)
+                               или JSON {"path": "<путь к аудиофайлу>"}
+                               (только внутри DIR_SOUND_IN, иначе 403).
+                               Возвращает 202 и {"id": ..., "status": ...},
+                               либо 429, если очередь заполнена.
+                               Директория загруженного файла (с результатом
+                               и временными файлами обработки) удаляется
+                               после обработки: результат хранится
+                               в задании.
+    GET  /jobs/<id>            Состояние задания и результат.
+    GET  /jobs/<id>/stream     События задания (NDJSON) по мере обработки.
+    GET  /memory               Резервирования памяти процессов обработки.
+    GET  /search?q=<запрос>    Полнотекстовый поиск по сегментам результатов
+                               (фильтры ?lang=, ?model=, ?path=, ?since=,
+                               ?until= - даты ISO, ?limit=).
+
+Def:
+    remove_upload(file) -> None: Удаляет директорию загруженного файла.
+    main() -> None: Запускает сервис.
+"""
+
+import asyncio
+import datetime
+import functools
+import json
+import shutil
+import sqlite3
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import admission
+import file_process
+import logger_settings
+import main as main_process
+import neural_process
+import quality
+import search_index
+import staging
+import variables
+
+# Количество завершенных заданий, хранящихся в памяти сервиса
+JOBS_HISTORY = 1000
+# Размер блока чтения загружаемого файла
+CHUNK_SIZE = 1024 * 1024
+
+HTTP_REASONS = {
+    200: "OK",
+    202: "Accepted",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+}
+
+
+class Job:
+    """
+    Задание на транскрибирование одного аудиофайла.
+
+    Attributes:
+        id (str): Идентификатор задания.
+        file (Path): Путь к аудиофайлу.
+        upload (bool): Файл загружен клиентом (директория файла
+            удаляется после обработки).
+        status (str): queued, processing, done или error.
+        events (list): События обработки (ход обработки и сегменты).
+        result (Optional[str]): Текст результата.
+        error (Optional[str]): Описание ошибки.
+    """
+
+    def __init__(self, file: Path, upload: bool = False) -> None:
+        self.id = uuid.uuid4().hex
+        self.file = file
+        self.upload = upload
+        self.status = "queued"
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self.changed = asyncio.Event()
+
+    def add_event(self, event: Dict[str, Any]) -> None:
+        """
+        Добавляет событие и будит клиентов, ожидающих поток событий.
+
+        Args:
+            event (dict): Событие обработки.
+
+        Returns:
+            None
+        """
+        self.events.append(event)
+        self.changed.set()
+
+    def finish(
+        self,
+        status: str,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        """
+        Завершает задание.
+
+        Args:
+            status (str): Итоговое состояние (done или error).
+            result (Optional[str]): Текст результата.
+            error (Optional[str]): Описание ошибки.
+
+        Returns:
+            None
+        """
+        self.status = status
+        self.result = result
+        self.error = error
+        self.add_event({"event": status, "error": error})
+
+    def to_dict(self, with_result: bool = True) -> Dict[str, Any]:
+        """
+        Возвращает описание задания для ответа клиенту.
+
+        Args:
+            with_result (bool): Добавить текст результата.
+
+        Returns:
+            dict: Описание задания.
+        """
+        data: Dict[str, Any] = {
+            "id": self.id,
+            "file": str(self.file),
+            "status": self.status,
+            "error": self.error,
+        }
+        if with_result:
+            data["result"] = self.result
+        return data
+
+
+class TranscribService:
+    """
+    HTTP-сервис с ограниченной очередью заданий и одним обработчиком,
+    который выполняет задания в отдельном потоке.
+    """
+
+    def __init__(self) -> None:
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(
+            maxsize=variables.SERVICE_QUEUE_SIZE
+        )
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        # модели Whisper и переводчик используют общее состояние,
+        # поэтому задания выполняются строго по одному
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def worker(self) -> None:
+        """
+        Выполняет задания из очереди.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            job.status = "processing"
+            job.add_event({"event": "processing"})
+
+            def listener(event: Dict[str, Any], job: Job = job) -> None:
+                loop.call_soon_threadsafe(job.add_event, event)
+
+            try:
+                # задание ждет освобождения памяти, а не откладывается
+                result = await loop.run_in_executor(
+                    self.executor,
+                    main_process.transcrib_file,
+                    job.file,
+                    listener,
+                    True,
+                )
+                if result is None:
+                    job.finish("error", error="file is already in process")
+                else:
+                    job.finish("done", result=result)
+            except Exception as e:
+                logger_settings.logger.exception(
+                    f"Ошибка обработки файла {job.file}: {e}"
+                )
+                job.finish("error", error=str(e))
+            finally:
+                if job.upload:
+                    await loop.run_in_executor(
+                        self.executor, remove_upload, job.file
+                    )
+                self.queue.task_done()
+
+    def add_job(self, job: Job) -> None:
+        """
+        Запоминает задание, удаляя самые старые завершенные задания.
+
+        Args:
+            job (Job): Задание.
+
+        Returns:
+            None
+        """
+        self.jobs[job.id] = job
+        while len(self.jobs) > JOBS_HISTORY:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.status not in ("done", "error"):
+                break
+            self.jobs.popitem(last=False)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Обрабатывает одно HTTP-соединение.
+
+        Args:
+            reader (asyncio.StreamReader): Входной поток соединения.
+            writer (asyncio.StreamWriter): Выходной поток соединения.
+
+        Returns:
+            None
+        """
+        try:
+            request_line = (await reader.readline()).decode("latin-1")
+            method, target, _ = request_line.split(" ", 2)
+            headers: Dict[str, str] = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            parts = [unquote(p) for p in url.path.strip("/").split("/")]
+
+            if parts == ["memory"] and method == "GET":
+                status, body = 200, admission.current_reservation()
+            elif parts == ["search"] and method == "GET":
+                status, body = await self.search(query)
+            elif parts == ["jobs"] and method == "POST":
+                status, body = await self.post_job(reader, headers, query)
+            elif len(parts) == 2 and parts[0] == "jobs" and method == "GET":
+                job = self.jobs.get(parts[1])
+                status, body = (
+                    (200, job.to_dict())
+                    if job
+                    else (404, {"error": "job not found"})
+                )
+            elif len(parts) == 3 and parts[::2] == ["jobs", "stream"]:
+                job = self.jobs.get(parts[1])
+                if job is None:
+                    status, body = 404, {"error": "job not found"}
+                else:
+                    await self.stream_job(job, writer)
+                    return
+            else:
+                status, body = 404, {"error": "not found"}
+            await self.respond(writer, status, body)
+        except ValueError as e:
+            logger_settings.logger.debug(f"Некорректный HTTP-запрос: {e}")
+            await self.respond(writer, 400, {"error": "bad request"})
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            logger_settings.logger.debug(f"Соединение прервано: {e}")
+        finally:
+            writer.close()
+
+    async def search(
+        self, query: Dict[str, str]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Выполняет полнотекстовый поиск по сегментам результатов.
+
+        Args:
+            query (dict): Параметры запроса.
+
+        Returns:
+            Tuple[int, dict]: HTTP-код и тело ответа.
+        """
+        if not query.get("q"):
+            return 400, {"error": "parameter q is required"}
+        since, until = (
+            (
+                datetime.datetime.fromisoformat(query[key]).timestamp()
+                if query.get(key)
+                else None
+            )
+            for key in ("since", "until")
+        )
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    search_index.search,
+                    query["q"],
+                    lang=query.get("lang"),
+                    model=query.get("model"),
+                    path=query.get("path"),
+                    since=since,
+                    until=until,
+                    limit=int(query.get("limit", "50")),
+                ),
+            )
+        except sqlite3.OperationalError as e:
+            return 400, {"error": f"bad search query: {e}"}
+        return 200, {"results": results}
+
+    async def post_job(
+        self,
+        reader: asyncio.StreamReader,
+        headers: Dict[str, str],
+        query: Dict[str, str],
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Создает задание из загруженного файла или из пути к файлу.
+
+        Args:
+            reader (asyncio.StreamReader): Входной поток с телом запроса.
+            headers (dict): Заголовки запроса.
+            query (dict): Параметры запроса.
+
+        Returns:
+            Tuple[int, dict]: HTTP-код и тело ответа.
+        """
+        if self.queue.full():
+            return 429, {"error": "queue is full, retry later"}
+        # операции с файлами (проверка длительности ffmpeg, запись
+        # загрузки) выполняются вне цикла событий
+        loop = asyncio.get_running_loop()
+        length = int(headers.get("content-length", "0"))
+        if length > variables.SERVICE_MAX_UPLOAD_MB * 1024 * 1024:
+            return 413, {"error": "file is too large"}
+
+        is_json = headers.get("content-type", "").startswith(
+            "application/json"
+        )
+        if is_json:
+            data = json.loads(await reader.readexactly(length))
+            file = Path(data.get("path", "")).resolve()
+            # обрабатываются только файлы входной директории
+            if not file.is_relative_to(Path(variables.DIR_SOUND_IN).resolve()):
+                return 403, {"error": "path is outside of DIR_SOUND_IN"}
+            if not await loop.run_in_executor(
+                None, file_process.check_file_must_trascrib, file
+            ):
+                return 400, {"error": f"file can not be processed: {file}"}
+        else:
+            file = await loop.run_in_executor(
+                None,
+                self.upload_path,
+                query.get("filename", "audio.wav"),
+                query.get("model"),
+            )
+            try:
+                upload = await loop.run_in_executor(None, open, file, "wb")
+                try:
+                    while length > 0:
+                        chunk = await reader.read(min(CHUNK_SIZE, length))
+                        if not chunk:
+                            raise ConnectionError("upload interrupted")
+                        await loop.run_in_executor(None, upload.write, chunk)
+                        length -= len(chunk)
+                finally:
+                    await loop.run_in_executor(None, upload.close)
+            except BaseException:
+                await loop.run_in_executor(None, remove_upload, file)
+                raise
+
+        job = Job(file, upload=not is_json)
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            # очередь заполнена во время загрузки файла
+            if job.upload:
+                await loop.run_in_executor(None, remove_upload, file)
+            return 429, {"error": "queue is full, retry later"}
+        self.add_job(job)
+        logger_settings.logger.info(f"Новое задание {job.id}: {file}")
+        return 202, job.to_dict(with_result=False)
+
+    def upload_path(self, filename: str, model: Optional[str]) -> Path:
+        """
+        Возвращает путь для сохранения загруженного файла.
+
+        Файл помещается в директорию качества обработки, соответствующую
+        модели, чтобы get_the_model_whisper выбрала нужную модель.
+
+        Args:
+            filename (str): Имя загруженного файла.
+            model (Optional[str]): Тип модели Whisper.
+
+        Returns:
+            Path: Путь к файлу.
+        """
+        folder = next(
+            (
+                key
+                for key, value in quality.QUALITY_MAPPING.items()
+                if value == model
+            ),
+            "",
+        )
+        path = Path(variables.SERVICE_UPLOAD_DIR, folder, uuid.uuid4().hex)
+        path.mkdir(parents=True, exist_ok=True)
+        return path / Path(filename).name
+
+    async def stream_job(self, job: Job, writer: asyncio.StreamWriter) -> None:
+        """
+        Передает события задания клиенту (NDJSON, chunked) до его завершения.
+
+        Args:
+            job (Job): Задание.
+            writer (asyncio.StreamWriter): Выходной поток соединения.
+
+        Returns:
+            None
+        """
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: application/x-ndjson; charset=utf-8\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n"
+        )
+        sent = 0
+        while True:
+            job.changed.clear()
+            for event in job.events[sent:]:
+                line = json.dumps(event, ensure_ascii=False).encode() + b"\n"
+                writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            sent = len(job.events)
+            await writer.drain()
+            if job.status in ("done", "error"):
+                break
+            await job.changed.wait()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def respond(
+        self, writer: asyncio.StreamWriter, status: int, body: Dict[str, Any]
+    ) -> None:
+        """
+        Отправляет JSON-ответ.
+
+        Args:
+            writer (asyncio.StreamWriter): Выходной поток соединения.
+            status (int): HTTP-код ответа.
+            body (dict): Тело ответа.
+
+        Returns:
+            None
+        """
+        data = json.dumps(body, ensure_ascii=False).encode()
+        headers = (
+            f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n"
+        )
+        if status == 429:
+            headers += "Retry-After: 10\r\n"
+        writer.write(f"{headers}\r\n".encode() + data)
+        await writer.drain()
+
+
+def remove_upload(file: Path) -> None:
+    """
+    Удаляет директорию загруженного файла (SERVICE_UPLOAD_DIR/<модель>/<id>)
+    с результатом и временными файлами обработки.
+
+    Args:
+        file (Path): Путь к загруженному файлу.
+
+    Returns:
+        None
+    """
+    # результат и удаление временных файлов, поставленные в очередь
+    # отложенной записи, выполняются до удаления директории
+    staging.flush(variables.SHUTDOWN_GRACE)
+    shutil.rmtree(file.parent, ignore_errors=True)
+
+
+async def serve() -> None:
+    """
+    Запускает HTTP-сервер и обработчик заданий.
+
+    Returns:
+        None
+    """
+    service = TranscribService()
+    server = await asyncio.start_server(
+        service.handle, variables.SERVICE_HOST, variables.SERVICE_PORT
+    )
+    logger_settings.logger.info(
+        f"Сервис транскрибирования запущен: "
+        f"http://{variables.SERVICE_HOST}:{variables.SERVICE_PORT}"
+    )
+    async with server:
+        await asyncio.gather(server.serve_forever(), service.worker())
+
+
+def main() -> None:
+    """
+    Загружает модель по умолчанию и переводчик и запускает сервис.
+
+    Returns:
+        None
+    """
+    # результаты, не перенесенные на сетевой ресурс до завершения
+    # предыдущего запуска
+    staging.replay()
+    neural_process.load_whisper_model(variables.MODEL)
+    neural_process.get_translator()
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Модуль обеспечивает совместное использование весов моделей процессами
+обработки одного хоста (MODEL_SHARE_MODE).
+
+    fork  основной процесс загружает модели Whisper (SHARED_MODELS)
+          и переводчик, после чего запускает WORKERS_PER_HOST процессов
+          обработки через fork. Страницы весов общие для всех процессов
+          (копирование при записи, веса не изменяются), а gc.freeze()
+          исключает загруженные объекты из обхода сборщика мусора, чтобы
+          их страницы не копировались в дочерние процессы. Аудиофайлы
+          распределяются между процессами по хэшу пути. Ошибки обработки
+          файлов процесс обрабатывает сам (файл пропускается после
+          MAX_ATTEMPTS попыток, см. shutdown), а аварийно завершившийся
+          процесс запускается заново с задержкой, которая удваивается
+          при каждом следующем аварийном завершении (до
+          RESPAWN_MAX_DELAY) и сбрасывается, если процесс проработал
+          дольше RESPAWN_RESET. Файл, при обработке которого процесс
+          завершился, подхватывается при следующем цикле обработки
+          по маркеру .proc (с учетом попытки). Сигнал завершения
+          передается процессам обработки (SIGTERM), после него
+          процессы не перезапускаются.
+    mmap  веса Whisper один раз конвертируются в float32
+          (CACHE_DIR/models) и загружаются отображением файла в память
+          (torch.load(mmap=True)): страницы файла общие для всех
+          процессов хоста через кэш страниц.
+    off   каждый процесс загружает собственную копию моделей.
+
+Память процессов (RSS, PSS - с делением общих страниц между
+процессами, общая и собственная память) выводится в лог и командой:
+    python transcrib/shared_models.py [pid ...]
+(без pid - для процессов из файла резервирований памяти).
+
+Def:
+    converted_path(name) -> Path: Возвращает путь к конвертированным весам.
+    convert(name) -> Path: Конвертирует веса модели Whisper для mmap.
+    load_whisper(name) -> whisper.Whisper: Загружает модель Whisper
+                с отображением весов в память.
+    memory_usage(pid) -> Dict[str, float]: Возвращает память процесса.
+    memory_report(pids) -> str: Формирует текст отчета о памяти процессов.
+    respawn_delay(failures) -> float: Возвращает задержку перед повторным
+                запуском процесса обработки.
+    worker_files(files, worker_index, workers) -> list[Path]: Возвращает
+                файлы, обрабатываемые процессом.
+    supervise(preload, run) -> None: Загружает модели и запускает
+                процессы обработки через fork.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import admission
+import logger_settings
+import shutdown
+import torch
+import variables
+import whisper
+
+# Директория конвертированных весов моделей Whisper
+MODELS_DIR = Path(variables.CACHE_DIR, "models")
+# Задержка перед повторным запуском завершившегося процесса, секунд
+# (удваивается при каждом следующем аварийном завершении процесса)
+RESPAWN_DELAY = 10
+# Предельная задержка перед повторным запуском процесса, секунд
+RESPAWN_MAX_DELAY = 600
+# Время работы процесса, после которого задержка сбрасывается, секунд
+RESPAWN_RESET = 600
+
+
+def respawn_delay(failures: int) -> float:
+    """
+    Возвращает задержку перед повторным запуском процесса обработки.
+
+    Args:
+        failures (int): Количество аварийных завершений процесса подряд.
+
+    Returns:
+        float: Задержка в секундах.
+    """
+    return min(RESPAWN_DELAY * 2 ** max(0, failures - 1), RESPAWN_MAX_DELAY)
+
+
+def converted_path(name: str) -> Path:
+    """
+    Возвращает путь к конвертированным весам модели Whisper.
+
+    Args:
+        name (str): Тип модели.
+
+    Returns:
+        Path: Путь к файлу весов float32.
+    """
+    return Path(MODELS_DIR, f"{name}.fp32.pt")
+
+
+def convert(name: str) -> Path:
+    """
+    Конвертирует веса модели Whisper в float32 (в формате, который
+    torch.load читает отображением в память), если это еще не сделано.
+
+    Args:
+        name (str): Тип модели.
+
+    Returns:
+        Path: Путь к файлу весов.
+    """
+    path = converted_path(name)
+    if path.is_file():
+        return path
+    logger_settings.logger.info(f"Конвертация весов модели Whisper: {name}")
+    download_root = Path(
+        os.getenv("XDG_CACHE_HOME", Path(Path.home(), ".cache")), "whisper"
+    )
+    checkpoint_file = whisper._download(
+        whisper._MODELS[name], str(download_root), False
+    )
+    checkpoint = torch.load(checkpoint_file, map_location="cpu")
+    state_dict = {
+        key: value.float() if value.is_floating_point() else value
+        for key, value in checkpoint["model_state_dict"].items()
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # запись через временный файл: другие процессы хоста могут
+    # одновременно ожидать конвертированные веса
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    torch.save(
+        {"dims": checkpoint["dims"], "model_state_dict": state_dict},
+        tmp_path,
+    )
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_whisper(name: str) -> whisper.Whisper:
+    """
+    Загружает модель Whisper, веса которой отображаются в память
+    из конвертированного файла (общие страницы для всех процессов).
+
+    Args:
+        name (str): Тип модели.
+
+    Returns:
+        whisper.Whisper: Модель.
+    """
+    if name not in whisper._MODELS:
+        return whisper.load_model(name)
+    try:
+        checkpoint = torch.load(
+            convert(name), map_location="cpu", mmap=True, weights_only=True
+        )
+    except TypeError:
+        # torch < 2.1 не поддерживает отображение весов в память
+        logger_settings.logger.warning(
+            "Версия torch не поддерживает mmap, модель загружается в память"
+        )
+        return whisper.load_model(name)
+    model = whisper.Whisper(whisper.ModelDimensions(**checkpoint["dims"]))
+    # параметры модели заменяются тензорами, отображенными в память
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+    return model
+
+
+def memory_usage(pid: int) -> Dict[str, float]:
+    """
+    Возвращает память процесса (/proc/<pid>/smaps_rollup).
+
+    Args:
+        pid (int): Идентификатор процесса.
+
+    Returns:
+        Dict[str, float]: rss, pss, shared и private в мегабайтах
+            (пустой словарь, если процесс не найден).
+    """
+    fields: Dict[str, float] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as smaps:
+            for line in smaps:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "shared": fields.get("Shared_Clean", 0.0)
+        + fields.get("Shared_Dirty", 0.0),
+        "private": fields.get("Private_Clean", 0.0)
+        + fields.get("Private_Dirty", 0.0),
+    }
+
+
+def memory_report(pids: List[int]) -> str:
+    """
+    Формирует текст отчета о памяти процессов.
+
+    Args:
+        pids (list[int]): Идентификаторы процессов.
+
+    Returns:
+        str: Текст отчета.
+    """
+    text = "Память процессов (МБ):    RSS      PSS    общая  собственная\n"
+    total: Dict[str, float] = {}
+    for pid in pids:
+        usage = memory_usage(pid)
+        if not usage:
+            continue
+        text += (
+            f"  {pid:>8}  {usage['rss']:>12.0f} {usage['pss']:>8.0f}"
+            f" {usage['shared']:>8.0f} {usage['private']:>12.0f}\n"
+        )
+        for key, value in usage.items():
+            total[key] = total.get(key, 0.0) + value
+    if total:
+        text += (
+            f"  {'всего':>8}  {total['rss']:>12.0f} {total['pss']:>8.0f}"
+            f" {total['shared']:>8.0f} {total['private']:>12.0f}\n"
+        )
+    return text
+
+
+def worker_files(
+    files: List[Path], worker_index: int, workers: int
+) -> List[Path]:
+    """
+    Возвращает файлы, обрабатываемые процессом (распределение по хэшу
+    пути, одинаковое во всех процессах и между циклами).
+
+    Args:
+        files (list[Path]): Файлы для обработки.
+        worker_index (int): Номер процесса обработки (с 0).
+        workers (int): Количество процессов обработки.
+
+    Returns:
+        list[Path]: Файлы процесса.
+    """
+    if workers <= 1:
+        return list(files)
+    return [
+        file
+        for file in files
+        if zlib.crc32(str(file).encode()) % workers == worker_index
+    ]
+
+
+def supervise(preload: Callable[[], None], run: Callable[[int], None]) -> None:
+    """
+    Загружает модели в основном процессе и запускает WORKERS_PER_HOST
+    процессов обработки через fork (с общими страницами весов).
+
+    Args:
+        preload (Callable): Функция загрузки моделей.
+        run (Callable): Цикл обработки процесса (принимает номер процесса).
+
+    Returns:
+        None
+    """
+    workers = max(1, variables.WORKERS_PER_HOST)
+    preload()
+    admission.share_models(variables.SHARED_MODELS)
+    # загруженные объекты исключаются из сборки мусора, чтобы сборщик
+    # мусора дочерних процессов не изменял (не копировал) их страницы
+    gc.collect()
+    gc.freeze()
+    children: Dict[int, int] = {}
+    # время запуска и количество аварийных завершений подряд по номерам
+    # процессов обработки
+    started: Dict[int, float] = {}
+    failures: Dict[int, int] = {}
+
+    def spawn(worker_index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            # SIGINT терминала получает вся группа процессов, поэтому
+            # процессы обработки получают сигнал только от основного
+            shutdown.install(ignore_interrupt=True)
+            try:
+                run(worker_index)
+            except KeyboardInterrupt:
+                pass
+            except BaseException:
+                logger_settings.logger.exception(
+                    f"Процесс обработки {worker_index} завершился с ошибкой"
+                )
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = worker_index
+        started[worker_index] = time.monotonic()
+
+    def forward(signum: int) -> None:
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                continue
+
+    shutdown.add_handler(forward)
+    for worker_index in range(workers):
+        spawn(worker_index)
+    logger_settings.logger.info(
+        f"Запущено процессов обработки: {workers}\n"
+        + memory_report([os.getpid(), *children])
+    )
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        # -1: завершился не процесс обработки
+        worker_index = children.pop(pid, -1)
+        if worker_index < 0:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if code == 0 or shutdown.requested():
+            continue
+        if time.monotonic() - started[worker_index] > RESPAWN_RESET:
+            failures[worker_index] = 0
+        failures[worker_index] = failures.get(worker_index, 0) + 1
+        delay = respawn_delay(failures[worker_index])
+        logger_settings.logger.warning(
+            f"Процесс обработки {worker_index} (pid {pid}) завершился "
+            f"с кодом {code} ({failures[worker_index]} раз подряд), "
+            f"повторный запуск через {delay:.0f} сек."
+        )
+        # ожидание прерывается сигналом завершения
+        until = time.monotonic() + delay
+        while time.monotonic() < until and not shutdown.requested():
+            time.sleep(max(0.0, min(1.0, until - time.monotonic())))
+        if not shutdown.requested():
+            spawn(worker_index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Отчет о памяти процессов обработки"
+    )
+    parser.add_argument("pids", nargs="*", type=int, help="идентификаторы")
+    args = parser.parse_args()
+    pids = args.pids or [
+        int(pid) for pid in admission.current_reservation()["processes"]
+    ]
+    print(memory_report(pids or [os.getpid()]))
@@ -0,0 +1,285 @@
+"""
+Модуль обеспечивает плавное завершение обработки по сигналу.
+
+После первого сигнала SIGTERM или SIGINT новые файлы не принимаются
+в обработку. Текущий файл дообрабатывается, если ожидаемое время
+до его завершения укладывается в SHUTDOWN_GRACE секунд, иначе на границе
+окна декодирования сохраняется контрольная точка (см. checkpoint)
+и обработка файла прерывается исключением Interrupted. Повторный сигнал
+завершает процесс немедленно (KeyboardInterrupt).
+
+Временный файл (имя файла).proc содержит хост, идентификатор процесса
+и загрузки системы: файл, оставленный завершенным процессом этого хоста
+(например, после нехватки памяти), не блокирует обработку, а принимается
+новым процессом (с продолжением с контрольной точки).
+
+Неудачные попытки обработки файла (ошибка обработки или завершение
+процесса во время обработки, обнаруженное по файлу .proc) записываются
+в (имя файла).failed: после MAX_ATTEMPTS попыток файл больше
+не принимается в обработку (до удаления файла .failed), чтобы файл,
+вызывающий сбой, не перезапускал обработку бесконечно.
+
+Class:
+    Interrupted: Обработка файла прервана для завершения процесса.
+Def:
+    install(ignore_interrupt) -> None: Устанавливает обработчики сигналов.
+    add_handler(handler) -> None: Добавляет функцию, вызываемую при сигнале.
+    requested() -> bool: Проверяет, запрошено ли завершение.
+    should_interrupt(remaining) -> bool: Проверяет, нужно ли прервать
+                обработку текущего файла.
+    marker_owner() -> str: Возвращает строку владельца для (имя файла).proc.
+    adopt_marker(marker, record) -> bool: Удаляет временный файл .proc,
+                оставленный завершенным процессом этого хоста.
+    failed_attempts(file) -> int: Возвращает количество неудачных попыток
+                обработки файла.
+    record_failure(file, error) -> int: Записывает неудачную попытку
+                обработки файла.
+    clear_failures(file) -> None: Удаляет сведения о неудачных попытках.
+"""
+
+import datetime
+import os
+import signal
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+import logger_settings
+import variables
+
+# Идентификатор загрузки системы (после перезагрузки процессы
+# с теми же идентификаторами - другие процессы)
+BOOT_ID_FILE = Path("/proc/sys/kernel/random/boot_id")
+# Количество неудачных попыток, после которого файл не обрабатывается
+MAX_ATTEMPTS = 3
+
+_requested = threading.Event()
+_signals = 0
+_deadline = 0.0
+_handlers: List[Callable[[int], None]] = []
+
+
+class Interrupted(Exception):
+    """
+    Обработка файла прервана для завершения процесса
+    (контрольная точка сохранена).
+    """
+
+
+def install(ignore_interrupt: bool = False) -> None:
+    """
+    Устанавливает обработчики сигналов SIGTERM и SIGINT.
+
+    Args:
+        ignore_interrupt (bool, optional): Игнорировать SIGINT (процессы
+            обработки, запущенные через fork: сигнал передается им
+            основным процессом).
+
+    Returns:
+        None
+    """
+    global _signals
+    _requested.clear()
+    _signals = 0
+    _handlers.clear()
+    signal.signal(signal.SIGTERM, _on_signal)
+    signal.signal(
+        signal.SIGINT, signal.SIG_IGN if ignore_interrupt else _on_signal
+    )
+
+
+def _on_signal(signum: int, frame: Any) -> None:
+    # в обработчике сигнала не выполняется запись в лог (блокировки)
+    global _signals, _deadline
+    _signals += 1
+    if _handlers:
+        for handler in _handlers:
+            handler(signum)
+    elif _signals > 1:
+        raise KeyboardInterrupt
+    if _signals == 1:
+        _deadline = time.monotonic() + variables.SHUTDOWN_GRACE
+        _requested.set()
+
+
+def add_handler(handler: Callable[[int], None]) -> None:
+    """
+    Добавляет функцию, вызываемую при каждом сигнале (вместо немедленного
+    завершения по повторному сигналу).
+
+    Args:
+        handler (Callable): Функция, принимающая номер сигнала.
+
+    Returns:
+        None
+    """
+    _handlers.append(handler)
+
+
+def requested() -> bool:
+    """
+    Проверяет, запрошено ли завершение процесса.
+
+    Returns:
+        bool: True, если получен сигнал завершения.
+    """
+    return _requested.is_set()
+
+
+def should_interrupt(remaining: Optional[float]) -> bool:
+    """
+    Проверяет, нужно ли прервать обработку текущего файла.
+
+    Args:
+        remaining (float, optional): Ожидаемое время до завершения
+            обработки файла в секундах (None - неизвестно).
+
+    Returns:
+        bool: True, если запрошено завершение и обработка файла
+            не завершится за SHUTDOWN_GRACE секунд после сигнала.
+    """
+    if not _requested.is_set():
+        return False
+    return remaining is None or time.monotonic() + remaining > _deadline
+
+
+def _boot_id() -> str:
+    try:
+        return BOOT_ID_FILE.read_text().strip()
+    except OSError:
+        return "-"
+
+
+def marker_owner() -> str:
+    """
+    Возвращает строку владельца для временного файла (имя файла).proc.
+
+    Returns:
+        str: Хост, идентификатор процесса и загрузки системы.
+    """
+    return f"host {socket.gethostname()} pid {os.getpid()} boot {_boot_id()}"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def adopt_marker(marker: Path, record: bool = True) -> bool:
+    """
+    Удаляет временный файл процесса обработки (.proc), если его оставил
+    завершенный процесс этого хоста.
+
+    Args:
+        marker (Path): Путь к временному файлу.
+        record (bool, optional): Записать неудачную попытку обработки
+            файла (False - для временного файла архива).
+
+    Returns:
+        bool: True, если временный файл удален.
+    """
+    try:
+        lines = marker.read_text(encoding="utf-8").splitlines()
+    except (OSError, UnicodeDecodeError):
+        return False
+    owner = next(
+        (line.split() for line in lines if line.startswith("host ")), []
+    )
+    if len(owner) != 6 or owner[1] != socket.gethostname():
+        # файл другого хоста или без сведений о владельце
+        return False
+    pid = int(owner[3]) if owner[3].isdigit() else 0
+    if owner[5] == _boot_id() and (pid == os.getpid() or _alive(pid)):
+        return False
+    marker.unlink(missing_ok=True)
+    logger_settings.logger.warning(
+        f"Временный файл:\n {marker}\n удален: создавший его процесс "
+        f"{pid} завершен."
+    )
+    if record:
+        record_failure(marker, f"процесс {pid} завершен во время обработки")
+    return True
+
+
+def _failed_path(file: Path) -> Path:
+    return Path(file).with_suffix(".failed")
+
+
+def failed_attempts(file: Path) -> int:
+    """
+    Возвращает количество неудачных попыток обработки файла.
+
+    Args:
+        file (Path): Путь к аудиофайлу.
+
+    Returns:
+        int: Количество попыток из (имя файла).failed (0 - без файла).
+    """
+    try:
+        lines = _failed_path(file).read_text(encoding="utf-8").splitlines()
+    except (OSError, UnicodeDecodeError):
+        return 0
+    attempts = next(
+        (line.split() for line in lines if line.startswith("attempts ")), []
+    )
+    return int(attempts[1]) if attempts[1:2] and attempts[1].isdigit() else 0
+
+
+def record_failure(file: Path, error: Any) -> int:
+    """
+    Записывает неудачную попытку обработки файла в (имя файла).failed.
+
+    Args:
+        file (Path): Путь к аудиофайлу.
+        error (Any): Ошибка обработки.
+
+    Returns:
+        int: Количество неудачных попыток с учетом записанной.
+    """
+    attempts = failed_attempts(file) + 1
+    time_failed = datetime.datetime.now(datetime.timezone.utc)
+    try:
+        _failed_path(file).write_text(
+            f"attempts {attempts}\n"
+            f"time {time_failed.strftime('%H:%M:%S (UTC) - %d %b %Y')}\n"
+            f"{marker_owner()}\n"
+            f"error {error}\n",
+            encoding="utf-8",
+        )
+    except OSError as e:
+        logger_settings.logger.error(
+            f"Не удалось записать неудачную попытку обработки файла:\n"
+            f" {file}\n {e}"
+        )
+    if attempts >= MAX_ATTEMPTS:
+        logger_settings.logger.error(
+            f"Файл:\n {file}\n не обработан за {attempts} попыток и больше "
+            f"не принимается в обработку (до удаления "
+            f"{_failed_path(file).name})."
+        )
+    return attempts
+
+
+def clear_failures(file: Path) -> None:
+    """
+    Удаляет сведения о неудачных попытках обработки файла.
+
+    Args:
+        file (Path): Путь к аудиофайлу.
+
+    Returns:
+        None
+    """
+    try:
+        _failed_path(file).unlink(missing_ok=True)
+    except OSError as e:
+        logger_settings.logger.warning(
+            f"Не удалось удалить файл:\n {_failed_path(file)}\n {e}"
+        )
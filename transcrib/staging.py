@@ -0,0 +1,410 @@
+"""
+Модуль выполняет промежуточное хранение файлов на локальном диске
+(для входной директории на сетевом ресурсе, см. mount.sh).
+
+Текущий файл очереди и следующие STAGING_PREFETCH файлов копируются
+в локальную директорию STAGING_DIR в фоновом потоке (пока обрабатывается
+текущий файл), и Whisper читает аудио с локального диска. Изменение
+частоты дискретизации выполняется только для локальной копии.
+Результаты ((имя файла).txt, .proc, .partial) записываются сначала
+локально, а затем переносятся на сетевой ресурс очередью отложенной
+записи: с повторными попытками и атомарным переименованием. Объем
+локальных копий ограничен STAGING_SIZE_MB, копии удаляются после
+обработки файла.
+
+Для каждого файла отложенной записи в OUTBOX_DIR/.targets хранится путь
+на сетевом ресурсе: результаты, не перенесенные до завершения процесса
+(или после всех повторных попыток), переносятся при следующем запуске
+(replay). Пока результат ожидает переноса, файл считается обработанным
+(pending).
+
+Def:
+    enabled() -> bool: Проверяет, включено ли промежуточное хранение.
+    prefetch(files) -> None: Копирует файлы очереди на локальный диск.
+    local_audio(file) -> Path: Возвращает путь к локальной копии файла.
+    is_local(file, audio_file) -> bool: Проверяет, что аудио читается
+                с локальной копии (или промежуточное хранение отключено).
+    release(file) -> None: Удаляет локальную копию файла.
+    write_text(path, text) -> None: Записывает текстовый файл.
+    append_text(path, text) -> None: Дописывает текст в файл.
+    remove(path) -> None: Удаляет файл.
+    pending(path) -> bool: Проверяет, ожидает ли файл переноса
+                на сетевой ресурс.
+    flush(timeout) -> bool: Ожидает завершения отложенной записи.
+    cleanup() -> None: Удаляет локальные копии предыдущего запуска.
+    replay() -> int: Ставит в очередь перенос результатов
+                предыдущего запуска.
+"""
+
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import logger_settings
+import variables
+
+# Директории локальных копий входных файлов и отложенной записи
+INBOX_DIR = Path(variables.STAGING_DIR, "in")
+OUTBOX_DIR = Path(variables.STAGING_DIR, "out")
+# Пути на сетевом ресурсе для файлов отложенной записи
+TARGETS_DIR = Path(OUTBOX_DIR, ".targets")
+# Временные файлы обработки, которые не переносятся после перезапуска
+TRANSIENT_SUFFIXES = (".proc", ".partial")
+
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="prefetch"
+)
+_staged: Dict[str, "Future[Optional[Path]]"] = {}
+_write_queue: "queue.Queue[Tuple[str, Path]]" = queue.Queue()
+_pending_copies: Set[str] = set()
+# Файлы, дописываемые по частям (локальная копия хранится до удаления)
+_appended: Set[str] = set()
+_lock = threading.Lock()
+_writer: Optional[threading.Thread] = None
+
+
+def enabled() -> bool:
+    """
+    Проверяет, включено ли промежуточное хранение файлов.
+
+    Returns:
+        bool: True, если STAGING_PREFETCH больше 0.
+    """
+    return variables.STAGING_PREFETCH > 0
+
+
+def _local_name(path: Path) -> str:
+    digest = hashlib.sha1(str(path).encode()).hexdigest()[:16]
+    return f"{digest}_{path.name}"
+
+
+def _staged_size() -> int:
+    if not INBOX_DIR.is_dir():
+        return 0
+    return sum(f.stat().st_size for f in INBOX_DIR.iterdir() if f.is_file())
+
+
+def _copy_in(file: Path) -> Optional[Path]:
+    local = Path(INBOX_DIR, _local_name(file))
+    tmp = local.with_name(f".{local.name}.tmp")
+    try:
+        INBOX_DIR.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(file, tmp)
+        os.replace(tmp, local)
+    except OSError as e:
+        logger_settings.logger.warning(
+            f"Не удалось скопировать файл {file} на локальный диск: {e}"
+        )
+        tmp.unlink(missing_ok=True)
+        return None
+    logger_settings.logger.debug("Файл скопирован на локальный диск: {}", file)
+    return local
+
+
+def prefetch(files: List[Path]) -> None:
+    """
+    Копирует файлы очереди на локальный диск в фоновом потоке.
+
+    Пропускаются уже обработанные файлы и файлы в процессе обработки,
+    а также файлы, не умещающиеся в STAGING_SIZE_MB.
+
+    Args:
+        files (list[Path]): Текущий и следующие файлы очереди обработки.
+
+    Returns:
+        None
+    """
+    if not enabled():
+        return
+    budget = variables.STAGING_SIZE_MB * 1024 * 1024
+    used = _staged_size()
+    for file in files[: variables.STAGING_PREFETCH + 1]:
+        if str(file) in _staged:
+            continue
+        if file.with_suffix(".txt").is_file():
+            continue
+        if file.with_suffix(".proc").is_file():
+            continue
+        try:
+            size = file.stat().st_size
+        except OSError:
+            continue
+        if used + size > budget:
+            break
+        used += size
+        _staged[str(file)] = _prefetch_executor.submit(_copy_in, file)
+
+
+def local_audio(file: Path) -> Path:
+    """
+    Возвращает путь к локальной копии файла (дожидаясь окончания
+    копирования) или к исходному файлу, если копии нет.
+
+    Args:
+        file (Path): Путь к аудиофайлу на сетевом ресурсе.
+
+    Returns:
+        Path: Путь, по которому следует читать аудио.
+    """
+    future = _staged.get(str(file))
+    if future is None:
+        return file
+    local = future.result()
+    return local if local is not None and local.is_file() else file
+
+
+def is_local(file: Path, audio_file: Path) -> bool:
+    """
+    Проверяет, можно ли изменять файл audio_file (например, частоту
+    дискретизации): это локальная копия файла или промежуточное
+    хранение отключено (файл не копируется с сетевого ресурса).
+
+    Args:
+        file (Path): Путь к аудиофайлу на сетевом ресурсе.
+        audio_file (Path): Путь, по которому читается аудио (local_audio).
+
+    Returns:
+        bool: True, если файл можно изменять.
+    """
+    return not enabled() or Path(audio_file) != Path(file)
+
+
+def release(file: Path) -> None:
+    """
+    Удаляет локальную копию файла после обработки.
+
+    Args:
+        file (Path): Путь к аудиофайлу на сетевом ресурсе.
+
+    Returns:
+        None
+    """
+    future = _staged.pop(str(file), None)
+    if future is None:
+        return
+    local = future.result()
+    if local is not None:
+        local.unlink(missing_ok=True)
+
+
+def _outbox_path(path: Path) -> Path:
+    local = Path(OUTBOX_DIR, _local_name(path))
+    target = Path(TARGETS_DIR, local.name)
+    if not target.is_file():
+        # путь на сетевом ресурсе - для переноса после перезапуска
+        TARGETS_DIR.mkdir(parents=True, exist_ok=True)
+        target.write_text(str(path), encoding="utf-8")
+    return local
+
+
+def _discard_local(local: Path) -> None:
+    local.unlink(missing_ok=True)
+    Path(TARGETS_DIR, local.name).unlink(missing_ok=True)
+
+
+def _start_writer() -> None:
+    global _writer
+    if _writer is None or not _writer.is_alive():
+        _writer = threading.Thread(
+            target=_write_behind, name="write-behind", daemon=True
+        )
+        _writer.start()
+
+
+def _enqueue_copy(path: Path) -> None:
+    with _lock:
+        # если копирование файла уже в очереди, оно прочитает
+        # актуальное содержимое локального файла
+        if str(path) in _pending_copies:
+            return
+        _pending_copies.add(str(path))
+    _write_queue.put(("copy", path))
+    _start_writer()
+
+
+def write_text(path: Path, text: str) -> None:
+    """
+    Записывает текстовый файл: локально, с последующим переносом
+    на сетевой ресурс (или сразу, если промежуточное хранение отключено).
+
+    Args:
+        path (Path): Путь к файлу на сетевом ресурсе.
+        text (str): Текст.
+
+    Returns:
+        None
+    """
+    if not enabled():
+        path.write_text(text, encoding="utf-8")
+        return
+    _outbox_path(path).write_text(text, encoding="utf-8")
+    _enqueue_copy(path)
+
+
+def append_text(path: Path, text: str) -> None:
+    """
+    Дописывает текст в файл (локально, с последующим переносом
+    на сетевой ресурс).
+
+    Args:
+        path (Path): Путь к файлу на сетевом ресурсе.
+        text (str): Текст.
+
+    Returns:
+        None
+    """
+    target = _outbox_path(path) if enabled() else path
+    if enabled():
+        with _lock:
+            _appended.add(str(path))
+    with open(target, "a", encoding="utf-8") as f:
+        f.write(text)
+    if enabled():
+        _enqueue_copy(path)
+
+
+def remove(path: Path) -> None:
+    """
+    Удаляет файл на сетевом ресурсе (после ранее поставленных в очередь
+    операций записи этого файла).
+
+    Args:
+        path (Path): Путь к файлу на сетевом ресурсе.
+
+    Returns:
+        None
+    """
+    if not enabled():
+        path.unlink(missing_ok=True)
+        return
+    with _lock:
+        # последующие записи файла должны выполниться после удаления
+        _pending_copies.discard(str(path))
+        _appended.discard(str(path))
+    _write_queue.put(("delete", path))
+    _start_writer()
+
+
+def pending(path: Path) -> bool:
+    """
+    Проверяет, ожидает ли файл переноса на сетевой ресурс
+    (например, результат (имя файла).txt во время повторных попыток).
+
+    Args:
+        path (Path): Путь к файлу на сетевом ресурсе.
+
+    Returns:
+        bool: True, если локальная копия файла ожидает переноса.
+    """
+    return Path(TARGETS_DIR, _local_name(path)).is_file()
+
+
+def _apply(operation: str, path: Path) -> None:
+    local = Path(OUTBOX_DIR, _local_name(path))
+    if operation == "delete":
+        path.unlink(missing_ok=True)
+        with _lock:
+            # локальный файл мог быть уже записан заново
+            if str(path) not in _pending_copies:
+                _discard_local(local)
+        return
+    if not local.is_file():
+        # локальный файл уже удален последующей операцией
+        return
+    # копирование во временный файл рядом с целевым и атомарная замена
+    tmp = path.with_name(f".{path.name}.tmp")
+    shutil.copyfile(local, tmp)
+    os.replace(tmp, path)
+    with _lock:
+        if str(path) not in _pending_copies | _appended:
+            _discard_local(local)
+
+
+def _write_behind() -> None:
+    while True:
+        operation, path = _write_queue.get()
+        if operation == "copy":
+            with _lock:
+                _pending_copies.discard(str(path))
+        for attempt in range(variables.STAGING_RETRIES):
+            try:
+                _apply(operation, path)
+                break
+            except OSError as e:
+                delay = 2**attempt
+                logger_settings.logger.warning(
+                    f"Ошибка записи {path} (попытка {attempt + 1}): {e}. "
+                    f"Повтор через {delay} сек."
+                )
+                time.sleep(delay)
+        else:
+            logger_settings.logger.error(
+                f"Не удалось выполнить {operation} для {path}, "
+                f"локальная копия: {OUTBOX_DIR}"
+            )
+        _write_queue.task_done()
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """
+    Ожидает завершения отложенной записи на сетевой ресурс.
+
+    Args:
+        timeout (float, optional): Максимальное время ожидания в секундах.
+
+    Returns:
+        bool: True, если очередь записи пуста.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while _write_queue.unfinished_tasks:
+        if deadline is not None and time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def cleanup() -> None:
+    """
+    Удаляет локальные копии, оставшиеся от предыдущего запуска.
+
+    Returns:
+        None
+    """
+    shutil.rmtree(INBOX_DIR, ignore_errors=True)
+
+
+def replay() -> int:
+    """
+    Ставит в очередь перенос на сетевой ресурс результатов, оставшихся
+    в OUTBOX_DIR после предыдущего запуска. Временные файлы обработки
+    (.proc, .partial) предыдущего запуска удаляются.
+
+    Returns:
+        int: Количество файлов, поставленных в очередь.
+    """
+    if not TARGETS_DIR.is_dir():
+        return 0
+    count = 0
+    for target in TARGETS_DIR.iterdir():
+        local = Path(OUTBOX_DIR, target.name)
+        try:
+            path = Path(target.read_text(encoding="utf-8"))
+        except OSError:
+            continue
+        if not local.is_file() or path.suffix in TRANSIENT_SUFFIXES:
+            _discard_local(local)
+            continue
+        _enqueue_copy(path)
+        count += 1
+    if count:
+        logger_settings.logger.info(
+            f"Результаты предыдущего запуска поставлены в очередь "
+            f"переноса на сетевой ресурс: {count}"
+        )
+    return count
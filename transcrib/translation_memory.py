@@ -0,0 +1,163 @@
+"""
+Модуль хранит память переводов между файлами.
+
+Перевод каждого сегмента сохраняется в локальной базе SQLite
+(ключ - нормализованный английский текст и модель перевода).
+Повторяющиеся фразы (начало переговоров, служебные фразы и т.п.)
+берутся из базы без обращения к модели. Когда количество записей
+превышает TRANSLATION_MEMORY_SIZE, удаляются записи,
+к которым дольше всего не обращались.
+
+Def:
+    normalize(text) -> str: Нормализует текст для поиска в памяти переводов.
+    translate(translator, text, model) -> str: Переводит текст
+                с использованием памяти переводов.
+    stats() -> Dict[str, int]: Возвращает счетчики попаданий и промахов.
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import logger_settings
+import variables
+
+# Счетчики попаданий и промахов памяти переводов
+STATS: Dict[str, int] = {"hit": 0, "miss": 0}
+# Доля записей, удаляемых при превышении размера памяти переводов
+EVICT_FRACTION = 0.1
+# Через сколько новых записей проверяется размер памяти переводов
+EVICT_CHECK_EVERY = 100
+
+_lock = threading.Lock()
+_stored = 0
+
+
+def normalize(text: str) -> str:
+    """
+    Нормализует текст для поиска в памяти переводов:
+    приводит к форме NFC и сводит пробельные символы к одному пробелу.
+
+    Args:
+        text (str): Исходный текст.
+
+    Returns:
+        str: Нормализованный текст.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+@lru_cache(maxsize=None)
+def _connection() -> sqlite3.Connection:
+    path = Path(variables.CACHE_DIR, "translation_memory.sqlite")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute(
+        "CREATE TABLE IF NOT EXISTS memory ("
+        " key TEXT PRIMARY KEY,"
+        " model TEXT NOT NULL,"
+        " source TEXT NOT NULL,"
+        " target TEXT NOT NULL,"
+        " last_used REAL NOT NULL)"
+    )
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS memory_last_used ON memory (last_used)"
+    )
+    return connection
+
+
+def _key(source: str, model: str) -> str:
+    return hashlib.sha1(f"{model}\n{source}".encode()).hexdigest()
+
+
+def _lookup(key: str) -> Optional[str]:
+    with _lock:
+        connection = _connection()
+        row = connection.execute(
+            "SELECT target FROM memory WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            connection.execute(
+                "UPDATE memory SET last_used = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            connection.commit()
+    return None if row is None else row[0]
+
+
+def _store(key: str, model: str, source: str, target: str) -> None:
+    global _stored
+    with _lock:
+        connection = _connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO memory VALUES (?, ?, ?, ?, ?)",
+            (key, model, source, target, time.time()),
+        )
+        connection.commit()
+        _stored += 1
+        if _stored % EVICT_CHECK_EVERY != 1:
+            return
+        (count,) = connection.execute("SELECT COUNT(*) FROM memory").fetchone()
+        if count > variables.TRANSLATION_MEMORY_SIZE:
+            # удаляется с запасом, чтобы не чистить память на каждой проверке
+            excess = count - variables.TRANSLATION_MEMORY_SIZE
+            excess += int(variables.TRANSLATION_MEMORY_SIZE * EVICT_FRACTION)
+            connection.execute(
+                "DELETE FROM memory WHERE key IN ("
+                " SELECT key FROM memory ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            logger_settings.logger.debug(
+                f"Из памяти переводов удалены старые записи: {excess}"
+            )
+        connection.commit()
+
+
+def translate(translator: Any, text: str, model: str) -> str:
+    """
+    Переводит текст с использованием памяти переводов.
+
+    Args:
+        translator (Pipeline): Переводчик transformers.
+        text (str): Текст для перевода.
+        model (str): Идентификатор модели перевода.
+
+    Returns:
+        str: Перевод текста.
+    """
+    if variables.TRANSLATION_MEMORY_SIZE <= 0:
+        return translator(text)[0]["translation_text"]
+    source = normalize(text)
+    key = _key(source, model)
+    try:
+        target = _lookup(key)
+    except sqlite3.Error as e:
+        logger_settings.logger.warning(f"Ошибка памяти переводов: {e}")
+        return translator(text)[0]["translation_text"]
+    if target is not None:
+        STATS["hit"] += 1
+        return target
+    STATS["miss"] += 1
+    target = translator(text)[0]["translation_text"]
+    try:
+        _store(key, model, source, target)
+    except sqlite3.Error as e:
+        logger_settings.logger.warning(f"Ошибка памяти переводов: {e}")
+    return target
+
+
+def stats() -> Dict[str, int]:
+    """
+    Возвращает счетчики попаданий и промахов памяти переводов.
+
+    Returns:
+        Dict[str, int]: Счетчики hit и miss.
+    """
+    return dict(STATS)
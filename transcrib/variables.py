@@ -30,6 +30,12 @@ logger_settings.logger.info("(настройки из файла '.env' ):".cent
 
 LOG_LEVEL = getenv("LOG_LEVEL", "INFO")
 """ Уровень логирования """
+LOG_FORMAT = getenv("LOG_FORMAT", "text")
+""" Формат лог-файла ("text" или "json") """
+if LOG_FORMAT not in ["text", "json"]:
+    LOG_FORMAT = "text"
+LOG_ENQUEUE = getenv("LOG_ENQUEUE", "True").lower() in ("true", "1")
+""" Триггер вывода логов в фоновом потоке """
 if LOG_LEVEL not in [
     "TRACE",
     "DEBUG",
@@ -41,8 +47,9 @@ if LOG_LEVEL not in [
 ]:
     exit("Уровень логирования задан некорректно.\n Error: LOG_LEVEL is None")
 else:
-    logger_settings.configure_logger(LOG_LEVEL)
+    logger_settings.configure_logger(LOG_LEVEL, LOG_FORMAT, LOG_ENQUEUE)
     logger_settings.logger.info(f"Уровень логирования: {LOG_LEVEL}")
+    logger_settings.logger.info(f"Формат лог-файла: {LOG_FORMAT}")
     path_to_log_file = Path.joinpath(
         Path(__file__).parent.parent,
         "logs",
@@ -83,6 +90,16 @@ if not EXTENSIONS:
     )
 logger_settings.logger.info(f"Расширения для поиска аудиофайлов: {EXTENSIONS}")
 
+ARCHIVE_EXTENSIONS = [
+    ext
+    for ext in getenv("ARCHIVE_EXTENSIONS", "*.zip, *.tar, *.tar.gz, *.tgz")
+    .replace(" ", "")
+    .split(",")
+    if ext
+]
+""" Список расширений архивов с аудиофайлами (пусто - не обрабатываются). """
+logger_settings.logger.info(f"Расширения архивов: {ARCHIVE_EXTENSIONS}")
+
 CHANGE_SAMPLING_RATE_TO_16KGH = getenv(
     "CHANGE_SAMPLING_RATE_TO_16KGH", "False"
 ).lower() in ("true", "1")
@@ -118,3 +135,128 @@ if MODEL not in [
     )
 else:
     logger_settings.logger.info(f"Модель whisper: {MODEL}\n")
+
+DECODING_PROFILE = getenv("DECODING_PROFILE", "balanced")
+""" Профиль декодирования whisper для файлов в корне входной директории. """
+if DECODING_PROFILE not in ["fast", "balanced", "accurate"]:
+    DECODING_PROFILE = "balanced"
+    logger_settings.logger.warning(
+        "Профиль декодирования задан некорректно. "
+        "Значение 'balanced' установлено по умолчанию."
+    )
+logger_settings.logger.info(f"Профиль декодирования: {DECODING_PROFILE}")
+
+PROGRESS_INTERVAL = float(getenv("PROGRESS_INTERVAL", "5"))
+""" Интервал обновления файла (имя файла).proc в секундах. """
+logger_settings.logger.info(
+    f"Интервал обновления хода обработки: {PROGRESS_INTERVAL} сек."
+)
+
+CHECKPOINT_INTERVAL = float(getenv("CHECKPOINT_INTERVAL", "60"))
+""" Интервал сохранения контрольной точки обработки файла в секундах. """
+SHUTDOWN_GRACE = float(getenv("SHUTDOWN_GRACE", "120"))
+""" Время дообработки текущего файла после сигнала завершения, сек. """
+logger_settings.logger.info(
+    f"Контрольные точки: каждые {CHECKPOINT_INTERVAL} сек., "
+    f"дообработка при завершении: {SHUTDOWN_GRACE} сек."
+)
+
+# Настройки локального HTTP-сервиса (service.py)
+SERVICE_HOST = getenv("SERVICE_HOST", "127.0.0.1")
+""" Адрес, на котором сервис принимает запросы. """
+SERVICE_PORT = int(getenv("SERVICE_PORT", "8000"))
+""" Порт сервиса. """
+SERVICE_QUEUE_SIZE = int(getenv("SERVICE_QUEUE_SIZE", "16"))
+""" Максимальное количество заданий в очереди сервиса. """
+SERVICE_MAX_UPLOAD_MB = int(getenv("SERVICE_MAX_UPLOAD_MB", "500"))
+""" Максимальный размер загружаемого аудиофайла в мегабайтах. """
+SERVICE_UPLOAD_DIR = Path(
+    getenv("SERVICE_UPLOAD_DIR", f"{Path(__file__).parent.parent}/uploads")
+)
+""" Директория для аудиофайлов, загруженных через сервис. """
+
+CACHE_DIR = Path(getenv("CACHE_DIR", f"{Path(__file__).parent.parent}/cache"))
+""" Локальная директория для кэшей приложения. """
+AUDIO_CACHE_DIR = Path.joinpath(CACHE_DIR, "audio")
+""" Директория кэша декодированных аудиофайлов и спектрограмм. """
+AUDIO_CACHE_SIZE_MB = int(getenv("AUDIO_CACHE_SIZE_MB", "2048"))
+""" Максимальный объем кэша аудио в мегабайтах (0 - кэш отключен). """
+logger_settings.logger.info(
+    f"Кэш аудио: {AUDIO_CACHE_DIR} ({AUDIO_CACHE_SIZE_MB} МБ)"
+)
+
+TRANSLATION_MEMORY_SIZE = int(getenv("TRANSLATION_MEMORY_SIZE", "200000"))
+""" Максимальное количество записей памяти переводов (0 - отключена). """
+logger_settings.logger.info(
+    f"Размер памяти переводов: {TRANSLATION_MEMORY_SIZE} записей"
+)
+
+SEARCH_INDEX = getenv("SEARCH_INDEX", "True").lower() in ("true", "1")
+""" Триггер добавления результатов в полнотекстовый поисковый индекс. """
+logger_settings.logger.info(f"Поисковый индекс: {SEARCH_INDEX}")
+
+WORKERS_PER_HOST = int(getenv("WORKERS_PER_HOST", "1"))
+""" Количество процессов обработки, запущенных на хосте. """
+WORKER_INDEX = int(getenv("WORKER_INDEX", "0"))
+""" Номер этого процесса обработки на хосте (с 0). """
+CPU_PINNING = getenv("CPU_PINNING", "True").lower() in ("true", "1")
+""" Триггер привязки процесса обработки к ядрам одного узла NUMA. """
+logger_settings.logger.info(
+    f"Процесс обработки {WORKER_INDEX} из {WORKERS_PER_HOST}, "
+    f"привязка к ядрам: {CPU_PINNING}"
+)
+
+MODEL_SHARE_MODE = getenv("MODEL_SHARE_MODE", "off")
+""" Режим совместного использования весов моделей процессами хоста. """
+if MODEL_SHARE_MODE not in ["off", "fork", "mmap"]:
+    MODEL_SHARE_MODE = "off"
+    logger_settings.logger.warning(
+        "Режим совместного использования весов задан некорректно. "
+        "Значение 'off' установлено по умолчанию."
+    )
+SHARED_MODELS = getenv("SHARED_MODELS", MODEL).replace(" ", "").split(",")
+""" Модели Whisper, загружаемые до запуска процессов (режим fork). """
+logger_settings.logger.info(
+    f"Совместное использование весов: {MODEL_SHARE_MODE}"
+    + (f", модели {SHARED_MODELS}" if MODEL_SHARE_MODE == "fork" else "")
+)
+
+MEMORY_BUDGET_MB = float(getenv("MEMORY_BUDGET_MB", "0"))
+""" Бюджет памяти процессов обработки на хосте в МБ (0 - 90% памяти). """
+MEMORY_POLICY = getenv("MEMORY_POLICY", "queue")
+""" Действие, если задание не укладывается в бюджет памяти. """
+if MEMORY_POLICY not in ["queue", "downgrade"]:
+    MEMORY_POLICY = "queue"
+    logger_settings.logger.warning(
+        "Политика памяти задана некорректно. "
+        "Значение 'queue' установлено по умолчанию."
+    )
+logger_settings.logger.info(
+    f"Бюджет памяти: {MEMORY_BUDGET_MB or 'авто'} МБ, "
+    f"политика: {MEMORY_POLICY}"
+)
+
+STAGING_DIR = Path(
+    getenv("STAGING_DIR", str(Path.joinpath(CACHE_DIR, "staging")))
+)
+""" Локальная директория для копий аудиофайлов и отложенной записи. """
+STAGING_PREFETCH = int(getenv("STAGING_PREFETCH", "2"))
+""" Количество файлов очереди, копируемых заранее (0 - отключено). """
+STAGING_SIZE_MB = int(getenv("STAGING_SIZE_MB", "4096"))
+""" Максимальный объем локальных копий аудиофайлов в мегабайтах. """
+STAGING_RETRIES = int(getenv("STAGING_RETRIES", "5"))
+""" Количество попыток записи результата на сетевой ресурс. """
+logger_settings.logger.info(
+    f"Промежуточное хранение: {STAGING_DIR}, "
+    f"заранее копируется файлов: {STAGING_PREFETCH}"
+)
+
+PROFILE = getenv("PROFILE", "False").lower() in ("true", "1")
+""" Триггер профилирования обработки всех файлов (иначе - по .profile). """
+PROFILE_THRESHOLD = float(getenv("PROFILE_THRESHOLD", "0"))
+""" Минимальное время обработки файла в секундах для записи профиля. """
+PROFILE_TORCH = getenv("PROFILE_TORCH", "False").lower() in ("true", "1")
+""" Триггер записи времени операций torch в профиль (память растет). """
+logger_settings.logger.info(
+    f"Профилирование: {PROFILE}, порог {PROFILE_THRESHOLD} сек."
+)
@@ -0,0 +1,247 @@
+"""
+Модуль - адаптер к внутреннему устройству model.transcribe (Whisper).
+
+model.transcribe не предоставляет обратных вызовов, поэтому ход
+обработки, готовые сегменты, готовая спектрограмма и декодирование окон
+перехватываются через имена, которые использует модуль whisper.transcribe:
+    tqdm.tqdm            счетчик кадров (обновляется после каждого окна);
+    print                строки готовых сегментов (при verbose=True);
+    log_mel_spectrogram  вычисление спектрограммы сигнала;
+    Whisper.decode       декодирование окна (при каждой температуре).
+Исходное декодирование окна, которое получает обработчик decode,
+принимает срок deadline: после срока фильтр логитов оставляет только
+токен конца текста, и декодирование окна завершается на следующем шаге
+(после первого токена окна).
+Имена заменяются один раз, при первом использовании hooks, и передают
+вызовы обработчикам текущего потока, а без обработчиков - исходным
+функциям: вывод процесса, счетчики tqdm и модели других потоков
+не затрагиваются.
+
+Перехват зависит от исходного кода model.transcribe и проверен
+для версий Whisper SUPPORTED_VERSIONS. С другой версией перехват
+не устанавливается (с предупреждением в лог): файлы обрабатываются,
+но без хода обработки, контрольных точек, готовой спектрограммы
+и ограничения времени декодирования окон.
+
+Def:
+    supported() -> bool: Проверяет, поддерживается ли версия Whisper.
+    hooks(progress_bar, print_line, log_mel, decode) -> Iterator[None]:
+                Передает обработчикам текущего потока вызовы
+                model.transcribe внутри контекста.
+"""
+
+import builtins
+import dataclasses
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import logger_settings
+import torch
+import whisper
+from whisper.decoding import DecodingOptions, DecodingTask, LogitFilter
+
+# Версии Whisper, для которых проверен перехват model.transcribe
+SUPPORTED_VERSIONS = ("20231117",)
+
+# Обработчики текущего потока (progress_bar, print_line, log_mel, decode)
+_local = threading.local()
+# Исходные функции Whisper (после установки перехвата)
+_originals: Dict[str, Any] = {}
+_installed: Optional[bool] = None
+_install_lock = threading.Lock()
+
+
+def supported() -> bool:
+    """
+    Проверяет, поддерживается ли установленная версия Whisper.
+
+    Returns:
+        bool: True, если версия входит в SUPPORTED_VERSIONS.
+    """
+    return getattr(whisper, "__version__", "") in SUPPORTED_VERSIONS
+
+
+def _handler(name: str) -> Optional[Callable[..., Any]]:
+    return getattr(_local, name, None)
+
+
+class _TqdmModule:
+    """Замена модуля tqdm в whisper.transcribe."""
+
+    def __init__(self, module: Any) -> None:
+        self.module = module
+
+    def tqdm(self, *args: Any, **kwargs: Any) -> Any:
+        progress_bar = _handler("progress_bar")
+        if progress_bar is None:
+            return self.module.tqdm(*args, **kwargs)
+        return progress_bar(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.module, name)
+
+
+def _print(*args: Any, **kwargs: Any) -> None:
+    print_line = _handler("print_line")
+    if print_line is None or kwargs.get("file") not in (None, sys.stdout):
+        builtins.print(*args, **kwargs)
+        return
+    print_line(kwargs.get("sep", " ").join(str(arg) for arg in args))
+
+
+def _log_mel_spectrogram(
+    audio: Any, n_mels: int = 80, *args: Any, **kwargs: Any
+) -> torch.Tensor:
+    log_mel = _handler("log_mel")
+    mel = log_mel(audio, n_mels) if log_mel is not None else None
+    if mel is not None:
+        return mel
+    return _originals["log_mel_spectrogram"](audio, n_mels, *args, **kwargs)
+
+
+class _Deadline(LogitFilter):
+    """Фильтр логитов: после срока остается только токен конца текста."""
+
+    def __init__(self, deadline: float, eot: int, sample_begin: int) -> None:
+        self.deadline = deadline
+        self.eot = eot
+        # результат без токенов whisper не ранжирует (деление на длину)
+        self.sample_begin = sample_begin
+
+    def apply(self, logits: torch.Tensor, tokens: torch.Tensor) -> None:
+        if (
+            tokens.shape[-1] > self.sample_begin
+            and time.perf_counter() >= self.deadline
+        ):
+            logits[:] = -float("inf")
+            logits[:, self.eot] = 0
+
+
+def _decode_until(
+    model: Any,
+    mel: torch.Tensor,
+    options: DecodingOptions = DecodingOptions(),
+    *,
+    deadline: float,
+    **kwargs: Any,
+) -> Any:
+    # повторяет whisper.decoding.decode с фильтром срока декодирования
+    if kwargs:
+        options = dataclasses.replace(options, **kwargs)
+    single = mel.ndim == 2
+    if single:
+        mel = mel.unsqueeze(0)
+    task = DecodingTask(model, options)
+    task.logit_filters.append(
+        _Deadline(deadline, task.tokenizer.eot, task.sample_begin)
+    )
+    result = task.run(mel)
+    return result[0] if single else result
+
+
+def _decode(model: Any, mel: torch.Tensor, *args: Any, **kwargs: Any) -> Any:
+    decode = _handler("decode")
+
+    def original(
+        mel: torch.Tensor,
+        *args: Any,
+        deadline: Optional[float] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if deadline is None:
+            return _originals["decode"](model, mel, *args, **kwargs)
+        return _decode_until(model, mel, *args, deadline=deadline, **kwargs)
+
+    if decode is None:
+        return original(mel, *args, **kwargs)
+    return decode(original, mel, *args, **kwargs)
+
+
+def _install() -> bool:
+    # перехват устанавливается один раз для процесса
+    global _installed
+    with _install_lock:
+        if _installed is None:
+            _installed = supported()
+            if not _installed:
+                logger_settings.logger.warning(
+                    f"Версия Whisper {getattr(whisper, '__version__', '?')} "
+                    f"не проверена (поддерживаются {SUPPORTED_VERSIONS}): "
+                    f"ход обработки, контрольные точки и ограничение "
+                    f"времени декодирования окон отключены"
+                )
+                return False
+            transcribe_module = importlib.import_module("whisper.transcribe")
+            _originals["log_mel_spectrogram"] = (
+                transcribe_module.log_mel_spectrogram
+            )
+            _originals["decode"] = whisper.Whisper.decode
+            setattr(
+                transcribe_module,
+                "tqdm",
+                _TqdmModule(transcribe_module.tqdm),
+            )
+            setattr(transcribe_module, "print", _print)
+            setattr(
+                transcribe_module, "log_mel_spectrogram", _log_mel_spectrogram
+            )
+            whisper.Whisper.decode = _decode
+    return _installed
+
+
+@contextmanager
+def hooks(
+    progress_bar: Optional[Callable[..., Any]] = None,
+    print_line: Optional[Callable[[str], None]] = None,
+    log_mel: Optional[Callable[[Any, int], Optional[torch.Tensor]]] = None,
+    decode: Optional[Callable[..., Any]] = None,
+) -> Iterator[None]:
+    """
+    Передает обработчикам вызовы model.transcribe в текущем потоке
+    внутри контекста (вложенные контексты дополняют обработчики).
+
+    Args:
+        progress_bar (Callable, optional): Замена tqdm.tqdm: принимает
+            аргументы tqdm, возвращает объект с update(frames).
+        print_line (Callable, optional): Получает строки, которые
+            model.transcribe выводит в stdout (сегменты при verbose=True).
+        log_mel (Callable, optional): Получает сигнал и количество
+            мел-полос, возвращает готовую спектрограмму или None
+            (спектрограмма вычисляется).
+        decode (Callable, optional): Получает исходную функцию
+            декодирования окна модели и ее аргументы (спектрограмма
+            окна, DecodingOptions), возвращает DecodingResult.
+            Исходная функция принимает срок deadline
+            (по time.perf_counter), после которого декодирование
+            окна завершается.
+
+    Yields:
+        None
+    """
+    handlers = {
+        name: handler
+        for name, handler in (
+            ("progress_bar", progress_bar),
+            ("print_line", print_line),
+            ("log_mel", log_mel),
+            ("decode", decode),
+        )
+        if handler is not None
+    }
+    if not _install():
+        yield
+        return
+    saved: Dict[str, Optional[Callable[..., Any]]] = {
+        name: _handler(name) for name in handlers
+    }
+    for name, handler in handlers.items():
+        setattr(_local, name, handler)
+    try:
+        yield
+    finally:
+        for name, previous in saved.items():
+            setattr(_local, name, previous)